@@ -1,25 +1,93 @@
 # apps/focusflow/api.py
 from __future__ import annotations
 
+import base64
+import binascii
+import hashlib
+import json
+from datetime import timedelta
+from functools import partial, reduce
+from operator import or_
+from typing import Any, Callable, NamedTuple, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
 from django.core.paginator import Paginator
-from django.db.models import Q
-from django.http import JsonResponse, Http404
+from django.core.serializers.json import DjangoJSONEncoder
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Left
+from django.http import HttpResponse, JsonResponse, Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_POST
 
-from .models import Message, Task, Conversation, AIAnnotation
+from .models import Message, Task, Conversation, AIAnnotation, InboxRow, Workspace
+from .services.analytics import DEFAULT_DAYS, workspace_analytics
+from .services.events import event_stream, live_events_available
+from .services.export import CONTENT_TYPES, RESOURCES, export_chunks
+from .services.search import search_backend
+
+try:  # optional fast encoder; JsonResponse (stdlib json) is the fallback
+    import orjson
+except ImportError:
+    orjson = None
 
 
 # --- helpers -----------------------------------------------------------------
-def _paginate(request, queryset, serializer):
-    """Universal pagination helper for JSON APIs."""
-    page = int(request.GET.get("page", 1))
-    page_size = min(max(int(request.GET.get("page_size", 20)), 1), 100)
+class InvalidCursor(ValueError):
+    pass
+
+
+def _page_size(request) -> int:
+    return min(max(int(request.GET.get("page_size", 20)), 1), 100)
+
+
+def _json(payload, status: int = 200):
+    """JSON response through orjson when installed (same output as JsonResponse, several times faster)."""
+    if orjson is None:
+        return JsonResponse(payload, status=status)
+    body = orjson.dumps(
+        payload,
+        default=DjangoJSONEncoder().default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+    )
+    return HttpResponse(body, status=status, content_type="application/json")
+
 
-    paginator = Paginator(queryset, page_size)
+def _paginate(request, queryset, spec, *, cursor_field: str | None = None, prefetch=None):
+    """
+    Universal pagination helper for JSON APIs.
+    Rows are serialized straight from `.values()` on the `?fields=` selection of `spec` (no model
+    instances). Passing `?cursor=` (empty for the first page) switches to keyset pagination on
+    (`cursor_field`, id) when the endpoint supports it. `prefetch(rows)` runs once per page,
+    before serialization.
+    """
+    try:
+        queryset, serializer = _project(request, queryset, spec, *filter(None, [cursor_field]))
+    except InvalidFields as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    if cursor_field and "cursor" in request.GET:
+        try:
+            return _paginate_keyset(request, queryset, serializer, cursor_field, prefetch=prefetch)
+        except InvalidCursor:
+            return JsonResponse({"error": "invalid cursor"}, status=400)
+
+    page = int(request.GET.get("page", 1))
+    paginator = Paginator(queryset, _page_size(request))
     page_obj = paginator.get_page(page)
-    data = [serializer(obj) for obj in page_obj.object_list]
+    rows = list(page_obj.object_list)
+    if prefetch is not None:
+        prefetch(rows)
+    data = [serializer(row) for row in rows]
 
-    return JsonResponse(
+    return _json(
         {
             "results": data,
             "count": paginator.count,
@@ -29,100 +97,529 @@ def _paginate(request, queryset, serializer):
     )
 
 
+def _paginate_keyset(request, queryset, serializer, field: str, *, prefetch=None):
+    """
+    Newest-first keyset pagination: no COUNT(*), no OFFSET, so page N costs the same as page 1
+    and rides the (…, -field) indexes. The cursor is an opaque token for the last row's (field, id).
+    """
+    page_size = _page_size(request)
+    nullable = queryset.model._meta.get_field(field).null
+    ordering = F(field).desc(nulls_last=True) if nullable else F(field).desc()
+    qs = queryset.order_by(ordering, "-id")
+
+    position = _decode_cursor(request.GET.get("cursor", ""))
+    if position is not None:
+        value, pk = position
+        if value is None:
+            qs = qs.filter(**{f"{field}__isnull": True, "id__lt": pk})
+        else:
+            after = Q(**{f"{field}__lt": value}) | Q(**{field: value, "id__lt": pk})
+            if nullable:
+                after |= Q(**{f"{field}__isnull": True})
+            qs = qs.filter(after)
+
+    rows = list(qs[: page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = _encode_cursor(rows[-1][field], rows[-1]["id"]) if has_more else None
+    if prefetch is not None:
+        prefetch(rows)
+    return _json(
+        {
+            "results": [serializer(row) for row in rows],
+            "next_cursor": next_cursor,
+            "page_size": page_size,
+        }
+    )
+
+
+def _search_page(request, search, queryset, spec, *, prefetch=None):
+    """
+    Ranked full-text results (see services/search.py), page-numbered like `_paginate`.
+    `search(limit, offset)` returns a SearchPage; each row gains `rank` and an HTML `snippet`.
+    Ranked results have no keyset order, so `cursor` is refused rather than ignored.
+    """
+    if "cursor" in request.GET:
+        return JsonResponse({"error": "cursor pagination is not supported with q; use page"}, status=400)
+    try:
+        queryset, serializer = _project(request, queryset, spec)
+    except InvalidFields as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    page_size = _page_size(request)
+    page = max(int(request.GET.get("page", 1)), 1)
+    result = search(limit=page_size, offset=(page - 1) * page_size)
+
+    by_id = {row["id"]: row for row in queryset.filter(id__in=[hit.object_id for hit in result.hits])}
+    hits = [hit for hit in result.hits if hit.object_id in by_id]
+    rows = [by_id[hit.object_id] for hit in hits]
+    if prefetch is not None:
+        prefetch(rows)
+    data = [{**serializer(row), "rank": hit.rank, "snippet": hit.snippet} for row, hit in zip(rows, hits)]
+
+    return _json(
+        {
+            "results": data,
+            "count": result.total,
+            "num_pages": max((result.total + page_size - 1) // page_size, 1),
+            "page": page,
+        }
+    )
+
+
+def _search_filters(request, *names) -> dict:
+    return {name: request.GET[name] for name in names if request.GET.get(name)}
+
+
+def _encode_cursor(value, pk: int) -> str:
+    raw = json.dumps([_iso(value), pk], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(token: str):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        value, pk = json.loads(raw)
+        moment = parse_datetime(value) if value is not None else None
+        if value is not None and moment is None:
+            raise InvalidCursor(token)
+        return moment, int(pk)
+    except (binascii.Error, ValueError, TypeError) as exc:
+        raise InvalidCursor(token) from exc
+
+
 def _iso(value):
     return value.isoformat() if hasattr(value, "isoformat") else value
 
 
+def _can_access_workspace(user, workspace_id: int) -> bool:
+    """Owner or active member of a live workspace."""
+    if not user.is_authenticated:
+        return False
+    return (
+        Workspace.objects.filter(pk=workspace_id, is_deleted=False)
+        .filter(Q(owner=user) | Q(memberships__user=user, memberships__is_active=True))
+        .exists()
+    )
+
+
+def _includes(request) -> set:
+    return {part.strip() for part in request.GET.get("include", "").split(",") if part.strip()}
+
+
+# --- annotation prefetch ------------------------------------------------------
+INLINE_ANNOTATION_KINDS = (AIAnnotation.Kind.SUMMARY, AIAnnotation.Kind.PRIORITY)
+
+
+def _public_annotations():
+    """Every annotation the API shows: message digests are the summarizer's internal cache."""
+    return AIAnnotation.objects.exclude(kind=AIAnnotation.Kind.DIGEST)
+
+
+def _annotations_for(model, object_ids, kinds=None):
+    """AIAnnotations of many targets of one model in a single query (no join on content types)."""
+    qs = _public_annotations().filter(
+        target_content_type=ContentType.objects.get_for_model(model),
+        target_object_id__in=list(object_ids),
+    ).select_related("workspace", "target_content_type")
+    if kinds:
+        qs = qs.filter(kind__in=kinds)
+    return qs.order_by("-updated_at", "-id")
+
+
+def _attach_annotations(model, rows, kinds=INLINE_ANNOTATION_KINDS):
+    """Set `annotations` on every `.values()` row of a page, grouped by target id."""
+    if not rows:
+        return
+    grouped = {row["id"]: [] for row in rows}
+    for a in _annotations_for(model, grouped.keys(), kinds):
+        grouped[a.target_object_id].append(_serialize_annotation(a))
+    for row in rows:
+        row["annotations"] = grouped[row["id"]]
+
+
 # --- serializers --------------------------------------------------------------
+class InvalidFields(ValueError):
+    pass
+
+
+class ApiField(NamedTuple):
+    lookup: str                                   # ORM path; on instances it is followed attr by attr
+    format: Optional[Callable[[Any], Any]] = None
+    expression: Any = None                        # narrower SQL for `.values()` (e.g. a text prefix)
+
+
+TEXT_PREVIEW = 400
+
+
+def _preview(text):
+    return text[:TEXT_PREVIEW] if text else None
+
+
+MESSAGE_FIELDS = {
+    "id": ApiField("id"),
+    "conversation_id": ApiField("conversation_id"),
+    "stream": ApiField("stream__name"),
+    "sender": ApiField("sender__display_name"),
+    "sent_at": ApiField("sent_at", _iso),
+    "text": ApiField("text", _preview, Left("text", TEXT_PREVIEW)),
+    "is_read": ApiField("is_read"),
+    "external_url": ApiField("external_url", lambda url: url or ""),
+    "created_at": ApiField("created_at", _iso),
+}
+
+TASK_FIELDS = {
+    "id": ApiField("id"),
+    "title": ApiField("title"),
+    "status": ApiField("status"),
+    "due_at": ApiField("due_at", _iso),
+    "confidence": ApiField("confidence"),
+    "assignee": ApiField("assignee__username"),
+    "workspace": ApiField("workspace__name"),
+    "updated_at": ApiField("updated_at", _iso),   # concurrency token for /api/actions/bulk/
+}
+
+CONVERSATION_FIELDS = {
+    "id": ApiField("id"),
+    "workspace": ApiField("workspace__name"),
+    "stream": ApiField("stream__name"),
+    "subject": ApiField("subject"),
+    "priority": ApiField("priority"),
+    "state": ApiField("state"),
+    "last_message_at": ApiField("last_message_at", _iso),
+    "unread_count": ApiField("unread_count"),
+}
+
+ANNOTATION_FIELDS = {
+    "id": ApiField("id"),
+    "workspace": ApiField("workspace__name"),
+    "kind": ApiField("kind"),
+    "content_text": ApiField("content_text"),
+    "score": ApiField("score"),
+    "target_type": ApiField("target_content_type__model"),
+    "target_id": ApiField("target_object_id"),
+    "created_at": ApiField("created_at", _iso),
+}
+
+
+INBOX_FIELDS = {
+    "id": ApiField("conversation_id"),
+    "subject": ApiField("subject"),
+    "stream": ApiField("stream_name"),
+    "state": ApiField("state"),
+    "priority": ApiField("priority_label"),
+    "priority_score": ApiField("priority_score"),
+    "last_message_at": ApiField("last_message_at", _iso),
+    "unread_count": ApiField("unread_count"),
+    "sender": ApiField("sender_name"),
+    "snippet": ApiField("snippet"),
+    "summary": ApiField("summary"),
+    "tags": ApiField("tag_slugs"),
+}
+
+
+def _project(request, queryset, spec: dict, *extra: str):
+    """
+    Apply `?fields=a,b` (default: all of `spec`) to a list queryset: returns the `.values()`
+    queryset, which selects only the needed columns (plus id and `extra`), and its row serializer.
+    """
+    requested = [name.strip() for name in request.GET.get("fields", "").split(",") if name.strip()]
+    unknown = sorted(set(requested) - set(spec))
+    if unknown:
+        raise InvalidFields(f"unknown fields: {', '.join(unknown)} (allowed: {', '.join(spec)})")
+
+    columns, expressions, picked = {"id", *extra}, {}, []
+    for name in requested or spec:
+        field = spec[name]
+        key = field.lookup
+        if field.expression is not None:
+            key = f"api_{name}"
+            expressions[key] = field.expression
+        else:
+            columns.add(key)
+        picked.append((name, key, field.format))
+
+    def serialize(row: dict) -> dict:
+        data = {name: fmt(row[key]) if fmt else row[key] for name, key, fmt in picked}
+        if "annotations" in row:
+            data["annotations"] = row["annotations"]
+        return data
+
+    return queryset.values(*columns, **expressions), serialize
+
+
+def _from_instance(spec: dict, obj) -> dict:
+    """Serialize a model instance (detail views, delta feed) with the same field spec as the lists."""
+    data = {}
+    for name, field in spec.items():
+        value = obj
+        for attr in field.lookup.split("__"):
+            value = getattr(value, attr, None)
+            if value is None:
+                break
+        data[name] = field.format(value) if field.format else value
+    return data
+
+
+def _collapse_duplicates(queryset):
+    """
+    ?collapse=duplicates: among the rows `queryset` selects, keep the oldest of each near-duplicate
+    cluster (services/dedup.py) and count the others it stands for. Clusters are judged within
+    the same filters, so a row is never hidden behind one the listing does not show.
+    Both lookups go through the indexed `MessageSignature.cluster_root`; unsigned messages stand alone.
+    """
+    firsts = (
+        queryset.filter(signature__isnull=False)
+        .order_by()
+        .values("signature__cluster_root")
+        .annotate(first=Min("id"))
+        .values("first")
+    )
+    others = (
+        queryset.filter(signature__cluster_root=OuterRef("signature__cluster_root"))
+        .exclude(id=OuterRef("id"))
+        .order_by()
+        .values("signature__cluster_root")
+        .annotate(n=Count("pk"))
+        .values("n")
+    )
+    spec = {**MESSAGE_FIELDS, "duplicates": ApiField("duplicates", expression=Coalesce(Subquery(others[:1]), 0))}
+    return queryset.filter(Q(signature__isnull=True) | Q(id__in=firsts)), spec
+
+
 def _serialize_message(m: Message):
-    return {
-        "id": m.id,
-        "conversation_id": m.conversation_id,
-        "stream": getattr(m.stream, "name", None),
-        "sender": getattr(m.sender, "display_name", None),
-        "sent_at": _iso(m.sent_at),
-        "text": m.text[:400] if m.text else None,
-        "is_read": m.is_read,
-        "external_url": m.external_url or "",
-        "created_at": _iso(m.created_at),
-    }
+    return _from_instance(MESSAGE_FIELDS, m)
 
 
 def _serialize_task(t: Task):
-    return {
-        "id": t.id,
-        "title": t.title,
-        "status": t.status,
-        "due_at": _iso(t.due_at),
-        "confidence": t.confidence,
-        "assignee": getattr(t.assignee, "username", None),
-        "workspace": getattr(t.workspace, "name", None),
-    }
+    return _from_instance(TASK_FIELDS, t)
 
 
 def _serialize_conversation(c: Conversation):
+    return _from_instance(CONVERSATION_FIELDS, c)
+
+
+def _serialize_annotation(a: AIAnnotation):
+    return _from_instance(ANNOTATION_FIELDS, a)
+
+
+# --- conditional GET ----------------------------------------------------------
+def _related_stats(queryset, owner_field: str) -> dict:
+    """Max(updated_at) and Count of the rows in `queryset` owned by OuterRef("pk"), as subqueries."""
+    grouped = queryset.filter(**{owner_field: OuterRef("pk")}).order_by().values(owner_field)
     return {
-        "id": c.id,
-        "workspace": getattr(c.workspace, "name", None),
-        "stream": getattr(c.stream, "name", None),
-        "subject": c.subject,
-        "priority": c.priority,
-        "state": c.state,
-        "last_message_at": _iso(c.last_message_at),
-        "unread_count": c.unread_count,
+        "latest": Subquery(grouped.annotate(m=Max("updated_at")).values("m")[:1]),
+        "count": Subquery(grouped.annotate(n=Count("id")).values("n")[:1]),
     }
 
 
-def _serialize_annotation(a: AIAnnotation):
+def _annotation_stats(model) -> dict:
+    annotations = _public_annotations().filter(target_content_type=ContentType.objects.get_for_model(model))
+    stats = _related_stats(annotations, "target_object_id")
+    return {"annotations_latest": stats["latest"], "annotations_count": stats["count"]}
+
+
+def _validator_state(queryset, pk: int, fields, **stats) -> dict:
+    """Everything a payload depends on, in one aggregate query (404 when the row is missing)."""
+    state = queryset.filter(pk=pk).annotate(**stats).values(*fields, *stats).first()
+    if state is None:
+        raise Http404
+    return state
+
+
+def _conditional_json(request, state: dict, build):
+    """
+    304 when If-None-Match / If-Modified-Since match validators derived from `state`; otherwise
+    `build()` the payload. The ETag covers counts too, so deletions change it.
+    """
+    etag = '"%s"' % hashlib.sha1(json.dumps(state, default=_iso, sort_keys=True).encode()).hexdigest()
+    moments = [v for v in state.values() if hasattr(v, "timestamp")]
+    last_modified = int(max(moments).timestamp()) if moments else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _json(build())
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = "private, no-cache"   # always revalidate; a 304 is one query
+    return response
+
+
+# --- delta sync ---------------------------------------------------------------
+DEFAULT_DELTA_LIMIT = 200
+MAX_DELTA_LIMIT = 1000
+# Rows younger than this are held back one poll: a transaction that stamped `updated_at`
+# but has not committed yet can't slip in behind a token that already moved past it
+DEFAULT_DELTA_SETTLE_SECONDS = 2
+
+
+def _delta_sources():
+    """name → (queryset, serializer, workspace lookup) for every model the changes feed covers."""
     return {
-        "id": a.id,
-        "workspace": getattr(a.workspace, "name", None),
-        "kind": a.kind,
-        "content_text": a.content_text,
-        "score": a.score,
-        "target_type": a.target_content_type.model,
-        "target_id": a.target_object_id,
-        "created_at": _iso(a.created_at),
+        "conversations": (
+            Conversation.objects.select_related("workspace", "stream"), _serialize_conversation, "workspace_id"
+        ),
+        "messages": (
+            Message.objects.select_related("sender", "stream", "conversation"),
+            _serialize_message,
+            "conversation__workspace_id",
+        ),
+        "tasks": (Task.objects.select_related("workspace", "assignee"), _serialize_task, "workspace_id"),
+        "annotations": (
+            _public_annotations().select_related("workspace", "target_content_type"),
+            _serialize_annotation,
+            "workspace_id",
+        ),
     }
 
 
+def _delta_rows(queryset, position, horizon, limit: int):
+    """Rows past `position` = (updated_at, id), oldest first, up to `horizon`; rides the updated_at index."""
+    qs = queryset.filter(updated_at__lte=horizon)
+    if position is not None:
+        value, pk = position
+        qs = qs.filter(Q(updated_at__gt=value) | Q(updated_at=value, id__gt=pk))
+    rows = list(qs.order_by("updated_at", "id")[: limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def _encode_token(positions: dict) -> str:
+    raw = json.dumps({name: [_iso(value), pk] for name, (value, pk) in positions.items()}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_token(token: str, names) -> dict:
+    if not token:
+        return {}
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        positions = {}
+        for name, (value, pk) in raw.items():
+            moment = parse_datetime(value)
+            if name not in names or moment is None:
+                raise InvalidCursor(token)
+            positions[name] = (moment, int(pk))
+        return positions
+    except (binascii.Error, ValueError, TypeError, AttributeError) as exc:
+        raise InvalidCursor(token) from exc
+
+
+# --- bulk task updates --------------------------------------------------------
+MAX_BULK_ITEMS = 500
+BULK_FIELDS = ("status", "assignee", "due_at")
+
+
+class InvalidChange(ValueError):
+    pass
+
+
+def _parse_change(item, seen: set) -> tuple:
+    """One bulk item → (task id, expected updated_at or None, {field: value})."""
+    if not isinstance(item, dict):
+        raise InvalidChange("each change must be an object")
+    try:
+        task_id = int(item["id"])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidChange("id must be an integer")
+    if task_id in seen:
+        raise InvalidChange("task listed more than once")
+
+    expected = None
+    if item.get("updated_at") is not None:
+        expected = parse_datetime(str(item["updated_at"]))
+        if expected is None:
+            raise InvalidChange("updated_at must be an ISO 8601 datetime")
+
+    values = {}
+    if "status" in item:
+        if item["status"] not in Task.Status.values:
+            raise InvalidChange(f"status must be one of: {', '.join(Task.Status.values)}")
+        values["status"] = item["status"]
+    if "assignee" in item:
+        try:
+            values["assignee_id"] = int(item["assignee"]) if item["assignee"] is not None else None
+        except (TypeError, ValueError):
+            raise InvalidChange("assignee must be a user id or null")
+    if "due_at" in item:
+        due = parse_datetime(str(item["due_at"])) if item["due_at"] is not None else None
+        if item["due_at"] is not None and due is None:
+            raise InvalidChange("due_at must be an ISO 8601 datetime or null")
+        values["due_at"] = due
+    if not values:
+        raise InvalidChange(f"nothing to change (fields: {', '.join(BULK_FIELDS)})")
+    seen.add(task_id)
+    return task_id, expected, values
+
+
+def _workspace_user_ids(workspace_id: int, user_ids) -> set:
+    """The subset of `user_ids` who own or actively belong to the workspace."""
+    return set(
+        get_user_model().objects.filter(pk__in=user_ids)
+        .filter(
+            Q(owned_workspaces=workspace_id)
+            | Q(workspace_memberships__workspace=workspace_id, workspace_memberships__is_active=True)
+        )
+        .values_list("pk", flat=True)
+    )
+
+
 # --- endpoints ----------------------------------------------------------------
 def messages_list(request):
-    """GET /focusflow/api/messages/"""
-    qs = Message.objects.select_related("sender", "stream", "conversation")
+    """
+    GET /focusflow/api/messages/[?q=<full-text query>][&include=annotations][&fields=id,sent_at,...]
+    [&collapse=duplicates]   (list only: one row per near-duplicate cluster within the filters)
+    """
+    qs = Message.objects.all()
+    spec = MESSAGE_FIELDS
+    prefetch = partial(_attach_annotations, Message) if "annotations" in _includes(request) else None
 
     # filters
     conversation_id = request.GET.get("conversation_id")
     stream_id = request.GET.get("stream_id")
     qtext = request.GET.get("q")
 
+    if qtext:
+        filters = _search_filters(request, "conversation_id", "stream_id")
+        search = partial(search_backend().search_messages, qtext, filters)
+        return _search_page(request, search, qs, MESSAGE_FIELDS, prefetch=prefetch)
+
     if conversation_id:
         qs = qs.filter(conversation_id=conversation_id)
     if stream_id:
         qs = qs.filter(stream_id=stream_id)
-    if qtext:
-        qs = qs.filter(Q(text__icontains=qtext) | Q(html__icontains=qtext))
+    collapse = request.GET.get("collapse")
+    if collapse:
+        if collapse != "duplicates":
+            return JsonResponse({"error": "collapse must be 'duplicates'"}, status=400)
+        qs, spec = _collapse_duplicates(qs)
 
     qs = qs.order_by("-sent_at")
-    return _paginate(request, qs, _serialize_message)
+    return _paginate(request, qs, spec, cursor_field="sent_at", prefetch=prefetch)
 
 
 def message_detail(request, pk: int):
-    """GET /focusflow/api/messages/<id>/"""
-    obj = get_object_or_404(Message.objects.select_related("sender", "conversation"), pk=pk)
-    payload = _serialize_message(obj)
-
-    # AI annotations linked to this message
-    annotations = AIAnnotation.objects.filter(
-        target_content_type__model="message", target_object_id=obj.id
+    """GET /focusflow/api/messages/<id>/   (ETag / Last-Modified; 304 costs one query)"""
+    state = _validator_state(
+        Message.objects, pk, ["updated_at", "sender__updated_at", "stream__updated_at"], **_annotation_stats(Message)
     )
-    payload["annotations"] = [_serialize_annotation(a) for a in annotations]
-    return JsonResponse(payload)
+
+    def build():
+        obj = get_object_or_404(Message.objects.select_related("sender", "stream", "conversation"), pk=pk)
+        payload = _serialize_message(obj)
+
+        # AI annotations linked to this message
+        payload["annotations"] = [_serialize_annotation(a) for a in _annotations_for(Message, [obj.id])]
+        return payload
+
+    return _conditional_json(request, state, build)
 
 
 def actions_list(request):
-    """GET /focusflow/api/actions/"""
-    qs = Task.objects.select_related("workspace", "assignee")
+    """GET /focusflow/api/actions/[?fields=id,title,...]"""
+    qs = Task.objects.all()
     status = request.GET.get("status")
     qtext = request.GET.get("q")
 
@@ -132,78 +629,285 @@ def actions_list(request):
         qs = qs.filter(title__icontains=qtext)
 
     qs = qs.order_by("-created_at")
-    return _paginate(request, qs, _serialize_task)
+    return _paginate(request, qs, TASK_FIELDS, cursor_field="created_at")
+
+
+@require_POST
+def actions_bulk_update(request):
+    """
+    POST /focusflow/api/actions/bulk/
+    {"workspace": 1, "changes": [{"id": 7, "status": "done", "updated_at": "<from the list>"}, ...]}
+    Applies status / assignee / due_at changes in one transaction: one UPDATE per distinct change
+    set, guarded per row by `updated_at` when given. Returns one result per item: `updated`,
+    `conflict` (with the current updated_at), `not_found` or `invalid`. A change the database
+    refuses (reopening a task while an open one with the same title exists for its source) is
+    `invalid` without affecting the rest.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "authentication required"}, status=401)
+    try:
+        body = json.loads(request.body)
+        workspace_id = int(body["workspace"])
+        items = body["changes"]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"error": "body must be JSON with an integer workspace and a changes list"}, status=400)
+    if not isinstance(items, list) or not 0 < len(items) <= MAX_BULK_ITEMS:
+        return JsonResponse({"error": f"changes must be a list of 1-{MAX_BULK_ITEMS} items"}, status=400)
+    if not _can_access_workspace(request.user, workspace_id):
+        return JsonResponse({"error": "not a member of this workspace"}, status=403)
+
+    results, parsed, seen = [None] * len(items), [], set()
+    for index, item in enumerate(items):
+        try:
+            parsed.append((index, *_parse_change(item, seen)))
+        except InvalidChange as exc:
+            results[index] = {"index": index, "id": item.get("id") if isinstance(item, dict) else None,
+                              "result": "invalid", "error": str(exc)}
+
+    assignees = {values["assignee_id"] for _, _, _, values in parsed if values.get("assignee_id")}
+    allowed = _workspace_user_ids(workspace_id, assignees) if assignees else set()
+    valid = []
+    for index, task_id, expected, values in parsed:
+        if values.get("assignee_id") and values["assignee_id"] not in allowed:
+            results[index] = {"index": index, "id": task_id, "result": "invalid",
+                              "error": "assignee is not a member of this workspace"}
+        else:
+            valid.append((index, task_id, expected, values))
+
+    # group identical change sets: one UPDATE ... WHERE (id, updated_at) matches, per group
+    groups = {}
+    for index, task_id, expected, values in valid:
+        key = tuple(sorted(values.items(), key=lambda kv: kv[0]))
+        guard = Q(id=task_id, updated_at=expected) if expected is not None else Q(id=task_id)
+        groups.setdefault(key, []).append((task_id, guard))
+
+    scope = Task.objects.filter(workspace_id=workspace_id, is_deleted=False)
+    stamp = timezone.now()
+    refused = set()
+    with transaction.atomic():
+        for key, guarded in groups.items():
+            try:
+                with transaction.atomic():
+                    scope.filter(reduce(or_, (guard for _, guard in guarded))).update(**dict(key), updated_at=stamp)
+            except IntegrityError:
+                # only on failure: retry row by row so the offending rows alone are refused
+                for task_id, guard in guarded:
+                    try:
+                        with transaction.atomic():
+                            scope.filter(guard).update(**dict(key), updated_at=stamp)
+                    except IntegrityError:
+                        refused.add(task_id)
+        current = dict(scope.filter(id__in=[task_id for _, task_id, _, _ in valid]).values_list("id", "updated_at"))
+
+    for index, task_id, _, _ in valid:
+        if task_id in refused:
+            results[index] = {"index": index, "id": task_id, "result": "invalid",
+                              "error": "an open task with this title already exists for the same source"}
+        elif task_id not in current:
+            results[index] = {"index": index, "id": task_id, "result": "not_found"}
+        elif current[task_id] == stamp:
+            results[index] = {"index": index, "id": task_id, "result": "updated", "updated_at": _iso(stamp)}
+        else:
+            results[index] = {"index": index, "id": task_id, "result": "conflict",
+                              "updated_at": _iso(current[task_id])}
+
+    return _json({"results": results, "updated": sum(r["result"] == "updated" for r in results)})
 
 
 def conversations_list(request):
-    """GET /focusflow/api/conversations/"""
-    qs = Conversation.objects.select_related("workspace", "stream")
+    """GET /focusflow/api/conversations/[?q=<full-text query>][&include=annotations][&fields=id,subject,...]"""
+    qs = Conversation.objects.all()
+    prefetch = partial(_attach_annotations, Conversation) if "annotations" in _includes(request) else None
 
     priority = request.GET.get("priority")
     state = request.GET.get("state")
     qtext = request.GET.get("q")
 
+    if qtext:
+        filters = _search_filters(request, "priority", "state")
+        search = partial(search_backend().search_conversations, qtext, filters)
+        return _search_page(request, search, qs, CONVERSATION_FIELDS, prefetch=prefetch)
+
     if priority:
         qs = qs.filter(priority=priority)
     if state:
         qs = qs.filter(state=state)
-    if qtext:
-        qs = qs.filter(Q(subject__icontains=qtext))
 
     qs = qs.order_by("-last_message_at")
-    return _paginate(request, qs, _serialize_conversation)
+    return _paginate(request, qs, CONVERSATION_FIELDS, cursor_field="last_message_at", prefetch=prefetch)
 
 
-def conversation_detail(request, pk: int):
-    """GET /focusflow/api/conversations/<id>/"""
-    c = get_object_or_404(Conversation.objects.select_related("workspace", "stream"), pk=pk)
-    data = _serialize_conversation(c)
+def inbox_list(request):
+    """
+    GET /focusflow/api/inbox/?workspace=<id>[&state=open][&cursor=][&fields=...]
+    The precomputed inbox (services/inbox.py): with `cursor` each page is one range scan of
+    (workspace, -last_message_at) on a single table.
+    """
+    try:
+        workspace_id = int(request.GET["workspace"])
+    except (KeyError, ValueError):
+        return JsonResponse({"error": "workspace must be an integer"}, status=400)
+
+    # page mode needs the same order as the cursor path; both ride focusflow_inbox_recent
+    qs = InboxRow.objects.filter(workspace_id=workspace_id).order_by(F("last_message_at").desc(nulls_last=True), "-id")
+    state = request.GET.get("state")
+    if state:
+        qs = qs.filter(state=state)
+    return _paginate(request, qs, INBOX_FIELDS, cursor_field="last_message_at")
 
-    messages = Message.objects.filter(conversation=c).select_related("sender").order_by("-sent_at")[:50]
-    data["messages"] = [_serialize_message(m) for m in messages]
 
-    annotations = AIAnnotation.objects.filter(
-        target_content_type__model="conversation", target_object_id=c.id
+def conversation_detail(request, pk: int):
+    """GET /focusflow/api/conversations/<id>/   (ETag / Last-Modified; 304 costs one query)"""
+    messages_stats = _related_stats(Message.objects.all(), "conversation")
+    state = _validator_state(
+        Conversation.objects,
+        pk,
+        ["updated_at", "workspace__updated_at", "stream__updated_at"],
+        messages_latest=messages_stats["latest"],
+        messages_count=messages_stats["count"],
+        **_annotation_stats(Conversation),
     )
-    data["annotations"] = [_serialize_annotation(a) for a in annotations]
 
-    return JsonResponse(data)
+    def build():
+        c = get_object_or_404(Conversation.objects.select_related("workspace", "stream"), pk=pk)
+        data = _serialize_conversation(c)
+
+        messages = Message.objects.filter(conversation=c).select_related("sender", "stream").order_by("-sent_at")[:50]
+        data["messages"] = [_serialize_message(m) for m in messages]
+
+        data["annotations"] = [_serialize_annotation(a) for a in _annotations_for(Conversation, [c.id])]
+        return data
+
+    return _conditional_json(request, state, build)
 
 def annotations_list(request):
     """
-    GET /focusflow/api/annotations/?kind=summary
+    GET /focusflow/api/annotations/?kind=summary[&fields=id,kind,...]
     Returns AI annotations (summaries, priorities, etc.)
     """
-    qs = AIAnnotation.objects.select_related("workspace")
+    qs = _public_annotations()
     kind = request.GET.get("kind")
     if kind:
         qs = qs.filter(kind=kind)
 
-    page = int(request.GET.get("page", 1))
-    page_size = min(max(int(request.GET.get("page_size", 20)), 1), 100)
+    qs = qs.order_by("-created_at")
+    return _paginate(request, qs, ANNOTATION_FIELDS, cursor_field="created_at")
 
-    from django.core.paginator import Paginator
-    paginator = Paginator(qs, page_size)
-    page_obj = paginator.get_page(page)
 
-    def _serialize(a):
-        return {
-            "id": a.id,
-            "workspace": getattr(a.workspace, "name", None),
-            "kind": a.kind,
-            "content_text": a.content_text,
-            "score": a.score,
-            "created_at": a.created_at.isoformat(),
-            "target_type": a.target_content_type.model,
-            "target_id": a.target_object_id,
-        }
+def analytics_summary(request):
+    """
+    GET /focusflow/api/analytics/?workspace=<id>&days=30
+    Grouped counts (by stream, priority, state, task status, messages per day), cached briefly.
+    """
+    try:
+        workspace_id = int(request.GET["workspace"]) if request.GET.get("workspace") else None
+        days = int(request.GET.get("days", DEFAULT_DAYS))
+    except ValueError:
+        return JsonResponse({"error": "workspace and days must be integers"}, status=400)
+    return _json(workspace_analytics(workspace_id, days))
 
-    data = [_serialize(a) for a in page_obj.object_list]
-    return JsonResponse(
-        {
-            "results": data,
-            "count": paginator.count,
-            "num_pages": paginator.num_pages,
-            "page": page_obj.number,
-        }
-    )
\ No newline at end of file
+
+def changes_since(request):
+    """
+    GET /focusflow/api/changes/?since=<token>[&workspace=<id>][&limit=200]
+    Rows of conversations / messages / tasks / annotations changed since the token, tombstones for
+    soft-deleted rows, and `next` for the following poll. Without `since` only a fresh token is
+    returned; an empty `since` replays everything (page through while `has_more`).
+    """
+    sources = _delta_sources()
+    settle = getattr(settings, "FOCUSFLOW_DELTA_SETTLE_SECONDS", DEFAULT_DELTA_SETTLE_SECONDS)
+    horizon = timezone.now() - timedelta(seconds=settle)
+    if "since" not in request.GET:
+        return _json(
+            {"changes": {}, "next": _encode_token({name: (horizon, 0) for name in sources}), "has_more": False}
+        )
+
+    try:
+        positions = _decode_token(request.GET["since"], sources)
+        workspace_id = int(request.GET["workspace"]) if request.GET.get("workspace") else None
+        limit = min(max(int(request.GET.get("limit", DEFAULT_DELTA_LIMIT)), 1), MAX_DELTA_LIMIT)
+    except InvalidCursor:
+        return JsonResponse({"error": "invalid since token"}, status=400)
+    except ValueError:
+        return JsonResponse({"error": "workspace and limit must be integers"}, status=400)
+
+    changes, has_more = {}, False
+    for name, (queryset, serializer, scope) in sources.items():
+        if workspace_id is not None:
+            queryset = queryset.filter(**{scope: workspace_id})
+        rows, more = _delta_rows(queryset, positions.get(name), horizon, limit)
+        has_more |= more
+        if rows:
+            positions[name] = (rows[-1].updated_at, rows[-1].pk)
+        elif name not in positions:
+            positions[name] = (horizon, 0)
+
+        changed, deleted = [], []
+        for obj in rows:
+            if getattr(obj, "is_deleted", False):
+                deleted.append({"id": obj.pk, "deleted_at": _iso(obj.deleted_at or obj.updated_at)})
+            else:
+                changed.append({**serializer(obj), "updated_at": _iso(obj.updated_at)})
+        changes[name] = {"changed": changed, "deleted": deleted}
+
+    return _json({"changes": changes, "next": _encode_token(positions), "has_more": has_more})
+
+
+async def events_stream(request):
+    """
+    GET /focusflow/api/events/?workspace=<id>   (text/event-stream)
+    Live `message.created` / `conversation.updated` / `annotation.created` events. Reconnecting
+    clients send Last-Event-ID and get the missed events replayed. Owner / members only; 503
+    unless enabled, served under ASGI and backed by a cross-process broker (or explicitly run as a
+    single process, see services/events.py).
+    """
+    try:
+        workspace_id = int(request.GET["workspace"])
+        last = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+        last_event_id = int(last) if last else None
+    except (KeyError, ValueError):
+        return JsonResponse({"error": "workspace (and Last-Event-ID) must be integers"}, status=400)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"error": "authentication required"}, status=401)
+    if not await sync_to_async(_can_access_workspace)(user, workspace_id):
+        return JsonResponse({"error": "not a member of this workspace"}, status=403)
+    if not live_events_available(request):
+        return JsonResponse({"error": "live events are not available on this deployment"}, status=503)
+
+    response = StreamingHttpResponse(event_stream(workspace_id, last_event_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"   # keep nginx from buffering the stream
+    return response
+
+
+def workspace_export(request):
+    """
+    GET /focusflow/api/export/?workspace=<id>[&resource=messages&resource=tasks][&format=ndjson|csv][&gzip=1]
+    Streams every row of the workspace (soft-deleted rows flagged, bodies untruncated) in constant
+    memory. NDJSON takes any resources (default: all), CSV exactly one. Owner / members only.
+    """
+    try:
+        workspace_id = int(request.GET["workspace"])
+    except (KeyError, ValueError):
+        return JsonResponse({"error": "workspace must be an integer"}, status=400)
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "authentication required"}, status=401)
+    if not _can_access_workspace(request.user, workspace_id):
+        return JsonResponse({"error": "not a member of this workspace"}, status=403)
+
+    fmt = request.GET.get("format", "ndjson")
+    resources = request.GET.getlist("resource") or list(RESOURCES)
+    compress = request.GET.get("gzip") in ("1", "true")
+    try:
+        chunks = export_chunks(workspace_id, resources, fmt, compress=compress)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    name = f"focusflow-{workspace_id}-{resources[0] if len(resources) == 1 else 'all'}.{fmt}"
+    if compress:
+        name += ".gz"
+    response = StreamingHttpResponse(chunks, content_type="application/gzip" if compress else CONTENT_TYPES[fmt])
+    response["Content-Disposition"] = f'attachment; filename="{name}"'
+    response["Cache-Control"] = "no-store"
+    return response
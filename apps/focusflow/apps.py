@@ -5,3 +5,6 @@ class FocusflowConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.focusflow"
     verbose_name = "FocusFlow"
+
+    def ready(self):
+        from . import signals  # noqa: F401  (connects the inbox projection receivers)
@@ -6,10 +6,15 @@ Usage examples:
   python manage.py focusflow_annotate --conversation 12
   python manage.py focusflow_annotate --message 45
   python manage.py focusflow_annotate --all-conversations
+  python manage.py focusflow_annotate --all-conversations --workers 4 --chunk-size 1000
+  python manage.py focusflow_annotate --all-conversations --model tfidf-v1
+  python manage.py focusflow_annotate --all-conversations --model local-v1
+  python manage.py focusflow_annotate --all-conversations --incremental
 """
 
 from django.core.management.base import BaseCommand, CommandError
-from apps.focusflow.services.summarizer import SummarizerService
+from apps.focusflow.services.summarizer import DEFAULT_BATCH_CHUNK_SIZE, SummarizerService
+from apps.focusflow.services.summarizer_backends import DEFAULT_BACKEND, backend_names, backend_stats
 from apps.focusflow.models import Conversation, Message
 
 
@@ -23,16 +28,46 @@ class Command(BaseCommand):
         group.add_argument("--all-conversations", action="store_true", help="Annotate all conversations")
 
         parser.add_argument("--no-tasks", action="store_true", help="Skip creating Task objects")
-        parser.add_argument("--model", default="simple-v1", help="Summarizer model name label")
+        parser.add_argument(
+            "--model",
+            default=DEFAULT_BACKEND,
+            help=f"Summarizer backend: {', '.join(backend_names())} (other names are labels for {DEFAULT_BACKEND})",
+        )
+        parser.add_argument(
+            "--force", action="store_true", help="Re-annotate even if the conversation text is unchanged"
+        )
+        parser.add_argument(
+            "--workers", type=int, default=1, help="Processes used to summarize (--all-conversations only)"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_BATCH_CHUNK_SIZE,
+            help="Conversations loaded and written per transaction (--all-conversations only)",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Summarize only messages without a stored digest and merge per conversation",
+        )
+        parser.add_argument("--limit", type=int, help="Annotate at most N conversations (newest first)")
 
     def handle(self, *args, **opts):
         svc = SummarizerService(model_name=opts["model"])
-        create_tasks = not opts["no-tasks"]
+        if svc.model_name != opts["model"]:
+            self.stderr.write(
+                self.style.WARNING(f"{opts['model']}: model unavailable, annotating as {svc.model_name} instead")
+            )
+        if opts["incremental"] and not svc.backend.supports_digests:
+            raise CommandError(f"{opts['model']} does not support --incremental")
+        create_tasks = not opts["no_tasks"]
 
         if opts["conversation"]:
             conv_id = opts["conversation"]
             try:
-                result = svc.annotate_conversation(conv_id, create_tasks=create_tasks)
+                result = svc.annotate_conversation(
+                    conv_id, create_tasks=create_tasks, force=opts["force"], incremental=opts["incremental"]
+                )
                 self._print_result("conversation", conv_id, result)
             except Conversation.DoesNotExist:
                 raise CommandError(f"Conversation {conv_id} not found")
@@ -46,13 +81,37 @@ class Command(BaseCommand):
                 raise CommandError(f"Message {msg_id} not found")
 
         elif opts["all_conversations"]:
-            qs = Conversation.objects.order_by("-last_message_at")[:50]
-            total = qs.count()
-            self.stdout.write(f"Annotating {total} conversations ...")
-            for c in qs:
-                result = svc.annotate_conversation(c.id, create_tasks=create_tasks)
-                self.stdout.write(f"→ {c.id}: {len(result.actions)} actions, priority={result.priority_label}")
-            self.stdout.write(self.style.SUCCESS("All done!"))
+            ids = Conversation.objects.order_by("-last_message_at").values_list("id", flat=True)
+            if opts["limit"]:
+                ids = ids[: opts["limit"]]
+            ids = list(ids)
+            self.stdout.write(f"Annotating {len(ids)} conversations ({opts['workers']} worker(s)) ...")
+
+            def _progress(report):
+                done = report.processed + report.skipped
+                self.stdout.write(f"→ {done}/{len(ids)} done ({report.skipped} unchanged), {report.actions} actions")
+
+            report = svc.annotate_conversations_batch(
+                ids,
+                create_tasks=create_tasks,
+                force=opts["force"],
+                workers=opts["workers"],
+                chunk_size=opts["chunk_size"],
+                incremental=opts["incremental"],
+                progress=_progress,
+            )
+            breakdown = ", ".join(f"{k}={v}" for k, v in sorted(report.priorities.items()))
+            self.stdout.write(self.style.SUCCESS(f"All done! {report.processed} annotated, {report.skipped} unchanged ({breakdown})"))
+            if opts["incremental"]:
+                self.stdout.write(f"  {report.digested} message(s) digested")
+            self._print_stats()
+
+    def _print_stats(self):
+        for name, stats in backend_stats().items():
+            self.stdout.write(
+                f"  {name}: {stats.calls} batch(es), {stats.texts} texts, "
+                f"{stats.latency_ms:.1f} ms/batch, {stats.throughput:.0f} texts/s"
+            )
 
     def _print_result(self, kind: str, obj_id: int, result):
         self.stdout.write(
@@ -0,0 +1,24 @@
+"""
+Management command: rebuild the FocusFlow near-duplicate signatures
+-------------------------------------------------------------------
+
+Usage examples:
+  python manage.py focusflow_dedup
+  python manage.py focusflow_dedup --workspace 3
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.focusflow.services.dedup import rebuild_signatures
+
+
+class Command(BaseCommand):
+    help = "Recompute the SimHash signatures and near-duplicate links of messages."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workspace", type=int, help="Only rebuild this workspace")
+
+    def handle(self, *args, **opts):
+        self.stdout.write("Signing message search documents ...")
+        signed = rebuild_signatures(workspace_id=opts["workspace"])
+        self.stdout.write(self.style.SUCCESS(f"All done! {signed} messages signed"))
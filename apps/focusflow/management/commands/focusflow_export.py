@@ -0,0 +1,74 @@
+"""
+Management command: export a FocusFlow workspace
+------------------------------------------------
+
+Usage examples:
+  python manage.py focusflow_export --workspace 3 --output ws3.ndjson
+  python manage.py focusflow_export --workspace 3 --gzip --output ws3.ndjson.gz
+  python manage.py focusflow_export --workspace 3 --resource messages --format csv --output messages.csv
+  python manage.py focusflow_export --workspace 3 --format xlsx --output ws3.xlsx
+  python manage.py focusflow_export --workspace 3 --resource tasks > tasks.ndjson
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.focusflow.models import Workspace
+from apps.focusflow.services.export import RESOURCES, export_chunks, write_xlsx
+
+
+class Command(BaseCommand):
+    help = "Stream a workspace's messages, conversations, annotations and tasks to NDJSON, CSV or XLSX."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workspace", type=int, required=True, help="Workspace ID to export")
+        parser.add_argument(
+            "--resource",
+            action="append",
+            choices=list(RESOURCES),
+            help="Resource to export (repeatable; default: all). CSV takes exactly one",
+        )
+        parser.add_argument("--format", choices=["ndjson", "csv", "xlsx"], default="ndjson")
+        parser.add_argument("--gzip", action="store_true", help="Gzip the output (ndjson / csv)")
+        parser.add_argument("--output", "-o", default="-", help="File to write (default: stdout)")
+
+    def handle(self, *args, **opts):
+        workspace_id = opts["workspace"]
+        if not Workspace.objects.filter(pk=workspace_id).exists():
+            raise CommandError(f"Workspace {workspace_id} not found")
+        resources = opts["resource"] or list(RESOURCES)
+        output = opts["output"]
+
+        if opts["format"] == "xlsx":
+            if output == "-":
+                raise CommandError("--format xlsx needs --output <file>")
+            try:
+                written = write_xlsx(output, workspace_id, resources)
+            except ImportError:
+                raise CommandError("--format xlsx needs openpyxl (pip install openpyxl)")
+            summary = ", ".join(f"{name}={n}" for name, n in written.items())
+            self.stderr.write(self.style.SUCCESS(f"All done! Rows written: {summary}"))
+            return
+
+        try:
+            chunks = export_chunks(workspace_id, resources, opts["format"], compress=opts["gzip"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if output == "-":
+            size = self._write(sys.stdout.buffer, chunks)
+        else:
+            with open(output, "wb") as fh:
+                size = self._write(fh, chunks)
+        # progress goes to stderr so stdout stays a clean export stream
+        self.stderr.write(self.style.SUCCESS(f"All done! Exported {', '.join(resources)} ({size} bytes)"))
+
+    @staticmethod
+    def _write(fh, chunks) -> int:
+        size = 0
+        for chunk in chunks:
+            fh.write(chunk)
+            size += len(chunk)
+        fh.flush()
+        return size
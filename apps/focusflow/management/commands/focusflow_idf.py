@@ -0,0 +1,24 @@
+"""
+Management command: rebuild the FocusFlow TF-IDF term statistics
+----------------------------------------------------------------
+
+Usage examples:
+  python manage.py focusflow_idf
+  python manage.py focusflow_idf --workspace 3
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.focusflow.services.tfidf import rebuild_idf
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-workspace document frequencies used by the tfidf summary scorer."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workspace", type=int, help="Only rebuild this workspace")
+
+    def handle(self, *args, **opts):
+        self.stdout.write("Counting terms over message search documents ...")
+        counted = rebuild_idf(workspace_id=opts["workspace"])
+        self.stdout.write(self.style.SUCCESS(f"All done! {counted} messages counted"))
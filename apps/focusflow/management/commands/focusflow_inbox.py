@@ -0,0 +1,24 @@
+"""
+Management command: rebuild the FocusFlow inbox projection
+----------------------------------------------------------
+
+Usage examples:
+  python manage.py focusflow_inbox
+  python manage.py focusflow_inbox --workspace 3
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.focusflow.services.inbox import rebuild_inbox
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized inbox rows behind /api/inbox/."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workspace", type=int, help="Only rebuild this workspace")
+
+    def handle(self, *args, **opts):
+        self.stdout.write("Rebuilding inbox rows ...")
+        written = rebuild_inbox(workspace_id=opts["workspace"])
+        self.stdout.write(self.style.SUCCESS(f"All done! {written} inbox rows written"))
@@ -0,0 +1,48 @@
+"""
+Management command: rebuild FocusFlow analytics rollups
+-------------------------------------------------------
+
+Usage examples:
+  python manage.py focusflow_rollups --days 30
+  python manage.py focusflow_rollups --start 2025-01-01 --end 2025-12-31
+  python manage.py focusflow_rollups --start 2025-01-01 --workspace 3
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from apps.focusflow.services.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily stream / sender / priority rollups for a date range."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First day to rebuild (YYYY-MM-DD)")
+        parser.add_argument("--end", help="Last day to rebuild (YYYY-MM-DD, default: today)")
+        parser.add_argument("--days", type=int, default=30, help="Rebuild the last N days when --start is omitted")
+        parser.add_argument("--workspace", type=int, help="Only rebuild this workspace")
+
+    def handle(self, *args, **opts):
+        end = self._date(opts["end"], "--end") if opts["end"] else timezone.localdate()
+        if opts["start"]:
+            start = self._date(opts["start"], "--start")
+        else:
+            start = end - timedelta(days=max(opts["days"], 1) - 1)
+        if start > end:
+            raise CommandError("--start must not be after --end")
+
+        self.stdout.write(f"Rebuilding rollups for {start} … {end} ...")
+        written = rebuild_rollups(start, end, workspace_id=opts["workspace"])
+        summary = ", ".join(f"{table}={n}" for table, n in written.items())
+        self.stdout.write(self.style.SUCCESS(f"All done! Rows written: {summary}"))
+
+    @staticmethod
+    def _date(value: str, flag: str):
+        parsed = parse_date(value)
+        if parsed is None:
+            raise CommandError(f"{flag} must be a date (YYYY-MM-DD), got {value!r}")
+        return parsed
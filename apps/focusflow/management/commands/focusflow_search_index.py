@@ -0,0 +1,39 @@
+"""
+Management command: (re)build the FocusFlow full-text search index
+------------------------------------------------------------------
+
+Usage examples:
+  python manage.py focusflow_search_index
+  python manage.py focusflow_search_index --workspace 3
+  python manage.py focusflow_search_index --missing-only
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.focusflow.models import Message
+from apps.focusflow.services.search import INDEX_BATCH, index_messages
+
+
+class Command(BaseCommand):
+    help = "Write (or refresh) the search documents behind ?q= for FocusFlow messages."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workspace", type=int, help="Only index this workspace")
+        parser.add_argument(
+            "--missing-only", action="store_true", help="Skip messages that already have a search document"
+        )
+
+    def handle(self, *args, **opts):
+        qs = Message.objects.order_by("id")
+        if opts["workspace"]:
+            qs = qs.filter(conversation__workspace_id=opts["workspace"])
+        if opts["missing_only"]:
+            qs = qs.filter(search_document__isnull=True)
+
+        ids = list(qs.values_list("id", flat=True))
+        self.stdout.write(f"Indexing {len(ids)} messages ...")
+        written = 0
+        for start in range(0, len(ids), INDEX_BATCH):
+            written += index_messages(ids[start : start + INDEX_BATCH])
+            self.stdout.write(f"→ {written}/{len(ids)} indexed")
+        self.stdout.write(self.style.SUCCESS(f"All done! {written} search documents written"))
@@ -11,6 +11,8 @@ from apps.focusflow.models import (
     Task,
     Integration,
 )
+from apps.focusflow.services.inbox import refresh_inbox
+from apps.focusflow.services.search import index_messages
 
 User = get_user_model()
 
@@ -88,6 +90,10 @@ class Command(BaseCommand):
             sent_at=timezone.now(),
         )
 
+        # --- search index (seeded rows bypass the ingest pipeline) ---
+        index_messages(Message.objects.filter(stream=stream).values_list("id", flat=True))
+        refresh_inbox([conv1.pk, conv2.pk])
+
         # --- tasks ---
         Task.objects.get_or_create(
             workspace=workspace,
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:04
+
+from django.db import migrations, models
+
+
+def drop_duplicate_annotations(apps, schema_editor):
+    """Keep the most recently updated row per upsert key so the constraint can be created."""
+    AIAnnotation = apps.get_model("focusflow", "AIAnnotation")
+    seen = set()
+    stale = []
+    rows = AIAnnotation.objects.order_by("-updated_at", "-id").values_list(
+        "id", "workspace_id", "kind", "target_content_type_id", "target_object_id", "model_name"
+    )
+    for pk, *key in rows.iterator():
+        key = tuple(key)
+        if key in seen:
+            stale.append(pk)
+        else:
+            seen.add(key)
+    for start in range(0, len(stale), 500):
+        AIAnnotation.objects.filter(pk__in=stale[start : start + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("focusflow", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_annotations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="aiannotation",
+            constraint=models.UniqueConstraint(
+                fields=("workspace", "kind", "target_content_type", "target_object_id", "model_name"),
+                name="focusflow_aiannotation_upsert_key",
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:05
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def soft_delete_duplicate_open_tasks(apps, schema_editor):
+    """Keep the oldest open task per (workspace, source, title); soft-delete the rest."""
+    Task = apps.get_model("focusflow", "Task")
+    seen = set()
+    stale = []
+    rows = (
+        Task.objects.filter(is_deleted=False)
+        .exclude(status="done")
+        .order_by("created_at", "id")
+        .values_list("id", "workspace_id", "source_content_type_id", "source_object_id", "title")
+    )
+    for pk, *key in rows.iterator():
+        key = tuple(key)
+        if key in seen:
+            stale.append(pk)
+        else:
+            seen.add(key)
+    now = timezone.now()
+    for start in range(0, len(stale), 500):
+        Task.objects.filter(pk__in=stale[start : start + 500]).update(is_deleted=True, deleted_at=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("focusflow", "0002_aiannotation_upsert_key"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(soft_delete_duplicate_open_tasks, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="task",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_deleted", False), models.Q(("status", "done"), _negated=True)),
+                fields=("workspace", "source_content_type", "source_object_id", "title"),
+                name="focusflow_task_open_title_per_source",
+            ),
+        ),
+    ]
@@ -0,0 +1,135 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("focusflow", "0003_task_open_title_per_source"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyPriorityRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "priority",
+                    models.CharField(
+                        choices=[
+                            ("urgent", "Urgent"),
+                            ("action", "Action"),
+                            ("fyi", "FYI"),
+                            ("spam", "Spam"),
+                        ],
+                        max_length=12,
+                    ),
+                ),
+                ("conversation_count", models.IntegerField(default=0)),
+                (
+                    "workspace",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="priority_rollups",
+                        to="focusflow.workspace",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("workspace", "day", "priority")},
+            },
+        ),
+        migrations.CreateModel(
+            name="DailySenderRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("message_count", models.IntegerField(default=0)),
+                (
+                    "contact",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_rollups",
+                        to="focusflow.contact",
+                    ),
+                ),
+                (
+                    "workspace",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sender_rollups",
+                        to="focusflow.workspace",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["workspace", "day"],
+                        name="focusflow_d_workspa_812f0c_idx",
+                    )
+                ],
+                "unique_together": {("contact", "day")},
+            },
+        ),
+        migrations.CreateModel(
+            name="DailyStreamRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("message_count", models.IntegerField(default=0)),
+                (
+                    "stream",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_rollups",
+                        to="focusflow.stream",
+                    ),
+                ),
+                (
+                    "workspace",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stream_rollups",
+                        to="focusflow.workspace",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["workspace", "day"],
+                        name="focusflow_d_workspa_a2d4b7_idx",
+                    )
+                ],
+                "unique_together": {("stream", "day")},
+            },
+        ),
+    ]
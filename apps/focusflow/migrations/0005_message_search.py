@@ -0,0 +1,183 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:17
+
+import html
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+DOC_TABLE = "focusflow_messagesearchdocument"
+FTS_TABLE = "focusflow_message_fts"
+
+SQLITE_FORWARD = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        subject, body, content='{DOC_TABLE}', content_rowid='message_id', tokenize='porter unicode61'
+    )
+    """,
+    # Subject hits weigh double; search queries order by the `rank` column
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(2.0, 1.0)')",
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, subject, body) VALUES (new.message_id, new.subject, new.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, subject, body)
+        VALUES ('delete', old.message_id, old.subject, old.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, subject, body)
+        VALUES ('delete', old.message_id, old.subject, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, subject, body) VALUES (new.message_id, new.subject, new.body);
+    END
+    """,
+]
+SQLITE_BACKWARD = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+POSTGRES_FORWARD = [
+    f"""
+    CREATE INDEX focusflow_msd_fts_gin ON {DOC_TABLE}
+    USING GIN (to_tsvector('english', coalesce(subject, '') || ' ' || coalesce(body, '')))
+    """,
+]
+POSTGRES_BACKWARD = ["DROP INDEX IF EXISTS focusflow_msd_fts_gin"]
+
+RE_TAGS = re.compile(r"<[^>]+>")
+RE_WHITESPACE = re.compile(r"\s+")
+
+
+def _run(schema_editor, statements):
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        # SQLite builds without FTS5 keep working: services/search.py falls back to LIKE
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            has_fts5 = bool(cursor.fetchone()[0])
+        if has_fts5:
+            _run(schema_editor, SQLITE_FORWARD)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _run(schema_editor, SQLITE_BACKWARD)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_BACKWARD)
+
+
+def backfill_documents(apps, schema_editor):
+    Message = apps.get_model("focusflow", "Message")
+    MessageSearchDocument = apps.get_model("focusflow", "MessageSearchDocument")
+    rows = Message.objects.values_list(
+        "id",
+        "conversation__workspace_id",
+        "conversation_id",
+        "stream_id",
+        "conversation__subject",
+        "text",
+        "html",
+    )
+    batch = []
+    for (
+        pk,
+        workspace_id,
+        conversation_id,
+        stream_id,
+        subject,
+        text,
+        markup,
+    ) in rows.iterator(chunk_size=1000):
+        body = (text or "").strip() or RE_WHITESPACE.sub(
+            " ", RE_TAGS.sub(" ", html.unescape(markup or ""))
+        ).strip()
+        batch.append(
+            MessageSearchDocument(
+                message_id=pk,
+                workspace_id=workspace_id,
+                conversation_id=conversation_id,
+                stream_id=stream_id,
+                subject=subject or "",
+                body=body,
+            )
+        )
+        if len(batch) == 1000:
+            MessageSearchDocument.objects.bulk_create(batch)
+            batch = []
+    MessageSearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("focusflow", "0004_daily_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MessageSearchDocument",
+            fields=[
+                (
+                    "message",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="focusflow.message",
+                    ),
+                ),
+                ("subject", models.CharField(blank=True, max_length=300)),
+                ("body", models.TextField(blank=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "conversation",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_documents",
+                        to="focusflow.conversation",
+                    ),
+                ),
+                (
+                    "stream",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="focusflow.stream",
+                    ),
+                ),
+                (
+                    "workspace",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="focusflow.workspace",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["workspace", "conversation"],
+                        name="focusflow_m_workspa_e0167c_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
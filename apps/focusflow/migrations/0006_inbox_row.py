@@ -0,0 +1,87 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("focusflow", "0005_message_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InboxRow",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("stream_name", models.CharField(blank=True, max_length=190)),
+                ("subject", models.CharField(blank=True, max_length=300)),
+                (
+                    "state",
+                    models.CharField(
+                        choices=[
+                            ("open", "Open"),
+                            ("snoozed", "Snoozed"),
+                            ("archived", "Archived"),
+                        ],
+                        default="open",
+                        max_length=12,
+                    ),
+                ),
+                ("last_message_at", models.DateTimeField(blank=True, null=True)),
+                ("unread_count", models.PositiveIntegerField(default=0)),
+                ("snippet", models.CharField(blank=True, max_length=240)),
+                ("sender_name", models.CharField(blank=True, max_length=190)),
+                ("priority_label", models.CharField(blank=True, max_length=12)),
+                ("priority_score", models.FloatField(blank=True, null=True)),
+                ("summary", models.TextField(blank=True)),
+                ("tag_slugs", models.JSONField(blank=True, default=list)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "conversation",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inbox_row",
+                        to="focusflow.conversation",
+                    ),
+                ),
+                (
+                    "stream",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="focusflow.stream",
+                    ),
+                ),
+                (
+                    "workspace",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inbox_rows",
+                        to="focusflow.workspace",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["workspace", "-last_message_at", "-id"],
+                        name="focusflow_inbox_recent",
+                    ),
+                    models.Index(
+                        fields=["workspace", "state", "-last_message_at"],
+                        name="focusflow_inbox_state",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("focusflow", "0006_inbox_row"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="workspace",
+            name="settings_json",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("focusflow", "0007_workspace_settings"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WorkspaceIDF",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("document_count", models.PositiveIntegerField(default=0)),
+                ("doc_freq", models.JSONField(blank=True, default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "workspace",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="idf",
+                        to="focusflow.workspace",
+                    ),
+                ),
+            ],
+        ),
+    ]
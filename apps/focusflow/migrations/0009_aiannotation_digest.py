@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("focusflow", "0008_workspace_idf"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="aiannotation",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("summary", "Summary"),
+                    ("priority", "Priority"),
+                    ("sentiment", "Sentiment"),
+                    ("entities", "Entities"),
+                    ("action_items", "Action Items"),
+                    ("digest", "Message Digest"),
+                    ("other", "Other"),
+                ],
+                default="summary",
+                max_length=24,
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("focusflow", "0009_aiannotation_digest"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MessageSignature",
+            fields=[
+                (
+                    "message",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="signature",
+                        serialize=False,
+                        to="focusflow.message",
+                    ),
+                ),
+                ("simhash", models.BigIntegerField()),
+                ("band_0", models.IntegerField()),
+                ("band_1", models.IntegerField()),
+                ("band_2", models.IntegerField()),
+                ("band_3", models.IntegerField()),
+                (
+                    "duplicate_of",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="near_duplicates",
+                        to="focusflow.message",
+                    ),
+                ),
+                (
+                    "workspace",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="focusflow.workspace",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["workspace", "band_0"],
+                        name="focusflow_m_workspa_d818a3_idx",
+                    ),
+                    models.Index(
+                        fields=["workspace", "band_1"],
+                        name="focusflow_m_workspa_660485_idx",
+                    ),
+                    models.Index(
+                        fields=["workspace", "band_2"],
+                        name="focusflow_m_workspa_d92d5f_idx",
+                    ),
+                    models.Index(
+                        fields=["workspace", "band_3"],
+                        name="focusflow_m_workspa_ef46bd_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
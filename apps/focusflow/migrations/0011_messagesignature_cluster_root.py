@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-17 09:12
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+
+def fill_cluster_roots(apps, schema_editor):
+    MessageSignature = apps.get_model("focusflow", "MessageSignature")
+    MessageSignature.objects.update(cluster_root=Coalesce(F("duplicate_of_id"), F("message_id")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("focusflow", "0010_message_signature"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="messagesignature",
+            name="cluster_root",
+            field=models.BigIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_cluster_roots, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="messagesignature",
+            index=models.Index(fields=["cluster_root", "message"], name="focusflow_m_cluster_f1e259_idx"),
+        ),
+    ]
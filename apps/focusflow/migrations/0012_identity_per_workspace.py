@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-17 05:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_contact_workspaces(apps, schema_editor):
+    Contact = apps.get_model("focusflow", "Contact")
+    Identity = apps.get_model("focusflow", "Identity")
+    Identity.objects.update(
+        workspace_id=Subquery(Contact.objects.filter(pk=OuterRef("contact_id")).values("workspace_id")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("focusflow", "0011_messagesignature_cluster_root"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="identity",
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name="identity",
+            name="workspace",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The contact's workspace (null = global contact): one address is one person per workspace",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="focusflow.workspace",
+            ),
+        ),
+        migrations.RunPython(copy_contact_workspaces, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="identity",
+            constraint=models.UniqueConstraint(
+                fields=("workspace", "kind", "normalized_value"),
+                name="focusflow_identity_per_workspace",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="identity",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("workspace__isnull", True)),
+                fields=("kind", "normalized_value"),
+                name="focusflow_identity_global",
+            ),
+        ),
+    ]
@@ -38,6 +38,8 @@ class Workspace(TimeStampedModel, SoftDeleteMixin):
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name="owned_workspaces"
     )
+    # Per-workspace tuning, e.g. {"keywords": {...}} for the summarizer (services/keywords.py)
+    settings_json = models.JSONField(default=dict, blank=True)
 
     class Meta:
         indexes = [
@@ -186,12 +188,26 @@ class Identity(TimeStampedModel):
         OTHER = "other", "Other"
 
     contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name="identities")
+    workspace = models.ForeignKey(
+        Workspace, on_delete=models.CASCADE, related_name="+", null=True, blank=True,
+        help_text="The contact's workspace (null = global contact): one address is one person per workspace"
+    )
     kind = models.CharField(max_length=24, choices=Kind.choices)
     value = models.CharField(max_length=190)
     normalized_value = models.CharField(max_length=190)
 
     class Meta:
-        unique_together = [("kind", "normalized_value")]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["workspace", "kind", "normalized_value"], name="focusflow_identity_per_workspace"
+            ),
+            # NULLs never collide in the constraint above, so global identities get their own
+            models.UniqueConstraint(
+                fields=["kind", "normalized_value"],
+                condition=models.Q(workspace__isnull=True),
+                name="focusflow_identity_global",
+            ),
+        ]
         indexes = [models.Index(fields=["contact", "kind"])]
 
     def __str__(self) -> str:
@@ -295,6 +311,60 @@ class Message(TimeStampedModel, SoftDeleteMixin):
         return (self.html or self.text or "")[:60]
 
 
+class MessageSearchDocument(models.Model):
+    """
+    Search copy of a message: stripped body + conversation subject. Backed by an FTS5 table
+    (SQLite) or a GIN expression index (Postgres) created in migration 0005; see services/search.py.
+    """
+    message = models.OneToOneField(
+        Message, on_delete=models.CASCADE, primary_key=True, related_name="search_document"
+    )
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name="+")
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name="search_documents")
+    stream = models.ForeignKey(Stream, on_delete=models.CASCADE, related_name="+")
+    subject = models.CharField(max_length=300, blank=True)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["workspace", "conversation"])]
+
+    def __str__(self) -> str:
+        return f"search:{self.message_id}"
+
+
+class MessageSignature(models.Model):
+    """
+    SimHash of a message body for near-duplicate detection, split into LSH bands (one indexed
+    column each) so candidates are found by exact band lookups; see services/dedup.py.
+    `duplicate_of` points at the oldest message of the near-duplicate cluster (null for that one);
+    `cluster_root` is that message's id, or the message's own, so collapsing is one indexed GROUP BY.
+    """
+    message = models.OneToOneField(Message, on_delete=models.CASCADE, primary_key=True, related_name="signature")
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name="+")
+    simhash = models.BigIntegerField()          # 64 bits, stored signed
+    band_0 = models.IntegerField()
+    band_1 = models.IntegerField()
+    band_2 = models.IntegerField()
+    band_3 = models.IntegerField()
+    duplicate_of = models.ForeignKey(
+        Message, null=True, blank=True, on_delete=models.SET_NULL, related_name="near_duplicates"
+    )
+    cluster_root = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["cluster_root", "message"]),
+            models.Index(fields=["workspace", "band_0"]),
+            models.Index(fields=["workspace", "band_1"]),
+            models.Index(fields=["workspace", "band_2"]),
+            models.Index(fields=["workspace", "band_3"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"simhash:{self.message_id}"
+
+
 class MessageRecipient(models.Model):
     class RType(models.TextChoices):
         TO = "to", "To"
@@ -385,6 +455,7 @@ class AIAnnotation(TimeStampedModel):
         SENTIMENT = "sentiment", "Sentiment"
         ENTITIES = "entities", "Entities"
         ACTION_ITEMS = "action_items", "Action Items"
+        DIGEST = "digest", "Message Digest"      # cached per-message input of incremental summaries
         OTHER = "other", "Other"
 
     workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name="ai_annotations")
@@ -405,6 +476,12 @@ class AIAnnotation(TimeStampedModel):
             models.Index(fields=["target_content_type", "target_object_id"]),
             models.Index(fields=["kind"]),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["workspace", "kind", "target_content_type", "target_object_id", "model_name"],
+                name="focusflow_aiannotation_upsert_key",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.kind} on {self.target_content_type_id}:{self.target_object_id}"
@@ -442,6 +519,116 @@ class Task(TimeStampedModel, SoftDeleteMixin):
             models.Index(fields=["due_at"]),
             models.Index(fields=["assignee"]),
         ]
+        constraints = [
+            # At most one open task per title and source, so concurrent annotators can't race
+            models.UniqueConstraint(
+                fields=["workspace", "source_content_type", "source_object_id", "title"],
+                condition=models.Q(is_deleted=False) & ~models.Q(status="done"),
+                name="focusflow_task_open_title_per_source",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return self.title
+
+
+# ---------------------------
+# Analytics rollups (maintained by services/rollups.py)
+# ---------------------------
+
+class DailyStreamRollup(models.Model):
+    """Messages per stream per (local) day of `sent_at`."""
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name="stream_rollups")
+    stream = models.ForeignKey(Stream, on_delete=models.CASCADE, related_name="daily_rollups")
+    day = models.DateField()
+    message_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [("stream", "day")]
+        indexes = [models.Index(fields=["workspace", "day"])]
+
+    def __str__(self) -> str:
+        return f"{self.stream_id}@{self.day}: {self.message_count}"
+
+
+class DailySenderRollup(models.Model):
+    """Messages sent by each contact per (local) day of `sent_at`."""
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name="sender_rollups")
+    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name="daily_rollups")
+    day = models.DateField()
+    message_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [("contact", "day")]
+        indexes = [models.Index(fields=["workspace", "day"])]
+
+    def __str__(self) -> str:
+        return f"{self.contact_id}@{self.day}: {self.message_count}"
+
+
+class DailyPriorityRollup(models.Model):
+    """
+    Conversations per AI priority label, bucketed by the (local) day the conversation was created.
+    Re-annotation moves a conversation between labels, so summing over days gives the current mix.
+    """
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name="priority_rollups")
+    day = models.DateField()
+    priority = models.CharField(max_length=12, choices=Conversation.Priority.choices)
+    conversation_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [("workspace", "day", "priority")]
+
+    def __str__(self) -> str:
+        return f"{self.workspace_id}@{self.day} {self.priority}: {self.conversation_count}"
+
+
+# ---------------------------
+# Inbox projection (maintained by services/inbox.py)
+# ---------------------------
+
+class InboxRow(models.Model):
+    """
+    One denormalized row per live conversation: everything the inbox list shows (latest message
+    snippet and sender, AI priority and summary, tags), so a page is one range scan of
+    (workspace, -last_message_at) with no joins.
+    """
+    conversation = models.OneToOneField(Conversation, on_delete=models.CASCADE, related_name="inbox_row")
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name="inbox_rows")
+    stream = models.ForeignKey(Stream, on_delete=models.CASCADE, related_name="+")
+    stream_name = models.CharField(max_length=190, blank=True)
+    subject = models.CharField(max_length=300, blank=True)
+    state = models.CharField(max_length=12, choices=Conversation.State.choices, default=Conversation.State.OPEN)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    unread_count = models.PositiveIntegerField(default=0)
+    snippet = models.CharField(max_length=240, blank=True)
+    sender_name = models.CharField(max_length=190, blank=True)
+    priority_label = models.CharField(max_length=12, blank=True)
+    priority_score = models.FloatField(null=True, blank=True)
+    summary = models.TextField(blank=True)
+    tag_slugs = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["workspace", "-last_message_at", "-id"], name="focusflow_inbox_recent"),
+            models.Index(fields=["workspace", "state", "-last_message_at"], name="focusflow_inbox_state"),
+        ]
+
+    def __str__(self) -> str:
+        return f"inbox:{self.conversation_id}"
+
+
+class WorkspaceIDF(models.Model):
+    """
+    Document frequencies behind the TF-IDF summary scorer: how many messages of the workspace were
+    counted and, per term, how many of them contain it. Kept incrementally by the ingest pipeline
+    and capped to the most common terms; see services/tfidf.py.
+    """
+    workspace = models.OneToOneField(Workspace, on_delete=models.CASCADE, related_name="idf")
+    document_count = models.PositiveIntegerField(default=0)
+    doc_freq = models.JSONField(default=dict, blank=True)   # {term: messages containing it}
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
-        return self.title
\ No newline at end of file
+        return f"idf:{self.workspace_id} ({self.document_count} docs)"
@@ -0,0 +1,191 @@
+# apps/focusflow/services/dedup.py
+"""
+Near-duplicate message detection (newsletters, CI notifications, forwarded chains).
+
+- Every message body with enough content gets a 64-bit SimHash over its words (stopwords removed,
+  weighted by count, digit runs folded so issue / build / order numbers don't count), stored in
+  `MessageSignature` by the ingest pipeline
+- Near-duplicate = at most FOCUSFLOW_NEAR_DUPLICATE_BITS (default 3) differing bits. The hash is
+  split into 4 bands of 16 bits, one indexed column each: two hashes within 3 bits agree on at
+  least one whole band, so candidates come from exact (workspace, band) lookups, one query per
+  chunk, instead of comparing against every message
+- `duplicate_of` points at the oldest message of the cluster; the summarizer reuses that
+  message's annotations. `cluster_root` repeats it (or the message's own id) as an indexed,
+  non-null column, so `/api/messages/?collapse=duplicates` shows one row per cluster
+- `rebuild_signatures()` / `manage.py focusflow_dedup` recomputes them from the search documents
+
+Usage
+-----
+from apps.focusflow.services.dedup import sign_messages, duplicate_sources
+sign_messages(workspace.pk, [(message.pk, body), ...])
+duplicate_sources([message.pk])   # {message id: oldest near-duplicate id}
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from hashlib import blake2b
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from ..models import MessageSearchDocument, MessageSignature
+from .tfidf import content_terms
+
+SIGNATURE_BITS = 64
+BANDS = 4
+BAND_BITS = SIGNATURE_BITS // BANDS
+DEFAULT_MAX_DISTANCE = BANDS - 1      # the most the bands can guarantee to find
+DEFAULT_MIN_TERMS = 8                 # shorter bodies ("thanks!", "ok") are left alone
+REBUILD_BATCH = 1000
+RE_DIGITS = re.compile(r"\d+")
+
+# SimHash adds ±weight per bit for every feature. Instead of 64 additions per feature, each
+# feature hash is spread into 64 lanes of one big integer (byte-wise table lookups), so a single
+# big-int addition per feature accumulates all 64 per-bit totals at once.
+_LANE = 32
+_LANE_MASK = (1 << _LANE) - 1
+_SPREAD = [
+    [sum(1 << ((8 * j + b) * _LANE) for b in range(8) if byte >> b & 1) for byte in range(256)]
+    for j in range(8)
+]
+
+
+def simhash(text: str) -> Optional[int]:
+    """Unsigned 64-bit SimHash of `text`, or None when it has too few content words to compare."""
+    terms = [RE_DIGITS.sub("0", term) for term in content_terms(text)]
+    if len(terms) < getattr(settings, "FOCUSFLOW_NEAR_DUPLICATE_MIN_TERMS", DEFAULT_MIN_TERMS):
+        return None
+    lanes = total = 0
+    for term, weight in Counter(terms).items():
+        h = int.from_bytes(blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+        lanes += weight * sum(_SPREAD[j][h >> (8 * j) & 0xFF] for j in range(8))
+        total += weight
+    signature = 0
+    for bit in range(SIGNATURE_BITS):
+        if 2 * (lanes >> (bit * _LANE) & _LANE_MASK) > total:   # set in the (weighted) majority
+            signature |= 1 << bit
+    return signature
+
+
+def bands(signature: int) -> Tuple[int, ...]:
+    return tuple(signature >> (BAND_BITS * i) & ((1 << BAND_BITS) - 1) for i in range(BANDS))
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _signed(value: int) -> int:
+    return value - (1 << SIGNATURE_BITS) if value >> (SIGNATURE_BITS - 1) else value
+
+
+def _unsigned(value: int) -> int:
+    return value & ((1 << SIGNATURE_BITS) - 1)
+
+
+# -------------------------
+# Writing signatures
+# -------------------------
+
+def sign_messages(workspace_id: int, bodies: Iterable[Tuple[int, str]]) -> List[MessageSignature]:
+    """
+    Sign these (message id, stripped body) pairs, newest ids last, and link each to the oldest
+    near-duplicate already stored or earlier in the same call. Returns the rows written.
+    """
+    max_distance = getattr(settings, "FOCUSFLOW_NEAR_DUPLICATE_BITS", DEFAULT_MAX_DISTANCE)
+    signed = [(pk, sig) for pk, sig in ((pk, simhash(body)) for pk, body in sorted(bodies)) if sig is not None]
+    if not signed:
+        return []
+
+    # LSH buckets: band index → band value → [(message id, signature, cluster root)]
+    buckets: List[Dict[int, List[Tuple[int, int, int]]]] = [{} for _ in range(BANDS)]
+    lookups = [set() for _ in range(BANDS)]
+    for _, sig in signed:
+        for i, value in enumerate(bands(sig)):
+            lookups[i].add(value)
+    candidates = Q()
+    for i, values in enumerate(lookups):
+        candidates |= Q(**{f"band_{i}__in": list(values)})
+    stored = (
+        MessageSignature.objects.filter(candidates, workspace_id=workspace_id)
+        .exclude(message_id__in=[pk for pk, _ in signed])
+        .values_list("message_id", "simhash", "duplicate_of_id")
+    )
+    for pk, sig, root in stored:
+        _add(buckets, pk, _unsigned(sig), root or pk)
+
+    rows = []
+    for pk, sig in signed:
+        best = None
+        for i, value in enumerate(bands(sig)):
+            for _, other, other_root in buckets[i].get(value, ()):
+                distance = hamming(sig, other)
+                if distance <= max_distance and (best is None or (distance, other_root) < best):
+                    best = (distance, other_root)
+        root = best[1] if best else None
+        _add(buckets, pk, sig, root or pk)
+        rows.append(
+            MessageSignature(
+                message_id=pk,
+                workspace_id=workspace_id,
+                simhash=_signed(sig),
+                duplicate_of_id=root,
+                cluster_root=root or pk,
+                **{f"band_{i}": value for i, value in enumerate(bands(sig))},
+            )
+        )
+    MessageSignature.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["message"],
+        update_fields=["simhash", "duplicate_of", "cluster_root", *(f"band_{i}" for i in range(BANDS))],
+    )
+    return rows
+
+
+def _add(buckets, pk: int, sig: int, root: int) -> None:
+    for i, value in enumerate(bands(sig)):
+        buckets[i].setdefault(value, []).append((pk, sig, root))
+
+
+def rebuild_signatures(workspace_id: Optional[int] = None) -> int:
+    """Recompute every signature (of one workspace) from the search documents of live messages."""
+    scope = MessageSignature.objects.all()
+    docs = MessageSearchDocument.objects.filter(message__is_deleted=False)
+    if workspace_id is not None:
+        scope = scope.filter(workspace_id=workspace_id)
+        docs = docs.filter(workspace_id=workspace_id)
+    written = 0
+    with transaction.atomic():
+        scope.delete()
+        batch: Dict[int, List[Tuple[int, str]]] = {}
+        rows = docs.order_by("message_id").values_list("workspace_id", "message_id", "body")
+        for n, (ws_id, pk, body) in enumerate(rows.iterator(chunk_size=REBUILD_BATCH), 1):
+            batch.setdefault(ws_id, []).append((pk, body))
+            if n % REBUILD_BATCH == 0:
+                written += _flush(batch)
+        written += _flush(batch)
+    return written
+
+
+def _flush(batch: Dict[int, List[Tuple[int, str]]]) -> int:
+    written = sum(len(sign_messages(ws_id, bodies)) for ws_id, bodies in batch.items())
+    batch.clear()
+    return written
+
+
+# -------------------------
+# Lookups
+# -------------------------
+
+def duplicate_sources(message_ids: Iterable[int]) -> Dict[int, int]:
+    """{message id: id of the live message it near-duplicates} for those that have one."""
+    return dict(
+        MessageSignature.objects.filter(
+            message_id__in=list(message_ids), duplicate_of__isnull=False, duplicate_of__is_deleted=False
+        ).values_list("message_id", "duplicate_of_id")
+    )
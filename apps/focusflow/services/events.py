@@ -0,0 +1,237 @@
+# apps/focusflow/services/events.py
+"""
+Live inbox events (Server-Sent Events) with a pluggable pub/sub broker.
+
+- Writers publish through `publish_on_commit()`, so subscribers only ever hear about rows that
+  are really in the database: ingest emits `message.created` / `conversation.updated`, the
+  summarizer emits `annotation.created`
+- The default `InMemoryBroker` keeps, per workspace, a bounded ring buffer of recent events (for
+  `Last-Event-ID` replay) and a set of subscriptions; swap it via FOCUSFLOW_EVENT_BACKEND
+  (dotted path) for a cross-process backend, or for a local stand-in in tests
+- Each connection owns a capped queue: a client that falls too far behind is disconnected and
+  resumes from the ring buffer with `Last-Event-ID`, so slow or idle dashboards cost bounded memory
+- Streaming is off unless FOCUSFLOW_LIVE_EVENTS is set, the request is served over ASGI and the
+  broker is cross-process (`live_events_available()`): under WSGI the stream never flushes and
+  pins a worker, and a process-local broker never hears commands or other workers. A deployment
+  that runs everything in one ASGI process opts in to the in-memory broker with
+  FOCUSFLOW_LIVE_EVENTS_SINGLE_PROCESS. Dashboards keep polling the delta feed either way
+
+Usage
+-----
+from apps.focusflow.services.events import publish_on_commit
+publish_on_commit(workspace.pk, "conversation.updated", {"id": conv.pk})
+
+# ASGI view (see api.events_stream):
+StreamingHttpResponse(event_stream(workspace_id, last_event_id), content_type="text/event-stream")
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Deque, Dict, List, Optional, Set
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = "apps.focusflow.services.events.InMemoryBroker"
+DEFAULT_RING_SIZE = 500        # events kept per workspace for Last-Event-ID replay
+DEFAULT_QUEUE_SIZE = 100       # undelivered events per connection before it is dropped
+DEFAULT_KEEPALIVE = 15         # seconds between comment pings on an idle stream
+RETRY_MS = 3000                # client reconnect delay hint
+
+MESSAGE_CREATED = "message.created"
+CONVERSATION_UPDATED = "conversation.updated"
+ANNOTATION_CREATED = "annotation.created"
+RESET = "reset"                # replay impossible (event aged out): client should refetch
+
+
+@dataclass
+class Event:
+    id: int
+    type: str
+    data: dict
+
+    def encode(self) -> bytes:
+        payload = json.dumps(self.data, separators=(",", ":"), default=str)
+        return f"id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n".encode()
+
+
+@dataclass(eq=False)
+class Subscription:
+    workspace_id: int
+    loop: asyncio.AbstractEventLoop
+    max_queue: int
+    replay: List[Event] = field(default_factory=list)
+    queue: "asyncio.Queue[Optional[Event]]" = field(default_factory=asyncio.Queue)
+    overflowed: bool = False
+
+    def deliver(self, event: Event) -> None:
+        """Runs on the subscriber's loop. Past the cap: drop the backlog and end the stream."""
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= self.max_queue:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait(event)
+
+    async def get(self) -> Optional[Event]:
+        """Next event, or None once the subscription overflowed."""
+        return await self.queue.get()
+
+
+# -------------------------
+# Brokers
+# -------------------------
+
+class EventBroker:
+    """Interface: publish from any thread, subscribe from an event loop."""
+
+    cross_process = False       # True when events published by other processes reach subscribers
+
+    def publish(self, workspace_id: int, type: str, data: dict) -> Event:
+        raise NotImplementedError
+
+    def subscribe(self, workspace_id: int, last_event_id: Optional[int] = None) -> Subscription:
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        raise NotImplementedError
+
+
+class InMemoryBroker(EventBroker):
+    """Process-local broker: every subscriber must live in the process that publishes."""
+
+    def __init__(self, *, ring_size: Optional[int] = None, queue_size: Optional[int] = None):
+        self.ring_size = ring_size or getattr(settings, "FOCUSFLOW_EVENT_RING_SIZE", DEFAULT_RING_SIZE)
+        self.queue_size = queue_size or getattr(settings, "FOCUSFLOW_EVENT_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._rings: Dict[int, Deque[Event]] = {}
+        self._last_ids: Dict[int, int] = {}
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+
+    def publish(self, workspace_id: int, type: str, data: dict) -> Event:
+        with self._lock:
+            event_id = self._last_ids.get(workspace_id, 0) + 1
+            self._last_ids[workspace_id] = event_id
+            event = Event(event_id, type, data)
+            self._rings.setdefault(workspace_id, deque(maxlen=self.ring_size)).append(event)
+            subscribers = list(self._subscribers.get(workspace_id, ()))
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.deliver, event)
+            except RuntimeError:        # loop already closed; the stream's cleanup will unsubscribe
+                pass
+        return event
+
+    def subscribe(self, workspace_id: int, last_event_id: Optional[int] = None) -> Subscription:
+        sub = Subscription(workspace_id, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            ring = self._rings.get(workspace_id, ())
+            if last_event_id is not None:
+                oldest = ring[0].id if ring else self._last_ids.get(workspace_id, 0) + 1
+                if last_event_id + 1 < oldest or last_event_id > self._last_ids.get(workspace_id, 0):
+                    # Missed events are gone (or the id is from another process/restart)
+                    sub.replay = [Event(self._last_ids.get(workspace_id, 0), RESET, {})]
+                else:
+                    sub.replay = [e for e in ring if e.id > last_event_id]
+            self._subscribers.setdefault(workspace_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subs = self._subscribers.get(subscription.workspace_id)
+            if subs is not None:
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscribers[subscription.workspace_id]
+
+    def subscriber_count(self, workspace_id: int) -> int:
+        with self._lock:
+            return len(self._subscribers.get(workspace_id, ()))
+
+
+_BROKER: Optional[EventBroker] = None
+
+
+def get_broker() -> EventBroker:
+    global _BROKER
+    if _BROKER is None:
+        _BROKER = import_string(getattr(settings, "FOCUSFLOW_EVENT_BACKEND", DEFAULT_BACKEND))()
+    return _BROKER
+
+
+def set_broker(broker: Optional[EventBroker]) -> None:
+    """Swap the process broker (None: rebuild from settings on next use)."""
+    global _BROKER
+    _BROKER = broker
+
+
+def live_events_available(request) -> bool:
+    """Can this request hold an SSE stream that will actually receive every workspace event?"""
+    return (
+        getattr(settings, "FOCUSFLOW_LIVE_EVENTS", False)
+        and isinstance(request, ASGIRequest)
+        and (get_broker().cross_process or getattr(settings, "FOCUSFLOW_LIVE_EVENTS_SINGLE_PROCESS", False))
+    )
+
+
+# -------------------------
+# Publishing
+# -------------------------
+
+def publish_on_commit(workspace_id: int, type: str, data: dict) -> None:
+    transaction.on_commit(lambda: get_broker().publish(workspace_id, type, data))
+
+
+def publish_many_on_commit(workspace_id: int, events: List[tuple]) -> None:
+    """(type, data) pairs, published in order after the current transaction commits."""
+    if not events:
+        return
+
+    def _publish():
+        broker = get_broker()
+        for type, data in events:
+            broker.publish(workspace_id, type, data)
+
+    transaction.on_commit(_publish)
+
+
+# -------------------------
+# Streaming
+# -------------------------
+
+async def event_stream(
+    workspace_id: int,
+    last_event_id: Optional[int] = None,
+    *,
+    broker: Optional[EventBroker] = None,
+    keepalive: Optional[float] = None,
+) -> AsyncIterator[bytes]:
+    """SSE byte stream for one connection; ends (client reconnects) if the connection overflows."""
+    broker = broker or get_broker()
+    keepalive = keepalive or getattr(settings, "FOCUSFLOW_EVENT_KEEPALIVE", DEFAULT_KEEPALIVE)
+    sub = broker.subscribe(workspace_id, last_event_id)
+    try:
+        yield f"retry: {RETRY_MS}\n\n".encode()
+        for event in sub.replay:
+            yield event.encode()
+        while True:
+            try:
+                event = await asyncio.wait_for(sub.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            if event is None:
+                return
+            yield event.encode()
+    finally:
+        broker.unsubscribe(sub)
@@ -0,0 +1,215 @@
+# apps/focusflow/services/gmail_client.py
+"""
+Gmail REST client tuned for sync workloads.
+
+- One shared `requests.Session` per process (keep-alive, pooled connections, timeouts)
+- Message fetches go through Gmail batch requests: up to 100 `messages.get` calls per
+  multipart POST, with a bounded number of batches in flight at once
+- 429 / 5xx responses (whole request or individual batch parts) are retried with
+  exponential backoff, honouring `Retry-After` when Gmail sends one
+
+Usage
+-----
+from apps.focusflow.services.gmail_client import GmailClient
+client = GmailClient(access_token)
+profile = client.get_json("profile")
+payloads = client.get_messages(["18c...", "18d..."], fmt="metadata")
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from email.parser import BytesParser
+from email.policy import HTTP
+from typing import Dict, Iterable, List, Optional, Sequence
+from urllib.parse import urlencode, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .google_oauth import GMAIL_API_BASE
+
+DEFAULT_TIMEOUT = 15           # seconds per HTTP call
+DEFAULT_MAX_WORKERS = 4        # batches (or single GETs) in flight at once
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BACKOFF = 0.5          # seconds; doubled per attempt, plus jitter
+MAX_BATCH_SIZE = 100           # Gmail's limit for calls per batch request
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_SESSION: Optional[requests.Session] = None
+
+
+def shared_session() -> requests.Session:
+    """Process-wide session so every Gmail call reuses pooled keep-alive connections."""
+    global _SESSION
+    if _SESSION is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=DEFAULT_MAX_WORKERS * 4)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _SESSION = session
+    return _SESSION
+
+
+class GmailApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Gmail API error {status}: {message[:300]}")
+        self.status = status
+
+
+class GmailClient:
+    def __init__(
+        self,
+        access_token: str,
+        *,
+        api_base: str = GMAIL_API_BASE,
+        batch_url: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        batch_size: int = MAX_BATCH_SIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        self.api_base = api_base.rstrip("/")
+        base = urlparse(self.api_base)
+        self.api_path = base.path
+        self.batch_url = batch_url or f"{base.scheme}://{base.netloc}/batch/gmail/v1"
+        self.session = session or shared_session()
+        self.max_workers = max(max_workers, 1)
+        self.batch_size = min(max(batch_size, 1), MAX_BATCH_SIZE)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.headers = {"Authorization": f"Bearer {access_token}"}
+
+    # ------------- Public API -------------
+
+    def get_json(self, path: str, params: Optional[dict] = None) -> dict:
+        res = self._request("GET", f"{self.api_base}/{path}", params=params)
+        if res.status_code != 200:
+            raise GmailApiError(res.status_code, res.text)
+        return res.json()
+
+    def get_messages(self, ids: Sequence[str], fmt: str = "full", *, use_batch: bool = True) -> List[dict]:
+        """
+        Fetch many messages, preserving input order. Messages that no longer exist (404) are
+        dropped; anything still failing after retries raises GmailApiError.
+        """
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return []
+        if use_batch:
+            chunks = [ids[i : i + self.batch_size] for i in range(0, len(ids), self.batch_size)]
+            fetch = lambda chunk: self._fetch_batch(chunk, fmt)  # noqa: E731
+        else:
+            chunks = [[mid] for mid in ids]
+            fetch = lambda chunk: self._fetch_single(chunk[0], fmt)  # noqa: E731
+
+        found: Dict[str, dict] = {}
+        if len(chunks) == 1:
+            found.update(fetch(chunks[0]))
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as pool:
+                for part in pool.map(fetch, chunks):
+                    found.update(part)
+        return [found[mid] for mid in ids if mid in found]
+
+    # ------------- Transport -------------
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        for attempt in range(self.max_retries + 1):
+            try:
+                res = self.session.request(method, url, headers=headers, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                self._sleep(attempt)
+                continue
+            if res.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return res
+            self._sleep(attempt, res.headers.get("Retry-After"))
+        return res
+
+    def _sleep(self, attempt: int, retry_after: Optional[str] = None) -> None:
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            delay = self.backoff * (2 ** attempt)
+        if delay > 0:
+            time.sleep(delay + random.uniform(0, delay / 4))
+
+    def _fetch_single(self, msg_id: str, fmt: str) -> Dict[str, dict]:
+        res = self._request("GET", f"{self.api_base}/messages/{msg_id}", params={"format": fmt})
+        if res.status_code == 404:
+            return {}
+        if res.status_code != 200:
+            raise GmailApiError(res.status_code, res.text)
+        return {msg_id: res.json()}
+
+    def _fetch_batch(self, ids: Sequence[str], fmt: str) -> Dict[str, dict]:
+        found: Dict[str, dict] = {}
+        pending = list(ids)
+        for attempt in range(self.max_retries + 1):
+            boundary = f"batch_{uuid.uuid4().hex}"
+            res = self._request(
+                "POST",
+                self.batch_url,
+                data=self._encode_batch(pending, fmt, boundary),
+                headers={"Content-Type": f"multipart/mixed; boundary={boundary}"},
+            )
+            if res.status_code != 200:
+                raise GmailApiError(res.status_code, res.text)
+
+            retry, last_error = [], None
+            for msg_id, (status, body) in zip(pending, self._decode_batch(res, len(pending))):
+                if status == 200:
+                    found[msg_id] = json.loads(body)
+                elif status in RETRY_STATUSES:
+                    retry.append(msg_id)
+                    last_error = GmailApiError(status, body)
+                elif status != 404:
+                    raise GmailApiError(status, body)
+            if not retry:
+                return found
+            if attempt == self.max_retries:
+                raise last_error
+            pending = retry
+            self._sleep(attempt)
+        return found
+
+    def _encode_batch(self, ids: Iterable[str], fmt: str, boundary: str) -> bytes:
+        query = urlencode({"format": fmt})
+        parts = []
+        for i, msg_id in enumerate(ids):
+            parts.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <item{i}>\r\n\r\n"
+                f"GET {self.api_path}/messages/{msg_id}?{query}\r\n\r\n"
+            )
+        parts.append(f"--{boundary}--\r\n")
+        return "".join(parts).encode()
+
+    @staticmethod
+    def _decode_batch(res: requests.Response, expected: int) -> List[tuple]:
+        """Split a multipart/mixed batch response into (status, body) pairs in request order."""
+        envelope = f"Content-Type: {res.headers.get('Content-Type', '')}\r\n\r\n".encode() + res.content
+        message = BytesParser(policy=HTTP).parsebytes(envelope)
+        results: List[Optional[tuple]] = [None] * expected
+        for part in message.iter_parts():
+            content_id = (part.get("Content-ID") or "").strip("<>")
+            index = int(content_id.rsplit("item", 1)[-1]) if "item" in content_id else None
+            raw = part.get_payload(decode=True) or b""
+            head, _, body = raw.replace(b"\r\n", b"\n").partition(b"\n\n")
+            status_line = head.split(b"\n", 1)[0].decode(errors="replace")
+            status = int(status_line.split()[1]) if len(status_line.split()) > 1 else 500
+            if index is not None and 0 <= index < expected:
+                results[index] = (status, body.decode("utf-8", errors="replace"))
+        # A part Gmail silently omitted is treated as retryable
+        return [r if r is not None else (503, "missing batch part") for r in results]
@@ -8,8 +8,11 @@ from urllib.parse import urlencode
 # Google OAuth 2.0 endpoints
 GOOGLE_AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
 GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
-GOOGLE_USERINFO_URL = "https://www.googleapis.com/gmail/v1/users/me/profile"
-GOOGLE_MESSAGES_URL = "https://www.googleapis.com/gmail/v1/users/me/messages"
+# Gmail REST root; override GMAIL_API_BASE to point at a local fake server
+GMAIL_API_BASE = os.getenv("GMAIL_API_BASE", "https://www.googleapis.com/gmail/v1/users/me")
+GOOGLE_USERINFO_URL = f"{GMAIL_API_BASE}/profile"
+GOOGLE_MESSAGES_URL = f"{GMAIL_API_BASE}/messages"
+REQUEST_TIMEOUT = 15  # seconds
 
 
 def build_auth_url() -> str:
@@ -38,7 +41,7 @@ def exchange_code_for_token(code: str) -> dict:
         "redirect_uri": os.getenv("GOOGLE_REDIRECT_URI"),
         "grant_type": "authorization_code",
     }
-    response = requests.post(GOOGLE_TOKEN_URL, data=data)
+    response = requests.post(GOOGLE_TOKEN_URL, data=data, timeout=REQUEST_TIMEOUT)
     if response.status_code != 200:
         print("Token exchange failed:", response.text)
     return response.json()
@@ -49,7 +52,7 @@ def get_gmail_profile_email(access_token: str) -> str | None:
     Fetch the authenticated user's primary Gmail address.
     """
     headers = {"Authorization": f"Bearer {access_token}"}
-    res = requests.get(GOOGLE_USERINFO_URL, headers=headers)
+    res = requests.get(GOOGLE_USERINFO_URL, headers=headers, timeout=REQUEST_TIMEOUT)
     if res.status_code == 200:
         return res.json().get("emailAddress")
     print("Failed to fetch Gmail profile:", res.text)
@@ -60,32 +63,29 @@ def list_recent_message_headers(access_token: str, max_results: int = 5):
     """
     Retrieve a few recent Gmail message headers for dashboard preview.
     """
-    headers = {"Authorization": f"Bearer {access_token}"}
-    params = {"maxResults": max_results, "labelIds": "INBOX"}
-    res = requests.get(GOOGLE_MESSAGES_URL, headers=headers, params=params)
-    if res.status_code != 200:
-        print("Failed to list messages:", res.text)
+    from .gmail_client import GmailApiError, GmailClient
+
+    client = GmailClient(access_token)
+    try:
+        data = client.get_json("messages", {"maxResults": max_results, "labelIds": "INBOX"})
+        ids = [m.get("id") for m in data.get("messages", [])]
+        payloads = client.get_messages(ids, fmt="metadata")
+    except (GmailApiError, requests.RequestException) as exc:
+        print("Failed to list messages:", exc)
         return []
 
-    data = res.json()
-    messages = data.get("messages", [])
     summaries = []
-
-    for msg in messages:
-        msg_id = msg.get("id")
-        detail = requests.get(f"{GOOGLE_MESSAGES_URL}/{msg_id}", headers=headers, params={"format": "metadata"})
-        if detail.status_code == 200:
-            payload = detail.json()
-            headers_data = payload.get("payload", {}).get("headers", [])
-            subject = next((h["value"] for h in headers_data if h["name"] == "Subject"), "(no subject)")
-            sender = next((h["value"] for h in headers_data if h["name"] == "From"), "(unknown sender)")
-            date = next((h["value"] for h in headers_data if h["name"] == "Date"), "")
-            summaries.append({
-                "source": "email",
-                "sender": sender,
-                "subject": subject,
-                "time": date,
-                "summary": "Fetched from Gmail API.",
-                "actions": [],
-            })
-    return summaries
\ No newline at end of file
+    for payload in payloads:
+        headers_data = payload.get("payload", {}).get("headers", [])
+        subject = next((h["value"] for h in headers_data if h["name"] == "Subject"), "(no subject)")
+        sender = next((h["value"] for h in headers_data if h["name"] == "From"), "(unknown sender)")
+        date = next((h["value"] for h in headers_data if h["name"] == "Date"), "")
+        summaries.append({
+            "source": "email",
+            "sender": sender,
+            "subject": subject,
+            "time": date,
+            "summary": "Fetched from Gmail API.",
+            "actions": [],
+        })
+    return summaries
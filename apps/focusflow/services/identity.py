@@ -0,0 +1,183 @@
+# apps/focusflow/services/identity.py
+"""
+Identity resolution for ingest: (kind, raw value) → Contact id.
+
+- `normalize_identity()` gives every address one canonical `Identity.normalized_value`
+  (emails lower-cased, Gmail dots/+tags folded; phones reduced to +digits), so the
+  (workspace, kind, normalized_value) unique constraint really deduplicates people
+- Identities and contacts are per workspace: the same address seen by two workspaces is two
+  contacts, so one workspace's names and history never show up in another
+- `IdentityResolver` keeps a bounded LRU of resolved keys; per batch it looks up all cache
+  misses with one IN query per kind and bulk-creates Contact + Identity for the rest. Ids enter
+  the cache only once the surrounding transaction commits, so a rolled-back chunk never leaves
+  a long-lived resolver serving contacts that do not exist
+
+Usage
+-----
+from apps.focusflow.services.identity import IdentityResolver
+resolver = IdentityResolver(workspace)
+ids = resolver.resolve_many([("email", "Alice <Alice.Smith+news@gmail.com>", "Alice")])
+ids[("email", "alicesmith@gmail.com")]  # → contact id
+"""
+
+from __future__ import annotations
+
+import re
+from collections import OrderedDict
+from email.utils import parseaddr
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+
+from ..models import Contact, Identity, Workspace
+
+DEFAULT_CACHE_SIZE = 50_000
+
+IdentityKey = Tuple[str, str]   # (Identity.kind, normalized_value)
+
+GMAIL_DOMAINS = {"gmail.com", "googlemail.com"}
+RE_NON_DIGIT = re.compile(r"\D+")
+MAX_VALUE_LEN = 190             # Identity.value / normalized_value max_length
+
+
+# -------------------------
+# Normalizers
+# -------------------------
+
+def normalize_email(value: str) -> str:
+    raw = (value or "").strip()
+    if raw.lower().startswith("mailto:"):
+        raw = raw[7:]
+    if "<" in raw:
+        raw = parseaddr(raw)[1] or raw
+    address = raw.strip().strip("<>").lower()
+    local, sep, domain = address.rpartition("@")
+    if not sep:
+        return address
+    if domain in GMAIL_DOMAINS:
+        # Gmail ignores dots and +tags in the local part: one mailbox, one identity
+        local = local.split("+", 1)[0].replace(".", "")
+        domain = "gmail.com"
+    return f"{local}@{domain}"
+
+
+def normalize_phone(value: str) -> str:
+    raw = (value or "").strip()
+    digits = RE_NON_DIGIT.sub("", raw)
+    if raw.startswith("+"):
+        return f"+{digits}"
+    if digits.startswith("00"):
+        return f"+{digits[2:]}"
+    return digits
+
+
+def normalize_identity(kind: str, value: str) -> str:
+    if kind == Identity.Kind.EMAIL:
+        normalized = normalize_email(value)
+    elif kind in (Identity.Kind.PHONE, Identity.Kind.WHATSAPP):
+        normalized = normalize_phone(value)
+    else:
+        normalized = (value or "").strip().lower()
+    return normalized[:MAX_VALUE_LEN]
+
+
+# -------------------------
+# Resolver
+# -------------------------
+
+class IdentityResolver:
+    def __init__(self, workspace: Workspace, *, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.workspace = workspace
+        self.maxsize = max(maxsize, 1)
+        self._cache: "OrderedDict[IdentityKey, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+
+    def resolve_many(self, addresses: Iterable[Tuple[str, str, str]]) -> Dict[IdentityKey, int]:
+        """(kind, value, display_name) triples → {(kind, normalized_value): contact_id}."""
+        wanted: Dict[IdentityKey, Tuple[str, str]] = {}
+        for kind, value, display_name in addresses:
+            wanted.setdefault((kind, normalize_identity(kind, value)), (value, display_name))
+
+        resolved: Dict[IdentityKey, int] = {}
+        for key in wanted:
+            contact_id = self._get(key)
+            if contact_id is not None:
+                resolved[key] = contact_id
+        self.hits += len(resolved)
+
+        pending = [key for key in wanted if key not in resolved]
+        self.misses += len(pending)
+        if pending:
+            found = self._lookup(pending)
+            unknown = [key for key in pending if key not in found]
+            if unknown:
+                found.update(self._create(unknown, wanted))
+            transaction.on_commit(partial(self._put_many, found))   # immediately outside a transaction
+            resolved.update(found)
+        return resolved
+
+    def resolve(self, kind: str, value: str, display_name: str = "") -> int:
+        return self.resolve_many([(kind, value, display_name)])[(kind, normalize_identity(kind, value))]
+
+    # ------------- Cache -------------
+
+    def _get(self, key: IdentityKey) -> Optional[int]:
+        contact_id = self._cache.get(key)
+        if contact_id is not None:
+            self._cache.move_to_end(key)
+        return contact_id
+
+    def _put_many(self, found: Dict[IdentityKey, int]) -> None:
+        for key, contact_id in found.items():
+            self._put(key, contact_id)
+
+    def _put(self, key: IdentityKey, contact_id: int) -> None:
+        self._cache[key] = contact_id
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    # ------------- Database -------------
+
+    def _lookup(self, keys: Iterable[IdentityKey]) -> Dict[IdentityKey, int]:
+        by_kind: Dict[str, List[str]] = {}
+        for kind, value in keys:
+            by_kind.setdefault(kind, []).append(value)
+        found: Dict[IdentityKey, int] = {}
+        for kind, values in by_kind.items():
+            rows = Identity.objects.filter(
+                workspace=self.workspace, kind=kind, normalized_value__in=values
+            ).values_list("normalized_value", "contact_id")
+            found.update(((kind, value), contact_id) for value, contact_id in rows)
+        return found
+
+    def _create(self, keys: List[IdentityKey], raw: Dict[IdentityKey, Tuple[str, str]]) -> Dict[IdentityKey, int]:
+        contacts = Contact.objects.bulk_create(
+            [
+                Contact(workspace=self.workspace, display_name=(raw[key][1] or raw[key][0])[:MAX_VALUE_LEN])
+                for key in keys
+            ]
+        )
+        Identity.objects.bulk_create(
+            [
+                Identity(
+                    contact=contact,
+                    workspace=self.workspace,
+                    kind=kind,
+                    value=raw[(kind, norm)][0][:MAX_VALUE_LEN],
+                    normalized_value=norm,
+                )
+                for (kind, norm), contact in zip(keys, contacts)
+            ],
+            ignore_conflicts=True,
+        )
+        # A concurrent ingest may have won some identities: keep its contacts, drop ours
+        winners = self._lookup(keys)
+        losers = [c.pk for key, c in zip(keys, contacts) if winners.get(key) != c.pk]
+        if losers:
+            Contact.objects.filter(pk__in=losers).delete()
+        self.created += len(keys) - len(losers)
+        return winners
@@ -0,0 +1,135 @@
+# apps/focusflow/services/inbox.py
+"""
+Denormalized inbox projection (`InboxRow`): one row per live conversation carrying the latest
+message snippet and sender, the AI priority label/score and summary, unread count and tag slugs.
+
+- Refreshed set-wise by `refresh_inbox(conversation_ids)`: a fixed handful of queries per 500
+  conversations (conversations + latest message, annotations, tags, one upsert, one delete)
+- Writers call it where the inputs change: the ingest pipeline per chunk, the summarizer after
+  conversation annotations, and signals (signals.py) for conversation saves and tag changes
+- Deleted conversations lose their row; `rebuild_inbox()` / `manage.py focusflow_inbox`
+  recomputes everything (backfills, repairs, rows written outside those paths)
+
+Usage
+-----
+from apps.focusflow.services.inbox import refresh_inbox
+refresh_inbox([conv.pk for conv in touched])
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Left
+
+from ..models import AIAnnotation, Conversation, ConversationTag, InboxRow, Message
+
+REFRESH_BATCH = 500
+SNIPPET_CHARS = 240
+RE_WHITESPACE = re.compile(r"\s+")
+
+INBOX_UPDATE_FIELDS = [
+    "workspace", "stream", "stream_name", "subject", "state", "last_message_at", "unread_count",
+    "snippet", "sender_name", "priority_label", "priority_score", "summary", "tag_slugs", "updated_at",
+]
+
+
+def make_snippet(text: Optional[str]) -> str:
+    return RE_WHITESPACE.sub(" ", text or "").strip()[:SNIPPET_CHARS]
+
+
+def refresh_inbox(conversation_ids: Iterable[int]) -> int:
+    """Recompute the inbox rows of these conversations; returns how many rows were written."""
+    ids = sorted(set(conversation_ids))
+    written = 0
+    for start in range(0, len(ids), REFRESH_BATCH):
+        written += _refresh_batch(ids[start : start + REFRESH_BATCH])
+    return written
+
+
+def rebuild_inbox(workspace_id: Optional[int] = None) -> int:
+    """Refresh every conversation (of one workspace) and drop rows whose conversation is gone."""
+    conversations = Conversation.objects.all()
+    rows = InboxRow.objects.all()
+    if workspace_id is not None:
+        conversations = conversations.filter(workspace_id=workspace_id)
+        rows = rows.filter(workspace_id=workspace_id)
+    rows.filter(conversation__is_deleted=True).delete()
+    return refresh_inbox(conversations.filter(is_deleted=False).values_list("id", flat=True).iterator())
+
+
+def _refresh_batch(ids: List[int]) -> int:
+    latest = Message.objects.filter(conversation=OuterRef("pk"), is_deleted=False).order_by("-sent_at", "-id")
+    conversations = list(
+        Conversation.objects.filter(id__in=ids, is_deleted=False)
+        .annotate(
+            latest_text=Subquery(latest.annotate(head=Left("text", SNIPPET_CHARS * 2)).values("head")[:1]),
+            latest_sender=Subquery(latest.values("sender__display_name")[:1]),
+        )
+        .values(
+            "id", "workspace_id", "stream_id", "stream__name", "subject", "state", "priority",
+            "last_message_at", "unread_count", "latest_text", "latest_sender",
+        )
+    )
+    live = [c["id"] for c in conversations]
+    gone = set(ids) - set(live)
+    if gone:
+        InboxRow.objects.filter(conversation_id__in=gone).delete()
+    if not conversations:
+        return 0
+
+    annotations = _latest_annotations(live)
+    tags: Dict[int, List[str]] = {}
+    for conv_id, slug in (
+        ConversationTag.objects.filter(conversation_id__in=live)
+        .order_by("tag__slug")
+        .values_list("conversation_id", "tag__slug")
+    ):
+        tags.setdefault(conv_id, []).append(slug)
+
+    rows = []
+    for c in conversations:
+        priority = annotations.get((c["id"], AIAnnotation.Kind.PRIORITY))
+        summary = annotations.get((c["id"], AIAnnotation.Kind.SUMMARY))
+        rows.append(
+            InboxRow(
+                conversation_id=c["id"],
+                workspace_id=c["workspace_id"],
+                stream_id=c["stream_id"],
+                stream_name=c["stream__name"] or "",
+                subject=c["subject"],
+                state=c["state"],
+                last_message_at=c["last_message_at"],
+                unread_count=c["unread_count"],
+                snippet=make_snippet(c["latest_text"]),
+                sender_name=c["latest_sender"] or "",
+                # the AI label wins; the conversation's own priority is the fallback
+                priority_label=priority[0] if priority else c["priority"],
+                priority_score=priority[1] if priority else None,
+                summary=summary[0] if summary else "",
+                tag_slugs=tags.get(c["id"], []),
+            )
+        )
+    InboxRow.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=["conversation"], update_fields=INBOX_UPDATE_FIELDS
+    )
+    return len(rows)
+
+
+def _latest_annotations(conversation_ids: List[int]) -> Dict[tuple, tuple]:
+    """(conversation id, kind) → (content_text, score) of the newest SUMMARY / PRIORITY annotation."""
+    latest = {}
+    for target_id, kind, text, score in (
+        AIAnnotation.objects.filter(
+            target_content_type=ContentType.objects.get_for_model(Conversation),
+            target_object_id__in=conversation_ids,
+            kind__in=[AIAnnotation.Kind.SUMMARY, AIAnnotation.Kind.PRIORITY],
+        )
+        .order_by("updated_at", "id")
+        .values_list("target_object_id", "kind", "content_text", "score")
+    ):
+        latest[(target_id, kind)] = (text, score)   # newest wins when several models annotated it
+    return latest
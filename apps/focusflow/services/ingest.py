@@ -0,0 +1,315 @@
+# apps/focusflow/services/ingest.py
+"""
+Streaming ingestion: provider payloads → Contact / Identity / Conversation / Message /
+MessageRecipient / ConversationParticipant rows.
+
+Pipeline (every stage is a generator, so memory is bounded by `chunk_size`):
+
+    provider payloads ─► normalize_* (InboundMessage) ─► chunk ─► per chunk, in one transaction:
+        1. skip messages already stored            (stream, remote_message_id) IN (...)
+        2. resolve sender/recipient identities     LRU, then workspace + (kind, normalized_value) IN (...), bulk-create misses
+        3. upsert conversations                    (stream, remote_thread_id) IN (...), bulk create/update
+        4. bulk insert messages, recipients, participants
+        5. write search documents                   FTS rows follow via triggers / the GIN index
+        6. count terms into the workspace IDF       services/tfidf.py, one locked row
+        7. near-duplicate signatures                services/dedup.py, one LSH band lookup + upsert
+        8. bump the daily stream / sender rollups   insert missing rows, then one UPDATE per table
+        9. refresh the touched inbox rows           services/inbox.py, one upsert
+       10. queue live events (services/events.py)  published only if the chunk commits
+
+Each chunk costs a fixed handful of queries regardless of how many messages it holds.
+
+Usage
+-----
+from apps.focusflow.services.ingest import IngestPipeline
+stats = IngestPipeline(stream).run(inbound_messages)   # e.g. gmail_sync.normalize_gmail(payloads)
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import (
+    Conversation,
+    ConversationParticipant,
+    Message,
+    MessageRecipient,
+    MessageSearchDocument,
+    Stream,
+)
+from .dedup import sign_messages
+from .events import CONVERSATION_UPDATED, MESSAGE_CREATED, publish_many_on_commit
+from .identity import IdentityKey, IdentityResolver, normalize_identity
+from .inbox import refresh_inbox
+from .rollups import bump_message_rollups
+from .search import make_document
+from .tfidf import record_documents
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+@dataclass
+class InboundAddress:
+    kind: str
+    value: str
+    display_name: str = ""
+
+    @property
+    def key(self) -> IdentityKey:
+        return (self.kind, normalize_identity(self.kind, self.value))
+
+
+@dataclass
+class InboundMessage:
+    """Provider-agnostic message, as produced by a `normalize_*` stage."""
+    remote_thread_id: str
+    remote_message_id: str
+    sender: InboundAddress
+    sent_at: datetime
+    subject: str = ""
+    recipients: List[Tuple[str, InboundAddress]] = field(default_factory=list)   # (MessageRecipient.RType, addr)
+    text: str = ""
+    html: str = ""
+    is_read: bool = False
+    is_from_me: bool = False
+    external_url: str = ""
+    thread_index: Optional[int] = None
+    metadata: dict = field(default_factory=dict)
+
+
+@dataclass
+class IngestStats:
+    messages_seen: int = 0
+    messages_created: int = 0
+    conversations_created: int = 0
+    conversations_touched: int = 0
+    contacts_created: int = 0
+    recipients_created: int = 0
+
+
+# -------------------------
+# Generator stages
+# -------------------------
+
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# -------------------------
+# Pipeline
+# -------------------------
+
+class IngestPipeline:
+    def __init__(
+        self,
+        stream: Stream,
+        *,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        resolver: Optional[IdentityResolver] = None,
+    ):
+        self.stream = stream
+        self.workspace = stream.integration.workspace
+        self.chunk_size = max(chunk_size, 1)
+        # Pass a long-lived resolver to keep its identity cache warm across runs
+        self.resolver = resolver or IdentityResolver(self.workspace)
+
+    def run(self, messages: Iterable[InboundMessage]) -> IngestStats:
+        stats = IngestStats()
+        touched: Set[int] = set()
+        for chunk in chunked(messages, self.chunk_size):
+            with transaction.atomic():
+                touched |= self._ingest_chunk(chunk, stats)
+        stats.conversations_touched = len(touched)
+        return stats
+
+    def _ingest_chunk(self, chunk: List[InboundMessage], stats: IngestStats) -> Set[int]:
+        stats.messages_seen += len(chunk)
+
+        # 1) skip what is already stored (and duplicates inside the chunk)
+        stored = set(
+            Message.objects.filter(
+                stream=self.stream, remote_message_id__in=[m.remote_message_id for m in chunk]
+            ).values_list("remote_message_id", flat=True)
+        )
+        fresh: Dict[str, InboundMessage] = {}
+        for m in sorted(chunk, key=lambda m: m.sent_at):
+            if m.remote_message_id not in stored:
+                fresh.setdefault(m.remote_message_id, m)
+        if not fresh:
+            return set()
+        items = list(fresh.values())
+
+        # 2) identities → contact ids
+        addresses = [m.sender for m in items] + [addr for m in items for _, addr in m.recipients]
+        created_before = self.resolver.created
+        contact_ids = self.resolver.resolve_many((a.kind, a.value, a.display_name) for a in addresses)
+        stats.contacts_created += self.resolver.created - created_before
+
+        # 3) conversations
+        conversations = self._upsert_conversations(items, stats)
+
+        # 4) messages, then the rows hanging off them
+        Message.objects.bulk_create(
+            [
+                Message(
+                    conversation=conversations[m.remote_thread_id],
+                    stream=self.stream,
+                    remote_message_id=m.remote_message_id,
+                    sender_id=contact_ids[m.sender.key],
+                    sent_at=m.sent_at,
+                    text=m.text,
+                    html=m.html,
+                    is_read=m.is_read,
+                    is_from_me=m.is_from_me,
+                    external_url=m.external_url,
+                    thread_index=m.thread_index,
+                    metadata=m.metadata,
+                )
+                for m in items
+            ],
+            ignore_conflicts=True,
+        )
+        message_ids = dict(
+            Message.objects.filter(stream=self.stream, remote_message_id__in=list(fresh)).values_list(
+                "remote_message_id", "id"
+            )
+        )
+        stats.messages_created += len(message_ids)
+
+        recipients = []
+        participants: Dict[Tuple[int, int], str] = {}
+        for m in items:
+            conv = conversations[m.remote_thread_id]
+            sender_id = contact_ids[m.sender.key]
+            participants.setdefault((conv.pk, sender_id), ConversationParticipant.Role.ORIGINATOR)
+            for rtype, addr in m.recipients:
+                recipients.append(
+                    MessageRecipient(
+                        message_id=message_ids[m.remote_message_id], contact_id=contact_ids[addr.key], rtype=rtype
+                    )
+                )
+                participants.setdefault((conv.pk, contact_ids[addr.key]), ConversationParticipant.Role.MEMBER)
+        MessageRecipient.objects.bulk_create(recipients, ignore_conflicts=True)
+        ConversationParticipant.objects.bulk_create(
+            [
+                ConversationParticipant(conversation_id=conv_id, contact_id=contact_id, role=role)
+                for (conv_id, contact_id), role in participants.items()
+            ],
+            ignore_conflicts=True,
+        )
+        stats.recipients_created += len(recipients)
+
+        # 5) search documents
+        documents = [
+            make_document(
+                message_ids[m.remote_message_id],
+                self.workspace.pk,
+                conversations[m.remote_thread_id].pk,
+                self.stream.pk,
+                conversations[m.remote_thread_id].subject,
+                m.text,
+                m.html,
+            )
+            for m in items
+            if m.remote_message_id in message_ids
+        ]
+        MessageSearchDocument.objects.bulk_create(documents, ignore_conflicts=True)
+
+        # 6) term statistics for TF-IDF summaries, from the same stripped bodies
+        record_documents(self.workspace.pk, (d.body for d in documents))
+
+        # 7) SimHash signatures, linking newsletters / notifications to earlier near-duplicates
+        sign_messages(self.workspace.pk, ((d.message_id, d.body) for d in documents))
+
+        # 8) analytics rollups, for the messages this chunk actually inserted
+        bump_message_rollups(
+            self.workspace.pk,
+            ((self.stream.pk, contact_ids[m.sender.key], m.sent_at) for m in items if m.remote_message_id in message_ids),
+        )
+
+        # 9) denormalized inbox rows of the touched threads
+        refresh_inbox(c.pk for c in conversations.values())
+
+        # 10) live events for dashboards
+        publish_many_on_commit(self.workspace.pk, self._events(items, conversations, message_ids))
+        return {c.pk for c in conversations.values()}
+
+    # ------------- Stages -------------
+
+    @staticmethod
+    def _events(
+        items: List[InboundMessage], conversations: Dict[str, Conversation], message_ids: Dict[str, int]
+    ) -> List[tuple]:
+        """One `message.created` (all new ids) and one `conversation.updated` per touched thread."""
+        new_ids: Dict[str, List[int]] = {}
+        for m in items:
+            if m.remote_message_id in message_ids:
+                new_ids.setdefault(m.remote_thread_id, []).append(message_ids[m.remote_message_id])
+        events = []
+        for thread_id, ids in new_ids.items():
+            conv = conversations[thread_id]
+            events.append((MESSAGE_CREATED, {"conversation_id": conv.pk, "message_ids": ids}))
+            events.append(
+                (
+                    CONVERSATION_UPDATED,
+                    {
+                        "id": conv.pk,
+                        "subject": conv.subject,
+                        "last_message_at": conv.last_message_at.isoformat() if conv.last_message_at else None,
+                        "unread_count": conv.unread_count,
+                    },
+                )
+            )
+        return events
+
+    def _upsert_conversations(self, items: List[InboundMessage], stats: IngestStats) -> Dict[str, Conversation]:
+        thread_ids = list(dict.fromkeys(m.remote_thread_id for m in items))
+        existing = {
+            c.remote_thread_id: c
+            for c in Conversation.objects.filter(stream=self.stream, remote_thread_id__in=thread_ids)
+        }
+        missing = [t for t in thread_ids if t not in existing]
+        if missing:
+            # items are oldest-first, so the first message of a thread supplies its subject
+            subjects: Dict[str, str] = {}
+            for m in items:
+                subjects.setdefault(m.remote_thread_id, m.subject)
+            Conversation.objects.bulk_create(
+                [
+                    Conversation(
+                        workspace=self.workspace,
+                        stream=self.stream,
+                        remote_thread_id=t,
+                        subject=subjects[t][:300],
+                    )
+                    for t in missing
+                ],
+                ignore_conflicts=True,
+            )
+            created = Conversation.objects.filter(stream=self.stream, remote_thread_id__in=missing)
+            existing.update((c.remote_thread_id, c) for c in created)
+            stats.conversations_created += len(missing)
+
+        now = timezone.now()
+        for m in items:
+            conv = existing[m.remote_thread_id]
+            if conv.last_message_at is None or m.sent_at > conv.last_message_at:
+                conv.last_message_at = m.sent_at
+            if not m.is_read:
+                conv.unread_count += 1
+            conv.updated_at = now
+        Conversation.objects.bulk_update(
+            [existing[t] for t in thread_ids], ["last_message_at", "unread_count", "updated_at"]
+        )
+        return existing
@@ -0,0 +1,148 @@
+# apps/focusflow/services/keywords.py
+"""
+Single-pass keyword matching for the summarizer heuristics (action hints, imperatives, spam,
+urgency).
+
+- Every phrase of every category is compiled into ONE case-insensitive alternation (longest
+  phrase first, word-bounded, spaces match any whitespace); `scan()` walks the text once and
+  returns each hit with its offsets and all the categories its phrase belongs to
+- Callers then ask "is there a <category> hit between these offsets?" (`ScanResult.has`) per
+  line or sentence with a bisect, instead of rescanning the text per rule
+- Keyword lists come from DEFAULT_KEYWORDS, overridable globally with FOCUSFLOW_KEYWORDS and per
+  workspace through `Workspace.settings_json`:
+      {"keywords": {"spam": ["webinar", ...]}}           replaces a category's list
+      {"extra_keywords": {"urgent": ["eod", ...]}}       extends it
+  Compiled matchers are cached per distinct keyword configuration
+
+Usage
+-----
+from apps.focusflow.services.keywords import matcher_for_workspace
+scan = matcher_for_workspace(workspace).scan(text)
+scan.has("urgent"), scan.has("imperative", start, end)
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import AbstractSet, Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple, Union
+
+from django.conf import settings
+
+ACTION_HINT = "action_hint"     # request / deadline words; flag a line or sentence as an action
+IMPERATIVE = "imperative"       # request phrasing; flags a sentence as an action
+SPAM = "spam"
+URGENT = "urgent"
+
+DEFAULT_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    ACTION_HINT: (
+        "please", "kindly", "asap", "urgent", "due on", "due by", "deadline", "follow up", "followup",
+        "action required", "todo", "to-do",
+    ),
+    IMPERATIVE: (
+        "please", "kindly", "let's", "lets", "we should", "you should", "need to", "must", "can you",
+        "action required", "follow up",
+    ),
+    SPAM: ("unsubscribe", "promo", "promotion", "offer", "sale", "discount"),
+    URGENT: ("asap", "urgent", "immediately"),
+}
+
+RE_SPACES = re.compile(r"\s+")
+
+KeywordConfig = Tuple[Tuple[str, Tuple[str, ...]], ...]    # hashable {category: phrases}
+
+
+@dataclass(frozen=True)
+class Hit:
+    start: int
+    end: int
+    phrase: str
+    categories: FrozenSet[str]
+
+
+@dataclass
+class ScanResult:
+    hits: List[Hit]
+    _starts: List[int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._starts = [h.start for h in self.hits]
+
+    def categories(self) -> Set[str]:
+        return {c for h in self.hits for c in h.categories}
+
+    def has(self, category: Union[str, AbstractSet[str]], start: int = 0, end: Optional[int] = None) -> bool:
+        """Any hit of `category` (or of any category in a set) lying entirely inside text[start:end]?"""
+        wanted = {category} if isinstance(category, str) else category
+        for i in range(bisect_left(self._starts, start), len(self.hits)):
+            hit = self.hits[i]
+            if end is not None and hit.end > end:
+                return False
+            if not wanted.isdisjoint(hit.categories):
+                return True
+        return False
+
+
+class KeywordMatcher:
+    def __init__(self, keywords: Mapping[str, Iterable[str]]):
+        self.categories_by_phrase: Dict[str, Set[str]] = {}
+        for category, phrases in keywords.items():
+            for phrase in phrases:
+                key = _normalize(phrase)
+                if key:
+                    self.categories_by_phrase.setdefault(key, set()).add(category)
+        self._frozen = {k: frozenset(v) for k, v in self.categories_by_phrase.items()}
+        alternatives = sorted(self.categories_by_phrase, key=len, reverse=True)
+        body = "|".join(r"\s+".join(re.escape(word) for word in phrase.split(" ")) for phrase in alternatives)
+        self.pattern = re.compile(rf"(?<!\w)(?:{body})(?!\w)", re.IGNORECASE) if alternatives else None
+
+    def scan(self, text: str) -> ScanResult:
+        if self.pattern is None or not text:
+            return ScanResult([])
+        return ScanResult(
+            [
+                Hit(m.start(), m.end(), key, self._frozen[key])
+                for m in self.pattern.finditer(text)
+                for key in (_normalize(m.group()),)
+            ]
+        )
+
+
+def _normalize(phrase: str) -> str:
+    return RE_SPACES.sub(" ", phrase.strip().lower())
+
+
+# -------------------------
+# Configuration
+# -------------------------
+
+def keyword_config(overrides: Optional[Mapping] = None) -> KeywordConfig:
+    """Defaults ← FOCUSFLOW_KEYWORDS ← a workspace's {"keywords": ..., "extra_keywords": ...}."""
+    merged: Dict[str, List[str]] = {c: list(p) for c, p in DEFAULT_KEYWORDS.items()}
+    for category, phrases in getattr(settings, "FOCUSFLOW_KEYWORDS", {}).items():
+        merged[category] = list(phrases)
+    overrides = overrides or {}
+    for category, phrases in (overrides.get("keywords") or {}).items():
+        merged[category] = list(phrases)
+    for category, phrases in (overrides.get("extra_keywords") or {}).items():
+        merged.setdefault(category, []).extend(phrases)
+    return tuple(sorted((c, tuple(p)) for c, p in merged.items()))
+
+
+@lru_cache(maxsize=64)
+def compiled_matcher(config: KeywordConfig) -> KeywordMatcher:
+    return KeywordMatcher(dict(config))
+
+
+def default_matcher() -> KeywordMatcher:
+    return compiled_matcher(keyword_config())
+
+
+def matcher_for_workspace(workspace) -> KeywordMatcher:
+    return compiled_matcher(workspace_keyword_config(workspace))
+
+
+def workspace_keyword_config(workspace) -> KeywordConfig:
+    return keyword_config(getattr(workspace, "settings_json", None) if workspace is not None else None)
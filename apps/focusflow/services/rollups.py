@@ -0,0 +1,173 @@
+# apps/focusflow/services/rollups.py
+"""
+Daily rollup tables for analytics (DailyStreamRollup / DailySenderRollup / DailyPriorityRollup).
+
+- Kept current incrementally: the ingest pipeline bumps stream/sender counts per chunk, the
+  summarizer moves conversations between priority buckets when their AI label changes
+- Increments are applied as one `count = count + CASE ... END` UPDATE per table (per 200 keys),
+  after a conflict-ignoring insert of any missing rows, so concurrent writers never lose counts
+- `rebuild_rollups()` recomputes any date range from the source tables (backfills, repairs,
+  rows written outside the pipeline); see `manage.py focusflow_rollups`
+
+Usage
+-----
+from apps.focusflow.services.rollups import rebuild_rollups
+rebuild_rollups(date(2025, 1, 1), date(2025, 12, 31), workspace_id=1)
+"""
+
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from ..models import (
+    AIAnnotation,
+    Conversation,
+    DailyPriorityRollup,
+    DailySenderRollup,
+    DailyStreamRollup,
+    Message,
+)
+
+UPDATE_BATCH = 200      # keys per UPDATE ... SET n = n + CASE WHEN k1 ... END WHERE k1 OR k2 ...
+
+
+def local_day(moment: datetime) -> date:
+    return timezone.localdate(moment)
+
+
+# -------------------------
+# Incremental maintenance
+# -------------------------
+
+def bump_message_rollups(workspace_id: int, rows: Iterable[Tuple[int, int, datetime]]) -> None:
+    """Count new messages, given as (stream_id, sender_id, sent_at) triples."""
+    streams: Counter = Counter()
+    senders: Counter = Counter()
+    for stream_id, sender_id, sent_at in rows:
+        day = local_day(sent_at)
+        streams[(stream_id, day)] += 1
+        senders[(sender_id, day)] += 1
+    _increment(DailyStreamRollup, ("stream_id", "day"), "message_count", streams, workspace_id=workspace_id)
+    _increment(DailySenderRollup, ("contact_id", "day"), "message_count", senders, workspace_id=workspace_id)
+
+
+def move_priority_rollups(moves: Iterable[Tuple[int, date, Optional[str], str]]) -> None:
+    """Apply (workspace_id, day, old_label or None, new_label) transitions."""
+    deltas: Dict[int, Counter] = defaultdict(Counter)
+    for workspace_id, day, old, new in moves:
+        if old == new:
+            continue
+        if old:
+            deltas[workspace_id][(day, old)] -= 1
+        deltas[workspace_id][(day, new)] += 1
+    for workspace_id, counts in deltas.items():
+        _increment(DailyPriorityRollup, ("day", "priority"), "conversation_count", counts, workspace_id=workspace_id)
+
+
+def _increment(model, key_fields: Sequence[str], count_field: str, deltas: Counter, **fixed) -> None:
+    deltas = {key: n for key, n in deltas.items() if n}
+    if not deltas:
+        return
+    model.objects.bulk_create(
+        [model(**fixed, **dict(zip(key_fields, key)), **{count_field: 0}) for key in deltas],
+        ignore_conflicts=True,
+    )
+    keys = list(deltas)
+    for start in range(0, len(keys), UPDATE_BATCH):
+        batch = [(Q(**dict(zip(key_fields, key))), deltas[key]) for key in keys[start : start + UPDATE_BATCH]]
+        match = Q()
+        for condition, _ in batch:
+            match |= condition
+        step = Case(*(When(condition, then=Value(n)) for condition, n in batch), default=Value(0))
+        model.objects.filter(match, **fixed).update(**{count_field: F(count_field) + step})
+
+
+# -------------------------
+# Rebuild
+# -------------------------
+
+def _day_bounds(start: date, end: date) -> Tuple[datetime, datetime]:
+    """[start 00:00, end+1 00:00) in the current timezone, so range filters can use the indexes."""
+    lower = timezone.make_aware(datetime.combine(start, datetime.min.time()))
+    upper = timezone.make_aware(datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    return lower, upper
+
+
+@transaction.atomic
+def rebuild_rollups(start: date, end: date, workspace_id: Optional[int] = None) -> Dict[str, int]:
+    """Recompute every rollup row for days in [start, end]; returns rows written per table."""
+    lower, upper = _day_bounds(start, end)
+    scope = {"workspace_id": workspace_id} if workspace_id is not None else {}
+    for model in (DailyStreamRollup, DailySenderRollup, DailyPriorityRollup):
+        model.objects.filter(day__gte=start, day__lte=end, **scope).delete()
+
+    messages = Message.objects.filter(is_deleted=False, sent_at__gte=lower, sent_at__lt=upper)
+    if workspace_id is not None:
+        messages = messages.filter(conversation__workspace_id=workspace_id)
+    by_day = messages.annotate(day=TruncDate("sent_at")).order_by()
+
+    streams = DailyStreamRollup.objects.bulk_create(
+        [
+            DailyStreamRollup(workspace_id=r["conversation__workspace_id"], stream_id=r["stream_id"],
+                              day=r["day"], message_count=r["n"])
+            for r in by_day.values("conversation__workspace_id", "stream_id", "day").annotate(n=Count("id"))
+        ]
+    )
+    senders = DailySenderRollup.objects.bulk_create(
+        [
+            DailySenderRollup(workspace_id=r["conversation__workspace_id"], contact_id=r["sender_id"],
+                              day=r["day"], message_count=r["n"])
+            for r in by_day.values("conversation__workspace_id", "sender_id", "day").annotate(n=Count("id"))
+        ]
+    )
+    priorities = DailyPriorityRollup.objects.bulk_create(
+        [
+            DailyPriorityRollup(workspace_id=ws, day=day, priority=label, conversation_count=n)
+            for (ws, day, label), n in _priority_counts(lower, upper, workspace_id).items()
+        ]
+    )
+    return {"streams": len(streams), "senders": len(senders), "priorities": len(priorities)}
+
+
+def _priority_counts(lower: datetime, upper: datetime, workspace_id: Optional[int]) -> Counter:
+    """(workspace, created day, label) → conversations whose latest AI priority is that label."""
+    conversations = Conversation.objects.filter(is_deleted=False, created_at__gte=lower, created_at__lt=upper)
+    if workspace_id is not None:
+        conversations = conversations.filter(workspace_id=workspace_id)
+    ct = ContentType.objects.get_for_model(Conversation)
+
+    counts: Counter = Counter()
+    rows = conversations.order_by().values_list("id", "workspace_id", "created_at")
+    batch = []
+    for row in rows.iterator(chunk_size=2000):
+        batch.append(row)
+        if len(batch) == 2000:
+            _count_labels(batch, ct, counts)
+            batch = []
+    _count_labels(batch, ct, counts)
+    return counts
+
+
+def _count_labels(batch, ct, counts: Counter) -> None:
+    if not batch:
+        return
+    labels = {}
+    for target_id, label in (
+        AIAnnotation.objects.filter(
+            target_content_type=ct, target_object_id__in=[pk for pk, _, _ in batch], kind=AIAnnotation.Kind.PRIORITY
+        )
+        .order_by("updated_at", "id")
+        .values_list("target_object_id", "content_text")
+    ):
+        labels[target_id] = label  # newest wins when several models annotated the conversation
+    for pk, workspace_id, created_at in batch:
+        if pk in labels:
+            counts[(workspace_id, local_day(created_at), labels[pk])] += 1
@@ -0,0 +1,343 @@
+# apps/focusflow/services/search.py
+"""
+Full-text search over messages and conversations.
+
+- Every message has a `MessageSearchDocument` (stripped body + conversation subject), written by
+  the ingest pipeline and refreshed with `index_messages()` / `manage.py focusflow_search_index`
+- SQLite: an external-content FTS5 table kept in sync by triggers (migration 0005), ranked by bm25
+- Postgres: a GIN index on to_tsvector(subject || body), ranked by ts_rank with ts_headline snippets
+- Anything else (or SQLite built without FTS5): LIKE over the stripped documents, unranked
+- Conversations without a live message (so without documents) match on their subject alone,
+  ranked 0 after every document match
+
+Snippets come back HTML-escaped with matches wrapped in <mark>…</mark>.
+
+Usage
+-----
+from apps.focusflow.services.search import search_backend
+page = search_backend().search_messages("quarterly report", {"workspace_id": 1}, limit=20)
+[(hit.object_id, hit.rank, hit.snippet) for hit in page.hits]
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from functools import reduce
+from html import escape
+from operator import and_
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from django.db import connections
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from ..models import Conversation, Message, MessageSearchDocument
+from .summarizer import SummarizerService
+
+FTS_TABLE = "focusflow_message_fts"
+DOC_TABLE = MessageSearchDocument._meta.db_table
+MESSAGE_TABLE = Message._meta.db_table
+CONVERSATION_TABLE = "focusflow_conversation"
+
+INDEX_BATCH = 1000
+SNIPPET_WORDS = 16
+MARK_START, MARK_END = "\x02", "\x03"     # placeholders, swapped for <mark> after escaping
+RE_TERMS = re.compile(r"\w+", re.UNICODE)
+
+# filter name → (SQL column: d = search document, c = conversation; ORM lookup on the document;
+#                ORM lookup on the conversation)
+FILTERS = {
+    "workspace_id": ("d.workspace_id", "workspace_id", "workspace_id"),
+    "conversation_id": ("d.conversation_id", "conversation_id", "id"),
+    "stream_id": ("d.stream_id", "stream_id", "stream_id"),
+    "priority": ("c.priority", "conversation__priority", "priority"),
+    "state": ("c.state", "conversation__state", "state"),
+}
+
+
+@dataclass
+class SearchHit:
+    object_id: int
+    rank: float           # higher is more relevant
+    snippet: str = ""
+    conversation_id: Optional[int] = None
+
+
+@dataclass
+class SearchPage:
+    hits: List[SearchHit] = field(default_factory=list)
+    total: int = 0
+
+
+def search_terms(query: str) -> List[str]:
+    return RE_TERMS.findall(query or "")
+
+
+def render_snippet(raw: str) -> str:
+    return escape(raw or "").replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+# -------------------------
+# Indexing
+# -------------------------
+
+def make_document(
+    message_id: int, workspace_id: int, conversation_id: int, stream_id: int, subject: str, text: str, html: str
+) -> MessageSearchDocument:
+    return MessageSearchDocument(
+        message_id=message_id,
+        workspace_id=workspace_id,
+        conversation_id=conversation_id,
+        stream_id=stream_id,
+        subject=subject or "",
+        body=SummarizerService._best_text(text, html),
+        updated_at=timezone.now(),
+    )
+
+
+def index_messages(message_ids: Iterable[int]) -> int:
+    """Create or refresh the search documents of these messages; returns how many were written."""
+    ids = list(message_ids)
+    written = 0
+    for start in range(0, len(ids), INDEX_BATCH):
+        rows = Message.objects.filter(pk__in=ids[start : start + INDEX_BATCH]).values_list(
+            "id", "conversation__workspace_id", "conversation_id", "stream_id", "conversation__subject", "text", "html"
+        )
+        docs = [make_document(*row) for row in rows]
+        MessageSearchDocument.objects.bulk_create(
+            docs,
+            update_conflicts=True,
+            unique_fields=["message"],
+            update_fields=["workspace", "conversation", "stream", "subject", "body", "updated_at"],
+        )
+        written += len(docs)
+    return written
+
+
+# -------------------------
+# Backends
+# -------------------------
+
+class SearchBackend:
+    """LIKE fallback; subclasses override the two `_…` hooks with ranked full-text queries."""
+
+    def __init__(self, using: str = "default"):
+        self.using = using
+
+    def search_messages(
+        self, query: str, filters: Optional[Dict] = None, *, limit: int = 20, offset: int = 0
+    ) -> SearchPage:
+        terms = search_terms(query)
+        if not terms:
+            return SearchPage()
+        return self._search_messages(terms, filters or {}, limit, offset)
+
+    def search_conversations(
+        self, query: str, filters: Optional[Dict] = None, *, limit: int = 20, offset: int = 0
+    ) -> SearchPage:
+        """
+        Conversations ranked by their best-matching message, with that message's snippet, then
+        conversations without messages whose subject matches (newest first, no snippet).
+        """
+        terms = search_terms(query)
+        if not terms:
+            return SearchPage()
+        page = self._search_conversations(terms, filters or {}, limit, offset)
+        if page.hits:
+            snippets = self._best_snippets(terms, filters or {}, [h.object_id for h in page.hits])
+            for hit in page.hits:
+                hit.snippet = snippets.get(hit.object_id, "")
+
+        subject_only = self._subject_only(terms, filters or {})
+        if len(page.hits) < limit:
+            start = max(offset - page.total, 0)
+            ids = subject_only.order_by("-id").values_list("id", flat=True)[start : start + limit - len(page.hits)]
+            page.hits.extend(SearchHit(pk, 0.0) for pk in ids)
+        page.total += subject_only.count()
+        return page
+
+    # ------------- Hooks -------------
+
+    def _search_messages(self, terms, filters, limit, offset) -> SearchPage:
+        qs = self._documents(terms, filters)
+        docs = qs.order_by("-message_id").values_list("message_id", "conversation_id", "body")[offset : offset + limit]
+        hits = [SearchHit(pk, 0.0, _excerpt(body, terms), conv_id) for pk, conv_id, body in docs]
+        return SearchPage(hits, qs.count())
+
+    def _search_conversations(self, terms, filters, limit, offset) -> SearchPage:
+        qs = self._documents(terms, filters).values_list("conversation_id", flat=True).distinct()
+        ids = list(qs.order_by("-conversation_id")[offset : offset + limit])
+        return SearchPage([SearchHit(pk, 0.0) for pk in ids], qs.count())
+
+    def _best_snippets(self, terms, filters, conversation_ids: Sequence[int]) -> Dict[int, str]:
+        # Top matches inside the page's conversations; the first per conversation is its best
+        page = self._search_messages(
+            terms, {**filters, "conversation_id": list(conversation_ids)}, len(conversation_ids) * 10, 0
+        )
+        best: Dict[int, str] = {}
+        for hit in page.hits:
+            best.setdefault(hit.conversation_id, hit.snippet)
+        return best
+
+    def _subject_only(self, terms, filters):
+        """Conversations that have no live search document but whose subject contains every term."""
+        lookups = _orm_lookups(filters, on_conversation=True)
+        documents = MessageSearchDocument.objects.filter(conversation_id=OuterRef("pk"), message__is_deleted=False)
+        return Conversation.objects.using(self.using).filter(
+            *[Q(subject__icontains=t) for t in terms], ~Exists(documents), is_deleted=False, **lookups
+        )
+
+    def _documents(self, terms, filters):
+        lookups = _orm_lookups(filters)
+        matches = [Q(body__icontains=t) | Q(subject__icontains=t) for t in terms]
+        return MessageSearchDocument.objects.using(self.using).filter(
+            reduce(and_, matches), message__is_deleted=False, conversation__is_deleted=False, **lookups
+        )
+
+
+class _SqlBackend(SearchBackend):
+    def _where(self, filters) -> tuple:
+        clauses, params = ["m.is_deleted = %s", "c.is_deleted = %s"], [False, False]
+        for name, value in filters.items():
+            column = FILTERS[name][0]
+            if isinstance(value, (list, tuple)):
+                clauses.append(f"{column} IN ({', '.join(['%s'] * len(value))})")
+                params.extend(value)
+            else:
+                clauses.append(f"{column} = %s")
+                params.append(value)
+        return " AND ".join(clauses), params
+
+    def _fetch(self, sql: str, params) -> list:
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class SqliteFtsBackend(_SqlBackend):
+    JOINS = (
+        f"FROM {FTS_TABLE} f "
+        f"JOIN {DOC_TABLE} d ON d.message_id = f.rowid "
+        f"JOIN {MESSAGE_TABLE} m ON m.id = d.message_id "
+        f"JOIN {CONVERSATION_TABLE} c ON c.id = d.conversation_id "
+    )
+    RANK = "f.rank"     # bm25(2.0, 1.0), configured in migration 0005: subject hits weigh double
+
+    @staticmethod
+    def _match(terms: List[str]) -> str:
+        # Quote every term (no FTS syntax from user input); the last one is a prefix for type-ahead
+        quoted = ['"{}"'.format(t.replace('"', "")) for t in terms]
+        quoted[-1] += "*"
+        return " ".join(quoted)
+
+    def _search_messages(self, terms, filters, limit, offset):
+        where, params = self._where(filters)
+        match = self._match(terms)
+        rows = self._fetch(
+            f"SELECT d.message_id, d.conversation_id, -{self.RANK}, "
+            f"snippet({FTS_TABLE}, -1, char(2), char(3), '…', {SNIPPET_WORDS}) "
+            f"{self.JOINS} WHERE {FTS_TABLE} MATCH %s AND {where} "
+            f"ORDER BY {self.RANK}, d.message_id DESC LIMIT %s OFFSET %s",
+            [match, *params, limit, offset],
+        )
+        total = self._fetch(f"SELECT COUNT(*) {self.JOINS} WHERE {FTS_TABLE} MATCH %s AND {where}", [match, *params])
+        return SearchPage(
+            [SearchHit(pk, rank, render_snippet(s), conv_id) for pk, conv_id, rank, s in rows], total[0][0]
+        )
+
+    def _search_conversations(self, terms, filters, limit, offset):
+        where, params = self._where(filters)
+        match = self._match(terms)
+        rows = self._fetch(
+            f"SELECT d.conversation_id, MIN({self.RANK}) AS score "
+            f"{self.JOINS} WHERE {FTS_TABLE} MATCH %s AND {where} "
+            f"GROUP BY d.conversation_id ORDER BY score, d.conversation_id DESC LIMIT %s OFFSET %s",
+            [match, *params, limit, offset],
+        )
+        total = self._fetch(
+            f"SELECT COUNT(DISTINCT d.conversation_id) {self.JOINS} WHERE {FTS_TABLE} MATCH %s AND {where}",
+            [match, *params],
+        )
+        return SearchPage([SearchHit(pk, -score) for pk, score in rows], total[0][0])
+
+
+class PostgresBackend(_SqlBackend):
+    # Must match the expression of the GIN index created in migration 0005
+    VECTOR = "to_tsvector('english', coalesce(d.subject, '') || ' ' || coalesce(d.body, ''))"
+    QUERY = "websearch_to_tsquery('english', %s)"
+    JOINS = (
+        f"FROM {DOC_TABLE} d "
+        f"JOIN {MESSAGE_TABLE} m ON m.id = d.message_id "
+        f"JOIN {CONVERSATION_TABLE} c ON c.id = d.conversation_id "
+    )
+    HEADLINE_OPTIONS = f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords={SNIPPET_WORDS}, MinWords=6"
+
+    def _search_messages(self, terms, filters, limit, offset):
+        where, params = self._where(filters)
+        text = " ".join(terms)
+        rows = self._fetch(
+            f"SELECT s.id, s.conversation_id, s.rank, ts_headline('english', s.body, {self.QUERY}, %s) FROM ("
+            f"  SELECT d.message_id AS id, d.conversation_id, d.body, ts_rank({self.VECTOR}, {self.QUERY}) AS rank "
+            f"  {self.JOINS} WHERE {self.VECTOR} @@ {self.QUERY} AND {where} "
+            f"  ORDER BY rank DESC, d.message_id DESC LIMIT %s OFFSET %s"
+            f") s ORDER BY s.rank DESC, s.id DESC",
+            [text, self.HEADLINE_OPTIONS, text, text, *params, limit, offset],
+        )
+        total = self._fetch(
+            f"SELECT COUNT(*) {self.JOINS} WHERE {self.VECTOR} @@ {self.QUERY} AND {where}", [text, *params]
+        )
+        return SearchPage(
+            [SearchHit(pk, rank, render_snippet(s), conv_id) for pk, conv_id, rank, s in rows], total[0][0]
+        )
+
+    def _search_conversations(self, terms, filters, limit, offset):
+        where, params = self._where(filters)
+        text = " ".join(terms)
+        rows = self._fetch(
+            f"SELECT d.conversation_id, MAX(ts_rank({self.VECTOR}, {self.QUERY})) AS score "
+            f"{self.JOINS} WHERE {self.VECTOR} @@ {self.QUERY} AND {where} "
+            f"GROUP BY d.conversation_id ORDER BY score DESC, d.conversation_id DESC LIMIT %s OFFSET %s",
+            [text, text, *params, limit, offset],
+        )
+        total = self._fetch(
+            f"SELECT COUNT(DISTINCT d.conversation_id) {self.JOINS} WHERE {self.VECTOR} @@ {self.QUERY} AND {where}",
+            [text, *params],
+        )
+        return SearchPage([SearchHit(pk, score) for pk, score in rows], total[0][0])
+
+
+_BACKENDS: Dict[str, SearchBackend] = {}
+
+
+def search_backend(using: str = "default") -> SearchBackend:
+    """The best backend the database supports (decided once per connection alias)."""
+    if using not in _BACKENDS:
+        connection = connections[using]
+        if connection.vendor == "postgresql":
+            _BACKENDS[using] = PostgresBackend(using)
+        elif connection.vendor == "sqlite" and FTS_TABLE in connection.introspection.table_names():
+            _BACKENDS[using] = SqliteFtsBackend(using)
+        else:
+            _BACKENDS[using] = SearchBackend(using)
+    return _BACKENDS[using]
+
+
+def _orm_lookups(filters: Dict, on_conversation: bool = False) -> Dict:
+    lookups = {}
+    for name, value in filters.items():
+        lookup = FILTERS[name][2 if on_conversation else 1]
+        lookups[f"{lookup}__in" if isinstance(value, (list, tuple)) else lookup] = value
+    return lookups
+
+
+def _excerpt(body: str, terms: List[str], width: int = 120) -> str:
+    """Snippet for the LIKE fallback: a window around the first matching term."""
+    body = body or ""
+    lowered = body.lower()
+    positions = [lowered.find(t.lower()) for t in terms if t.lower() in lowered]
+    start = max(min(positions, default=0) - width // 3, 0)
+    window = body[start : start + width]
+    for t in sorted(set(terms), key=len, reverse=True):
+        window = re.sub(re.escape(t), lambda m: f"{MARK_START}{m.group(0)}{MARK_END}", window, flags=re.IGNORECASE)
+    return render_snippet(("…" if start else "") + window + ("…" if start + width < len(body) else ""))
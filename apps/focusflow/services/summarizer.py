@@ -3,17 +3,30 @@ FocusFlow Summarization & Action Extraction (lightweight, no extra deps)
 
 What it does
 ------------
-- Summarizes message/conversation text (simple frequency-based, sentence ranking)
-- Extracts action items with rules (imperatives, "please", "need to", due hints)
-- Heuristically classifies priority (urgent/action/fyi/spam) with a confidence score
-- Upserts AIAnnotation rows (SUMMARY / PRIORITY / ACTION_ITEMS)
+- Runs the backend named by `model_name` (services/summarizer_backends.py) over batches of texts:
+  by default rules that summarize by sentence ranking (word frequency, or workspace TF-IDF with
+  "tfidf-v1"), extract action items (imperatives, "please", "need to", due hints) and classify
+  priority (urgent/action/fyi/spam) with a confidence score; "local-v1" adds a local model
+- Keyword rules share one compiled single-pass matcher, configurable per workspace
+  (services/keywords.py)
+- Incremental mode (`incremental=True`): each message is digested once and cached as a
+  message-level DIGEST annotation; conversation results are merged from the digests of the
+  latest messages, so re-annotating a busy thread costs O(new messages), not O(20 messages)
+- Upserts AIAnnotation rows (SUMMARY / PRIORITY / ACTION_ITEMS), many targets per statement
 - Creates Task rows from extracted action items (deduped by title+source)
+- Near-duplicate messages (services/dedup.py) reuse the annotations / digest of the oldest
+  message of their cluster instead of being summarized (and turned into tasks) again
+- Keeps the daily priority rollup in step when a conversation's label changes
+- Publishes `annotation.created` live events once the annotations commit (services/events.py)
 
 Design goals
 ------------
 - No new dependencies (pure Python); safe to run on local dev
 - Idempotent: won't spam-duplicate annotations or tasks
-- Pluggable: later you can swap `summarize_text()` with a Hugging Face model
+- Memoized: a conversation whose input text (and model) is unchanged since its last run is
+  skipped entirely, using a fingerprint stored in `Conversation.hash_key`
+- Pluggable: backends implement a batched `summarize_many(texts)`; each call is timed
+  (`backend_stats()`)
 
 Usage
 -----
@@ -25,18 +38,35 @@ result = svc.annotate_conversation(conversation_id=123, create_tasks=True)
 
 # For a single message:
 result = svc.annotate_message(message_id=456, create_tasks=True)
+
+# For a large backlog (texts loaded in bulk, summarized in a process pool):
+report = svc.annotate_conversations_batch(conversation_ids, workers=4, chunk_size=500)
+
+# TF-IDF summaries (boilerplate-heavy mail; each batch is scored in one vectorized operation):
+report = SummarizerService(model_name="tfidf-v1").annotate_conversations_batch(conversation_ids)
+
+# Only digest messages not seen before, then merge per conversation:
+report = svc.annotate_conversations_batch(conversation_ids, incremental=True)
 """
 
 from __future__ import annotations
 
+import hashlib
 import html as _html
 import re
+import time
 from collections import Counter
-from dataclasses import dataclass
-from typing import Iterable, List, Optional, Sequence, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
 from django.contrib.contenttypes.models import ContentType
-from django.db import transaction
+from django.db import models, transaction
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 
 from ..models import (
@@ -46,154 +76,518 @@ from ..models import (
     Task,
     Workspace,
 )
+from .dedup import duplicate_sources
+from .events import ANNOTATION_CREATED, publish_many_on_commit
+from .inbox import refresh_inbox
+from .keywords import KeywordConfig, compiled_matcher, keyword_config, workspace_keyword_config
+from .rollups import local_day, move_priority_rollups
+from .summarizer_backends import (
+    DEFAULT_BACKEND,
+    DEFAULT_MAX_SUMMARY_SENTENCES,
+    MessageDigest,
+    SummarizeResult,
+    get_backend,
+    record_backend_call,
+)
+from .tfidf import IdfTable, load_idf_tables
 
 # -------------------------
 # Config (tweak as needed)
 # -------------------------
 
-DEFAULT_MAX_SUMMARY_SENTENCES = 3
-DEFAULT_MIN_SENT_LEN = 30           # characters; avoid tiny/noisy sentences
-DEFAULT_MAX_TEXT_CHARS = 15000      # cap input to keep it snappy in dev
-DEFAULT_ACTIONS_LIMIT = 10
-
-# Very small English stopword list (expand if you like)
-STOPWORDS = {
-    "the", "a", "an", "and", "or", "but", "if", "in", "on", "for", "to", "of",
-    "with", "at", "by", "from", "as", "is", "are", "was", "were", "be", "been",
-    "it", "its", "this", "that", "these", "those", "i", "you", "he", "she",
-    "we", "they", "them", "your", "our", "their", "my", "me", "us",
-}
+DEFAULT_CONVERSATION_MESSAGES = 20  # latest N messages feed a conversation digest
+DEFAULT_BATCH_CHUNK_SIZE = 500      # conversations loaded/written per transaction
 
 # Regex helpers
 RE_TAGS = re.compile(r"<[^>]+>")
 RE_WHITESPACE = re.compile(r"\s+")
-RE_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9])")
-RE_BULLET = re.compile(r"^\s*[-*•]\s+", re.MULTILINE)
-RE_ACTION_HINT = re.compile(
-    r"\b(please|kindly|asap|urgent|due\s+(?:on|by)|deadline|follow\s*up|action\s*required|todo|to-do)\b",
-    re.IGNORECASE,
-)
-RE_SPAM_HINT = re.compile(r"\b(unsubscribe|promo|promotion|offer|sale|discount)\b", re.IGNORECASE)
+
+# Matches the `focusflow_aiannotation_upsert_key` unique constraint
+ANNOTATION_UPSERT_KEY = ("workspace", "kind", "target_content_type", "target_object_id", "model_name")
+ANNOTATION_UPDATE_FIELDS = ("content_text", "content_json", "score", "updated_at")
 
 
 @dataclass
-class SummarizeResult:
-    summary: str
-    actions: List[str]
-    priority_label: str
-    priority_score: float
+class BatchReport:
+    processed: int = 0
+    skipped: int = 0
+    actions: int = 0
+    digested: int = 0       # messages summarized (incremental mode)
+    priorities: Counter = field(default_factory=Counter)
+
+
+def _summarize_batch_worker(
+    model_name: str, max_summary_sentences: int, texts: List[str], keywords: List[Optional[KeywordConfig]]
+) -> Tuple[List[SummarizeResult], float]:
+    """Top-level (picklable) entry point used by the process pool: one backend batch, timed."""
+    started = time.perf_counter()
+    results = get_backend(model_name).summarize_many(
+        texts, keywords=keywords, max_summary_sentences=max_summary_sentences
+    )
+    return results, time.perf_counter() - started
+
+
+def _chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
 
 
 class SummarizerService:
     """
-    Lightweight NLP-ish service you can replace later with a real model.
+    Loads texts, runs them through the `model_name` backend in batches, persists the results.
     """
 
     def __init__(
         self,
-        model_name: str = "simple-v1",
+        model_name: str = DEFAULT_BACKEND,
         max_summary_sentences: int = DEFAULT_MAX_SUMMARY_SENTENCES,
     ):
-        self.model_name = model_name
         self.max_summary_sentences = max_summary_sentences
+        # e.g. "local-v1" without its model resolves to the rules, stored as "simple-v1"
+        self.model_name, self.backend = get_backend(model_name).resolve(model_name)
 
     # ------------- Public API (entry points) -------------
 
     @transaction.atomic
-    def annotate_conversation(self, conversation_id: int, create_tasks: bool = True) -> SummarizeResult:
+    def annotate_conversation(
+        self, conversation_id: int, create_tasks: bool = True, force: bool = False, incremental: bool = False
+    ) -> SummarizeResult:
+        if incremental:
+            return self._annotate_incremental(conversation_id, create_tasks=create_tasks, force=force)
         conv = Conversation.objects.select_related("workspace").get(pk=conversation_id)
         text = self._conversation_text(conv)
-        result = self._summarize_and_extract(text)
-
-        # Upsert annotations
-        self._upsert_annotation(conv.workspace, conv, AIAnnotation.Kind.SUMMARY, content_text=result.summary)
-        self._upsert_annotation(
-            conv.workspace,
-            conv,
-            AIAnnotation.Kind.PRIORITY,
-            content_text=result.priority_label,
-            content_json={"label": result.priority_label, "score": result.priority_score},
-            score=result.priority_score,
+        keywords = workspace_keyword_config(conv.workspace)
+        fingerprint = self._input_fingerprint(text, keywords, create_tasks)
+
+        # Unchanged input since the last run: reuse what is stored instead of recomputing
+        if not force and conv.hash_key == fingerprint:
+            cached = self._stored_result(conv)
+            if cached is not None:
+                return cached
+
+        result = self._summarize_and_extract(text, keywords, self._idf_table(conv.workspace_id))
+        self._write_conversation_results([(conv, result, fingerprint)], create_tasks=create_tasks)
+        return result
+
+    def annotate_conversations_batch(
+        self,
+        conversation_ids: Iterable[int],
+        *,
+        create_tasks: bool = True,
+        force: bool = False,
+        workers: int = 1,
+        chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+        incremental: bool = False,
+        progress: Optional[Callable[[BatchReport], None]] = None,
+    ) -> BatchReport:
+        """
+        Annotate many conversations: per chunk, load all texts in two queries, summarize them
+        in backend-sized batches (across a process pool when workers > 1 and the backend allows
+        it), then write results in one transaction.
+        Conversations whose input fingerprint matches `hash_key` (and whose annotations are still
+        stored) are skipped unless `force`.
+        With `incremental` only messages without a current digest are summarized (in process),
+        and each conversation is merged from its messages' digests.
+        """
+        report = BatchReport()
+        parallel = workers > 1 and self.backend.parallel and not incremental
+        pool = ProcessPoolExecutor(max_workers=workers) if parallel else None
+        try:
+            for chunk_ids in _chunked(conversation_ids, max(chunk_size, 1)):
+                if incremental:
+                    with transaction.atomic():
+                        convs, items, digested = self._merge_from_digests(
+                            chunk_ids, create_tasks=create_tasks, force=force
+                        )
+                        self._write_conversation_results(items, create_tasks=create_tasks)
+                    report.digested += digested
+                else:
+                    convs, items = self._summarize_chunk(
+                        chunk_ids, create_tasks=create_tasks, force=force, pool=pool, workers=workers
+                    )
+                    with transaction.atomic():
+                        self._write_conversation_results(items, create_tasks=create_tasks)
+
+                report.skipped += len(convs) - len(items)
+                report.processed += len(items)
+                for _, result, _ in items:
+                    report.actions += len(result.actions)
+                    report.priorities[result.priority_label] += 1
+                if progress is not None:
+                    progress(report)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return report
+
+    def _summarize_chunk(
+        self,
+        conversation_ids: Sequence[int],
+        *,
+        create_tasks: bool,
+        force: bool,
+        pool: Optional[ProcessPoolExecutor],
+        workers: int,
+    ) -> Tuple[List[Conversation], List[Tuple[Conversation, SummarizeResult, str]]]:
+        """Full-text path of the batch: (all conversations, (conv, result, fingerprint) of changed ones)."""
+        convs, texts = self._load_conversation_texts(conversation_ids)
+        configs = [workspace_keyword_config(conv.workspace) for conv in convs]
+        fingerprints = [
+            self._input_fingerprint(text, config, create_tasks) for text, config in zip(texts, configs)
+        ]
+        annotated = set() if force else self._annotated_ids(
+            [conv for conv, fp in zip(convs, fingerprints) if conv.hash_key == fp]
+        )
+        pending, keywords = [], []
+        for conv, text, config, fingerprint in zip(convs, texts, configs, fingerprints):
+            if conv.pk not in annotated:
+                pending.append((conv, text, fingerprint))
+                keywords.append(config)
+
+        texts = [text for _, text, _ in pending]
+        if pool is not None:
+            # smaller batches than the backend's, so every worker gets several
+            worker_fn = partial(_summarize_batch_worker, self.model_name, self.max_summary_sentences)
+            size = min(max(len(texts) // (workers * 4), 1), self.backend.batch_size)
+            results = []
+            for batch, seconds in pool.map(worker_fn, _chunked(texts, size), _chunked(keywords, size)):
+                record_backend_call(self.model_name, len(batch), seconds)
+                results.extend(batch)
+        else:
+            results = self._summarize_many(texts, keywords, self._idf_tables([conv for conv, _, _ in pending]))
+        return convs, [(conv, result, fp) for (conv, _, fp), result in zip(pending, results)]
+
+    # ------------- Incremental (per-message digests) -------------
+
+    def _annotate_incremental(self, conversation_id: int, *, create_tasks: bool, force: bool) -> SummarizeResult:
+        convs, items, _ = self._merge_from_digests([conversation_id], create_tasks=create_tasks, force=force)
+        if not convs:
+            raise Conversation.DoesNotExist(f"Conversation {conversation_id} not found")
+        if not items:
+            cached = self._stored_result(convs[0])
+            if cached is not None:
+                return cached
+            convs, items, _ = self._merge_from_digests([conversation_id], create_tasks=create_tasks, force=True)
+        self._write_conversation_results(items, create_tasks=create_tasks)
+        return items[0][1]
+
+    def _merge_from_digests(
+        self, conversation_ids: Sequence[int], *, create_tasks: bool, force: bool
+    ) -> Tuple[List[Conversation], List[Tuple[Conversation, SummarizeResult, str]], int]:
+        """
+        Incremental path: find each conversation's latest messages (ids and timestamps only), skip
+        conversations whose message window is unchanged (and still annotated), digest the window messages that have no
+        current digest, then merge every changed conversation from digests.
+        Returns (all conversations, (conv, result, fingerprint) of changed ones, messages digested).
+        """
+        if not self.backend.supports_digests:
+            raise ValueError(f"backend {self.model_name!r} does not support incremental annotation")
+        convs = list(Conversation.objects.select_related("workspace").filter(pk__in=conversation_ids))
+        windows: Dict[int, List[Tuple[int, datetime]]] = {c.pk: [] for c in convs}
+        for conv_id, msg_id, updated_at in self._latest_messages(windows.keys(), "id", "updated_at"):
+            windows[conv_id].append((msg_id, updated_at))
+
+        configs = {c.pk: workspace_keyword_config(c.workspace) for c in convs}
+        fingerprints = {}
+        for conv in convs:
+            stamp = ",".join(f"{pk}@{updated.isoformat()}" for pk, updated in windows[conv.pk])
+            text = f"digests\x00{conv.subject}\x00{stamp}"
+            fingerprints[conv.pk] = self._input_fingerprint(text, configs[conv.pk], create_tasks)
+        annotated = set() if force else self._annotated_ids(
+            [conv for conv in convs if conv.hash_key == fingerprints[conv.pk]]
         )
-        ann = self._upsert_annotation(
-            conv.workspace,
-            conv,
-            AIAnnotation.Kind.ACTION_ITEMS,
-            content_text="\n".join(f"- {a}" for a in result.actions),
-            content_json={"items": result.actions},
+        pending = [(conv, fingerprints[conv.pk]) for conv in convs if conv.pk not in annotated]
+        if not pending:
+            return convs, [], 0
+
+        owners = {pk: (conv, updated) for conv, _ in pending for pk, updated in windows[conv.pk]}
+        digests, digested = self._message_digests(owners, configs)
+        items = []
+        for conv, fingerprint in pending:
+            # the subject is not part of any message digest, but its keywords count (e.g. "Urgent: …")
+            subject_hits = compiled_matcher(configs[conv.pk]).scan(conv.subject or "").categories()
+            result = self.backend.merge_digests(
+                [digests[pk] for pk, _ in windows[conv.pk] if pk in digests],
+                extra_categories=subject_hits,
+                max_summary_sentences=self.max_summary_sentences,
+            )
+            items.append((conv, result, fingerprint))
+        return convs, items, digested
+
+    def _message_digests(
+        self, owners: Dict[int, Tuple[Conversation, datetime]], configs: Dict[int, KeywordConfig]
+    ) -> Tuple[Dict[int, MessageDigest], int]:
+        """
+        Digest per message id: cached ones that are newer than the message and were made with the
+        same settings, then those of an older near-duplicate (services/dedup.py), then fresh ones
+        for the rest. New rows are stored in one upsert. Returns (digests, fresh count).
+        """
+        ct = ContentType.objects.get_for_model(Message)
+        keys = {pk: self._digest_key(configs[conv.pk]) for pk, (conv, _) in owners.items()}
+        digests = self._stored_digests(ct, {pk: (keys[pk], updated) for pk, (_, updated) in owners.items()})
+
+        missing = [pk for pk in owners if pk not in digests]
+        if not missing:
+            return digests, 0
+        sources = duplicate_sources(missing)
+        source_updated = dict(Message.objects.filter(pk__in=set(sources.values())).values_list("id", "updated_at"))
+        shared = self._stored_digests(
+            ct, {src: (keys[pk], source_updated[src]) for pk, src in sources.items() if src in source_updated}
+        )
+        reused = {pk: shared[sources[pk]] for pk in sources if sources[pk] in shared}
+
+        ids, texts = [], []
+        if len(reused) < len(missing):
+            bodies = Message.objects.filter(pk__in=[pk for pk in missing if pk not in reused])
+            for pk, text, html in bodies.values_list("id", "text", "html"):
+                ids.append(pk)
+                texts.append(self._best_text(text, html))
+        convs = [owners[pk][0] for pk in ids]
+        fresh = self._run_backend(
+            self.backend.digest_many, texts, [configs[c.pk] for c in convs], self._idf_tables(convs)
+        )
+        new = {**reused, **dict(zip(ids, fresh))}
+
+        now = timezone.now()
+        AIAnnotation.objects.bulk_create(
+            [
+                AIAnnotation(
+                    workspace=owners[pk][0].workspace,
+                    target_content_type=ct,
+                    target_object_id=pk,
+                    kind=AIAnnotation.Kind.DIGEST,
+                    content_text=" ".join(sentence for sentence, _ in digest.sentences),
+                    content_json={**digest.as_json(), "key": keys[pk]},
+                    model_name=self.model_name,
+                    updated_at=now,
+                )
+                for pk, digest in new.items()
+            ],
+            update_conflicts=True,
+            unique_fields=ANNOTATION_UPSERT_KEY,
+            update_fields=ANNOTATION_UPDATE_FIELDS,
+        )
+        digests.update(new)
+        return digests, len(ids)
+
+    def _stored_digests(
+        self, ct: ContentType, wanted: Dict[int, Tuple[str, datetime]]
+    ) -> Dict[int, MessageDigest]:
+        """Stored digests of these messages made with their settings key and newer than their last edit."""
+        if not wanted:
+            return {}
+        digests: Dict[int, MessageDigest] = {}
+        for msg_id, data, stamped in AIAnnotation.objects.filter(
+            target_content_type=ct,
+            target_object_id__in=list(wanted),
+            kind=AIAnnotation.Kind.DIGEST,
+            model_name=self.model_name,
+        ).values_list("target_object_id", "content_json", "updated_at"):
+            key, updated = wanted[msg_id]
+            if data.get("key") == key and stamped >= updated:
+                digests[msg_id] = MessageDigest.from_json(data)
+        return digests
+
+    def _digest_key(self, keywords: KeywordConfig) -> str:
+        """Settings a digest depends on besides the message itself (backend, sentences kept, keywords)."""
+        key = f"{self.backend.fingerprint}\x00{self.max_summary_sentences}\x00{keywords!r}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+    def _write_conversation_results(
+        self,
+        items: Sequence[Tuple[Conversation, SummarizeResult, str]],
+        *,
+        create_tasks: bool,
+    ) -> None:
+        previous = self._stored_priority_labels([conv for conv, _, _ in items])
+        self._write_results([(conv.workspace, conv, result) for conv, result, _ in items], create_tasks=create_tasks)
+        move_priority_rollups(
+            (conv.workspace_id, local_day(conv.created_at), previous.get(conv.pk), result.priority_label)
+            for conv, result, _ in items
         )
 
-        # Optional tasks creation (dedup by title+source)
-        if create_tasks and result.actions:
-            self._ensure_tasks_from_actions(
-                workspace=conv.workspace,
-                source_obj=conv,
-                actions=result.actions,
-                origin_annotation=ann,
+        # Remember what each run was computed from (see `_input_fingerprint`)
+        changed = []
+        for conv, _, fingerprint in items:
+            if fingerprint and conv.hash_key != fingerprint:
+                conv.hash_key = fingerprint
+                changed.append(conv)
+        if changed:
+            Conversation.objects.bulk_update(changed, ["hash_key"])
+        refresh_inbox(conv.pk for conv, _, _ in items)
+
+    def _stored_priority_labels(self, convs: Sequence[Conversation]) -> Dict[int, str]:
+        """The label each conversation is counted under in the rollups: its newest PRIORITY of any model."""
+        if not convs:
+            return {}
+        return dict(
+            AIAnnotation.objects.filter(
+                target_content_type=ContentType.objects.get_for_model(Conversation),
+                target_object_id__in=[c.pk for c in convs],
+                kind=AIAnnotation.Kind.PRIORITY,
+            )
+            .order_by("updated_at", "id")
+            .values_list("target_object_id", "content_text")   # later rows overwrite: newest wins
+        )
+
+    def _input_fingerprint(
+        self, text: str, keywords: Optional[KeywordConfig] = None, create_tasks: bool = True
+    ) -> str:
+        """
+        sha256 over everything that determines the output: model label, backend, summary length,
+        keywords, text, and whether tasks were created (so a `--no-tasks` run doesn't satisfy a later
+        run that wants them).
+        """
+        keywords = keywords or keyword_config()
+        settings_key = f"{self.model_name}\x00{self.backend.fingerprint}\x00{self.max_summary_sentences}"
+        key = f"{settings_key}\x00{create_tasks:d}\x00{keywords!r}\x00{text}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _annotated_ids(self, convs: Sequence[Conversation]) -> Set[int]:
+        """Ids of these conversations that still have all three of this model's stored annotations."""
+        if not convs:
+            return set()
+        return set(
+            AIAnnotation.objects.filter(
+                target_content_type=ContentType.objects.get_for_model(Conversation),
+                target_object_id__in=[conv.pk for conv in convs],
+                model_name=self.model_name,
+                kind__in=[AIAnnotation.Kind.SUMMARY, AIAnnotation.Kind.PRIORITY, AIAnnotation.Kind.ACTION_ITEMS],
             )
+            .values("target_object_id")
+            .annotate(kinds=Count("kind", distinct=True))
+            .filter(kinds=3)
+            .values_list("target_object_id", flat=True)
+        )
 
-        return result
+    def _stored_result(self, target_obj) -> Optional[SummarizeResult]:
+        """Rebuild a SummarizeResult from this model's stored annotations (None if any are missing)."""
+        ct = ContentType.objects.get_for_model(type(target_obj))
+        rows = {
+            a.kind: a
+            for a in AIAnnotation.objects.filter(
+                target_content_type=ct,
+                target_object_id=target_obj.pk,
+                model_name=self.model_name,
+                kind__in=[AIAnnotation.Kind.SUMMARY, AIAnnotation.Kind.PRIORITY, AIAnnotation.Kind.ACTION_ITEMS],
+            )
+        }
+        if len(rows) < 3:
+            return None
+        priority = rows[AIAnnotation.Kind.PRIORITY]
+        return SummarizeResult(
+            summary=rows[AIAnnotation.Kind.SUMMARY].content_text,
+            actions=list(rows[AIAnnotation.Kind.ACTION_ITEMS].content_json.get("items", [])),
+            priority_label=priority.content_json.get("label", priority.content_text),
+            priority_score=priority.score if priority.score is not None else 0.0,
+        )
 
     @transaction.atomic
     def annotate_message(self, message_id: int, create_tasks: bool = False) -> SummarizeResult:
         msg = Message.objects.select_related("conversation__workspace").get(pk=message_id)
-        text = self._message_text(msg)
-        result = self._summarize_and_extract(text)
-
-        ws = msg.conversation.workspace
-
-        self._upsert_annotation(ws, msg, AIAnnotation.Kind.SUMMARY, content_text=result.summary)
-        self._upsert_annotation(
-            ws,
-            msg,
-            AIAnnotation.Kind.PRIORITY,
-            content_text=result.priority_label,
-            content_json={"label": result.priority_label, "score": result.priority_score},
-            score=result.priority_score,
-        )
-        ann = self._upsert_annotation(
-            ws,
-            msg,
-            AIAnnotation.Kind.ACTION_ITEMS,
-            content_text="\n".join(f"- {a}" for a in result.actions),
-            content_json={"items": result.actions},
-        )
-
-        if create_tasks and result.actions:
-            self._ensure_tasks_from_actions(
-                workspace=ws,
-                source_obj=msg,
-                actions=result.actions,
-                origin_annotation=ann,
-            )
 
+        # A near-duplicate of an annotated message (newsletter, notification) shares its result;
+        # its tasks already exist for the original
+        source = duplicate_sources([msg.pk]).get(msg.pk)
+        if source is not None:
+            shared = self._stored_result(Message(pk=source))
+            if shared is not None:
+                self._write_results([(msg.conversation.workspace, msg, shared)], create_tasks=False)
+                return shared
+        text = self._message_text(msg)
+        workspace = msg.conversation.workspace
+        result = self._summarize_and_extract(text, workspace_keyword_config(workspace), self._idf_table(workspace.pk))
+        self._write_results([(msg.conversation.workspace, msg, result)], create_tasks=create_tasks)
         return result
 
     # ------------- Core logic -------------
 
-    def _summarize_and_extract(self, raw_text: str) -> SummarizeResult:
-        text = self._clean_text(raw_text)[:DEFAULT_MAX_TEXT_CHARS]
-        sentences = self._split_sentences(text)
+    def _summarize_and_extract(
+        self, raw_text: str, keywords: Optional[KeywordConfig] = None, idf: Optional[IdfTable] = None
+    ) -> SummarizeResult:
+        return self._summarize_many([raw_text], [keywords], [idf])[0]
 
-        summary = self._summarize_sentences(sentences, self.max_summary_sentences)
-        actions = self._extract_action_items(text, sentences, limit=DEFAULT_ACTIONS_LIMIT)
-        label, score = self._priority_heuristic(text, actions)
+    def _summarize_many(
+        self,
+        texts: Sequence[str],
+        keywords: Sequence[Optional[KeywordConfig]],
+        idfs: Optional[Sequence[Optional[IdfTable]]] = None,
+    ) -> List[SummarizeResult]:
+        return self._run_backend(self.backend.summarize_many, texts, keywords, idfs)
 
-        return SummarizeResult(summary=summary, actions=actions, priority_label=label, priority_score=score)
+    def _run_backend(
+        self,
+        method: Callable[..., list],
+        texts: Sequence[str],
+        keywords: Sequence[Optional[KeywordConfig]],
+        idfs: Optional[Sequence[Optional[IdfTable]]] = None,
+    ) -> list:
+        """Call a backend method over `texts` in batches of its `batch_size`, timing every call."""
+        size = max(self.backend.batch_size, 1)
+        results: list = []
+        for start in range(0, len(texts), size):
+            end = start + size
+            started = time.perf_counter()
+            batch = method(
+                texts[start:end],
+                keywords=keywords[start:end],
+                idfs=idfs[start:end] if idfs is not None else None,
+                max_summary_sentences=self.max_summary_sentences,
+            )
+            record_backend_call(self.model_name, len(batch), time.perf_counter() - started)
+            results.extend(batch)
+        return results
+
+    def _idf_table(self, workspace_id: int) -> Optional[IdfTable]:
+        return load_idf_tables([workspace_id])[workspace_id] if self.backend.uses_idf else None
+
+    def _idf_tables(self, convs: Sequence[Conversation]) -> Optional[List[IdfTable]]:
+        """IdfTable per conversation (one query), when the backend ranks with them."""
+        if not self.backend.uses_idf or not convs:
+            return None
+        tables = load_idf_tables(conv.workspace_id for conv in convs)
+        return [tables[conv.workspace_id] for conv in convs]
 
     # ------------- Text builders -------------
 
     def _conversation_text(self, conv: Conversation) -> str:
-        parts: List[str] = []
-        if conv.subject:
-            parts.append(conv.subject.strip())
-
         # use most recent ~20 messages for a concise digest
         messages = (
-            conv.messages.select_related("sender")
-            .order_by("-sent_at")[:20]
+            conv.messages.order_by("-sent_at")[:DEFAULT_CONVERSATION_MESSAGES]
             .values_list("text", "html")
         )
+        return self._build_conversation_text(conv.subject, messages)
+
+    def _load_conversation_texts(self, conversation_ids: Sequence[int]) -> Tuple[List[Conversation], List[str]]:
+        """Bulk variant of `_conversation_text`: one query for conversations, one for their messages."""
+        convs = list(Conversation.objects.select_related("workspace").filter(pk__in=conversation_ids))
+        bodies: Dict[int, List[Tuple[str, str]]] = {c.pk: [] for c in convs}
+        for conv_id, text, html in self._latest_messages(bodies.keys(), "text", "html"):
+            bodies[conv_id].append((text, html))
+        texts = [self._build_conversation_text(c.subject, bodies[c.pk]) for c in convs]
+        return convs, texts
+
+    @staticmethod
+    def _latest_messages(conversation_ids: Iterable[int], *fields: str):
+        """(conversation_id, *fields) of each conversation's latest N messages, newest first, in one query."""
+        return (
+            Message.objects.filter(conversation_id__in=list(conversation_ids))
+            .annotate(
+                rank=Window(RowNumber(), partition_by=[F("conversation_id")], order_by=F("sent_at").desc())
+            )
+            .filter(rank__lte=DEFAULT_CONVERSATION_MESSAGES)
+            .order_by("conversation_id", "rank")
+            .values_list("conversation_id", *fields)
+        )
+
+    def _build_conversation_text(self, subject: str, messages: Iterable[Tuple[str, str]]) -> str:
+        parts: List[str] = []
+        if subject:
+            parts.append(subject.strip())
         for text, html in messages:
             parts.append(self._best_text(text, html))
         return "\n\n".join(p for p in parts if p)
@@ -221,120 +615,113 @@ class SummarizerService:
         collapsed = RE_WHITESPACE.sub(" ", no_tags)
         return collapsed.strip()
 
-    @staticmethod
-    def _clean_text(text: str) -> str:
-        return RE_WHITESPACE.sub(" ", (text or "")).strip()
-
-    @staticmethod
-    def _split_sentences(text: str) -> List[str]:
-        if not text:
-            return []
-        # keep original order; naive split
-        raw = RE_SENTENCE_SPLIT.split(text)
-        # filter very short/noisy sentences
-        return [s.strip() for s in raw if len(s.strip()) >= DEFAULT_MIN_SENT_LEN]
-
-    @staticmethod
-    def _tokenize_words(text: str) -> List[str]:
-        return [w.lower() for w in re.findall(r"[A-Za-z0-9']+", text)]
-
-    def _summarize_sentences(self, sentences: Sequence[str], k: int) -> str:
-        if not sentences:
-            return ""
-        # score sentences by word frequency (minus stopwords), select top-k in original order
-        all_words = self._tokenize_words(" ".join(sentences))
-        freqs = Counter(w for w in all_words if w not in STOPWORDS)
-
-        scored = []
-        for idx, s in enumerate(sentences):
-            words = self._tokenize_words(s)
-            score = sum(freqs.get(w, 0) for w in words)
-            scored.append((idx, score, s))
-
-        # pick top-k by score, but sort back by original index to keep flow
-        top = sorted(sorted(scored, key=lambda x: x[1], reverse=True)[:k], key=lambda x: x[0])
-        return " ".join(s for _, __, s in top)
-
-    def _extract_action_items(self, text: str, sentences: Sequence[str], limit: int = 10) -> List[str]:
-        actions: List[str] = []
-
-        # 1) bullets are strong action hints
-        for line in text.splitlines():
-            if RE_BULLET.match(line) or RE_ACTION_HINT.search(line):
-                cleaned = RE_BULLET.sub("", line).strip()
-                if cleaned and cleaned not in actions:
-                    actions.append(self._normalize_action(cleaned))
-            if len(actions) >= limit:
-                return actions[:limit]
-
-        # 2) imperative/requests in sentences
-        imperative_verbs = (
-            "please ", "kindly ", "let's ", "lets ", "we should ", "you should ",
-            "need to ", "must ", "can you ", "action required", "follow up",
-        )
-        for s in sentences:
-            low = s.lower()
-            if any(v in low for v in imperative_verbs) or RE_ACTION_HINT.search(s):
-                norm = self._normalize_action(s)
-                if norm and norm not in actions:
-                    actions.append(norm)
-            if len(actions) >= limit:
-                break
-
-        return actions[:limit]
-
-    @staticmethod
-    def _normalize_action(text: str) -> str:
-        t = text.strip()
-        # trim trailing periods and excessive spaces
-        t = re.sub(r"\s+", " ", t)
-        t = re.sub(r"[.·•\-\*]+$", "", t).strip()
-        # cap to a reasonable title length for Task.title
-        return (t[:240]).strip()
-
-    def _priority_heuristic(self, text: str, actions: Sequence[str]) -> Tuple[str, float]:
-        low = text.lower()
-        # spam?
-        if RE_SPAM_HINT.search(low):
-            return ("spam", 0.85)
-        # urgent?
-        if "asap" in low or "urgent" in low or "immediately" in low:
-            return ("urgent", 0.9)
-        # action if we detected actionable items
-        if actions:
-            return ("action", 0.7)
-        # otherwise fyi
-        return ("fyi", 0.6)
-
     # ------------- Persistence helpers -------------
 
-    def _upsert_annotation(
+    def _write_results(
         self,
-        workspace: Workspace,
-        target_obj,
-        kind: str,
+        items: Sequence[Tuple[Workspace, models.Model, SummarizeResult]],
         *,
-        content_text: str = "",
-        content_json: Optional[dict] = None,
-        score: Optional[float] = None,
-    ) -> AIAnnotation:
-        """Upsert by (workspace, kind, target_content_type, target_object_id, model_name)."""
-        content_json = content_json or {}
-        ct = ContentType.objects.get_for_model(type(target_obj))
-        anno, created = AIAnnotation.objects.update_or_create(
-            workspace=workspace,
-            kind=kind,
-            target_content_type=ct,
-            target_object_id=target_obj.pk,
-            model_name=self.model_name,
-            defaults={
-                "content_text": content_text or "",
-                "content_json": content_json,
-                "score": score,
-                "updated_at": timezone.now(),
-            },
+        create_tasks: bool,
+    ) -> None:
+        """Persist annotations for many (workspace, target, result) items, then derive tasks."""
+        action_annotations = self.bulk_upsert_annotations(items)
+        self._publish_annotation_events(items)
+        if not create_tasks:
+            return
+        # Optional tasks creation (dedup by title+source)
+        self._bulk_ensure_tasks(
+            [
+                (workspace, target_obj, result.actions, ann)
+                for (workspace, target_obj, result), ann in zip(items, action_annotations)
+                if result.actions
+            ]
+        )
+
+    def _publish_annotation_events(self, items: Sequence[Tuple[Workspace, models.Model, SummarizeResult]]) -> None:
+        by_workspace: Dict[int, list] = {}
+        for workspace, target_obj, result in items:
+            by_workspace.setdefault(workspace.pk, []).append(
+                (
+                    ANNOTATION_CREATED,
+                    {
+                        "target_type": type(target_obj)._meta.model_name,
+                        "target_id": target_obj.pk,
+                        "model_name": self.model_name,
+                        "priority": result.priority_label,
+                        "summary": result.summary[:280],
+                        "actions": len(result.actions),
+                    },
+                )
+            )
+        for workspace_id, events in by_workspace.items():
+            publish_many_on_commit(workspace_id, events)
+
+    def bulk_upsert_annotations(
+        self, items: Sequence[Tuple[Workspace, models.Model, SummarizeResult]]
+    ) -> List[AIAnnotation]:
+        """
+        Upsert SUMMARY / PRIORITY / ACTION_ITEMS for every item in a single INSERT ... ON CONFLICT
+        against (workspace, kind, target_content_type, target_object_id, model_name).
+        Returns the ACTION_ITEMS annotation of each item, in input order.
+        """
+        if not items:
+            return []
+        now = timezone.now()
+        content_types: Dict[type, ContentType] = {}
+        rows: List[AIAnnotation] = []
+        for workspace, target_obj, result in items:
+            model = type(target_obj)
+            if model not in content_types:
+                content_types[model] = ContentType.objects.get_for_model(model)
+            common = {
+                "workspace": workspace,
+                "target_content_type": content_types[model],
+                "target_object_id": target_obj.pk,
+                "model_name": self.model_name,
+                "updated_at": now,
+            }
+            rows.append(AIAnnotation(kind=AIAnnotation.Kind.SUMMARY, content_text=result.summary, **common))
+            rows.append(
+                AIAnnotation(
+                    kind=AIAnnotation.Kind.PRIORITY,
+                    content_text=result.priority_label,
+                    content_json={"label": result.priority_label, "score": result.priority_score},
+                    score=result.priority_score,
+                    **common,
+                )
+            )
+            rows.append(
+                AIAnnotation(
+                    kind=AIAnnotation.Kind.ACTION_ITEMS,
+                    content_text="\n".join(f"- {a}" for a in result.actions),
+                    content_json={"items": result.actions},
+                    **common,
+                )
+            )
+
+        AIAnnotation.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=ANNOTATION_UPSERT_KEY,
+            update_fields=ANNOTATION_UPDATE_FIELDS,
         )
-        return anno
+        action_rows = rows[2::3]
+        if any(a.pk is None for a in action_rows):
+            # Backends that can't return ids from an upsert: resolve them in one query
+            self._resolve_annotation_ids(action_rows)
+        return action_rows
+
+    def _resolve_annotation_ids(self, annotations: Sequence[AIAnnotation]) -> None:
+        wanted = {(a.target_content_type_id, a.target_object_id) for a in annotations}
+        found = {}
+        for pk, ct_id, obj_id, ws_id in AIAnnotation.objects.filter(
+            kind=annotations[0].kind,
+            model_name=self.model_name,
+            target_object_id__in={obj_id for _, obj_id in wanted},
+        ).values_list("pk", "target_content_type_id", "target_object_id", "workspace_id"):
+            found[(ws_id, ct_id, obj_id)] = pk
+        for a in annotations:
+            a.pk = found.get((a.workspace_id, a.target_content_type_id, a.target_object_id))
 
     def _ensure_tasks_from_actions(
         self,
@@ -344,31 +731,52 @@ class SummarizerService:
         actions: Sequence[str],
         origin_annotation: Optional[AIAnnotation] = None,
     ) -> List[Task]:
-        """Create Task rows for each action if not already present (by title+source, not DONE/DISMISSED)."""
-        ct = ContentType.objects.get_for_model(type(source_obj))
-        created_tasks: List[Task] = []
-
-        for title in actions:
-            exists = Task.objects.filter(
-                workspace=workspace,
-                source_content_type=ct,
-                source_object_id=source_obj.pk,
-                title=title,
-                is_deleted=False,
-            ).exclude(status=Task.Status.DONE).exists()
-
-            if exists:
-                continue
-
-            t = Task.objects.create(
-                workspace=workspace,
-                source_content_type=ct,
-                source_object_id=source_obj.pk,
-                title=title,
-                status=Task.Status.TODO,
-                origin_annotation=origin_annotation,
-                confidence=0.65,  # heuristic confidence; tune if you like
-            )
-            created_tasks.append(t)
+        """Create Task rows for each action if not already present (by title+source, not DONE)."""
+        return self._bulk_ensure_tasks([(workspace, source_obj, actions, origin_annotation)])
 
-        return created_tasks
\ No newline at end of file
+    def _bulk_ensure_tasks(
+        self,
+        items: Sequence[Tuple[Workspace, models.Model, Sequence[str], Optional[AIAnnotation]]],
+    ) -> List[Task]:
+        """
+        Set-based `_ensure_tasks_from_actions` for many sources: one query per source model for the
+        open titles that already exist, one bulk INSERT for the rest. The partial unique constraint
+        on open tasks turns a concurrent duplicate into a no-op, so returned tasks may lack a pk.
+        """
+        by_model: Dict[type, List[int]] = {}
+        for _, source_obj, _, _ in items:
+            by_model.setdefault(type(source_obj), []).append(source_obj.pk)
+
+        existing = set()
+        for model, source_ids in by_model.items():
+            ct = ContentType.objects.get_for_model(model)
+            open_tasks = (
+                Task.objects.filter(source_content_type=ct, source_object_id__in=source_ids, is_deleted=False)
+                .exclude(status=Task.Status.DONE)
+                .values_list("workspace_id", "source_object_id", "title")
+            )
+            existing.update((ct.pk, *row) for row in open_tasks)
+
+        new_tasks: List[Task] = []
+        for workspace, source_obj, actions, origin_annotation in items:
+            ct = ContentType.objects.get_for_model(type(source_obj))
+            for title in actions:
+                key = (ct.pk, workspace.pk, source_obj.pk, title)
+                if key in existing:
+                    continue
+                existing.add(key)
+                new_tasks.append(
+                    Task(
+                        workspace=workspace,
+                        source_content_type=ct,
+                        source_object_id=source_obj.pk,
+                        title=title,
+                        status=Task.Status.TODO,
+                        origin_annotation=origin_annotation,
+                        confidence=0.65,  # heuristic confidence; tune if you like
+                    )
+                )
+
+        if new_tasks:
+            Task.objects.bulk_create(new_tasks, ignore_conflicts=True)
+        return new_tasks
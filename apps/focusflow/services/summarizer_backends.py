@@ -0,0 +1,477 @@
+# apps/focusflow/services/summarizer_backends.py
+"""
+Summarizer backends: the models behind `SummarizerService`, picked by its `model_name`
+(`manage.py focusflow_annotate --model ...`).
+
+- A backend turns many texts into `SummarizeResult`s in one `summarize_many()` call; the service
+  feeds it batches of `batch_size` texts, so a real model runs once per batch, not per conversation
+- Built in:
+      simple-v1   sentence ranking by in-document word frequency + keyword rules (default)
+      tfidf-v1    same rules, sentences ranked by workspace TF-IDF (services/tfidf.py)
+      local-v1    a local transformers summarization model on CPU (FOCUSFLOW_LOCAL_SUMMARY_MODEL)
+                  for the summary text; actions and priority still come from the rules. Without
+                  transformers (or the model files) it quietly falls back to simple-v1
+- The rule backends also support incremental annotation: `digest_many()` condenses single messages
+  into a `MessageDigest` (best sentences with scores, actions, keyword categories) that is cached,
+  and `merge_digests()` builds a conversation result from the digests of its latest messages
+- Register more with FOCUSFLOW_SUMMARIZER_BACKENDS = {"name": "dotted.path.Backend"} or
+  `register_backend()`; a model name nobody registered runs the simple-v1 rules under that label
+- Every call is timed per backend (calls, texts, seconds): `backend_stats()` gives latency per
+  batch and throughput in texts per second for this process
+
+Usage
+-----
+from apps.focusflow.services.summarizer_backends import backend_stats, get_backend
+results = get_backend("tfidf-v1").summarize_many(texts)
+backend_stats()["tfidf-v1"].throughput
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, replace
+from typing import AbstractSet, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .keywords import (
+    ACTION_HINT,
+    IMPERATIVE,
+    SPAM,
+    URGENT,
+    KeywordConfig,
+    ScanResult,
+    compiled_matcher,
+    keyword_config,
+)
+from .tfidf import RE_WORD, STOPWORDS, IdfTable, score_sentences
+
+# -------------------------
+# Config (tweak as needed)
+# -------------------------
+
+DEFAULT_MAX_SUMMARY_SENTENCES = 3
+DEFAULT_MIN_SENT_LEN = 30           # characters; avoid tiny/noisy sentences
+DEFAULT_MAX_TEXT_CHARS = 15000      # cap input to keep it snappy in dev
+DEFAULT_ACTIONS_LIMIT = 10
+DEFAULT_BACKEND = "simple-v1"
+DEFAULT_LOCAL_MODEL = "sshleifer/distilbart-cnn-6-6"
+
+DEFAULT_BACKENDS = {
+    "simple-v1": "apps.focusflow.services.summarizer_backends.HeuristicBackend",
+    "tfidf-v1": "apps.focusflow.services.summarizer_backends.TfidfBackend",
+    "local-v1": "apps.focusflow.services.summarizer_backends.LocalModelBackend",
+}
+
+# Regex helpers
+RE_WHITESPACE = re.compile(r"\s+")
+RE_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9])")
+RE_BULLET = re.compile(r"^\s*[-*•]\s+", re.MULTILINE)
+RE_TRAILING_PUNCT = re.compile(r"[.·•\-\*]+$")
+SENTENCE_ACTION_HINTS = frozenset({IMPERATIVE, ACTION_HINT})
+
+
+@dataclass
+class SummarizeResult:
+    summary: str
+    actions: List[str]
+    priority_label: str
+    priority_score: float
+
+
+@dataclass
+class MessageDigest:
+    """What a conversation merge needs from one message, small enough to cache as JSON."""
+    sentences: List[Tuple[str, float]]      # best sentences in text order, with their score
+    actions: List[str]
+    categories: List[str]                   # keyword categories the message hit
+
+    def as_json(self) -> dict:
+        return {
+            "sentences": [list(pair) for pair in self.sentences],
+            "actions": self.actions,
+            "categories": self.categories,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "MessageDigest":
+        return cls(
+            sentences=[(text, score) for text, score in data.get("sentences", [])],
+            actions=list(data.get("actions", [])),
+            categories=list(data.get("categories", [])),
+        )
+
+
+# -------------------------
+# Stats
+# -------------------------
+
+@dataclass
+class BackendStats:
+    calls: int = 0
+    texts: int = 0
+    seconds: float = 0.0
+
+    @property
+    def latency_ms(self) -> float:
+        """Mean wall time of one summarize_many() batch."""
+        return 1000 * self.seconds / self.calls if self.calls else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Texts per second."""
+        return self.texts / self.seconds if self.seconds else 0.0
+
+
+_STATS: Dict[str, BackendStats] = {}
+_STATS_LOCK = threading.Lock()
+
+
+def record_backend_call(name: str, texts: int, seconds: float) -> None:
+    with _STATS_LOCK:
+        stats = _STATS.setdefault(name, BackendStats())
+        stats.calls += 1
+        stats.texts += texts
+        stats.seconds += seconds
+
+
+def backend_stats() -> Dict[str, BackendStats]:
+    """Snapshot of this process's per-backend counters."""
+    with _STATS_LOCK:
+        return {name: replace(stats) for name, stats in _STATS.items()}
+
+
+def reset_backend_stats() -> None:
+    with _STATS_LOCK:
+        _STATS.clear()
+
+
+# -------------------------
+# Backends
+# -------------------------
+
+class SummarizerBackend:
+    """A summarization model. Subclasses implement `summarize_many`."""
+
+    batch_size = 500        # texts per summarize_many() call
+    parallel = True         # batches may be spread over a process pool (`workers`)
+    uses_idf = False        # wants the workspace IdfTable of each text
+    supports_digests = False
+
+    @property
+    def fingerprint(self) -> str:
+        """What produces the output (implementation, model files); part of the summarizer's skip key."""
+        return type(self).__qualname__
+
+    def resolve(self, name: str) -> Tuple[str, "SummarizerBackend"]:
+        """(name, backend) that really produce the output requested under `name`."""
+        return name, self
+
+    def summarize_many(
+        self,
+        texts: Sequence[str],
+        *,
+        keywords: Optional[Sequence[Optional[KeywordConfig]]] = None,
+        idfs: Optional[Sequence[Optional[IdfTable]]] = None,
+        max_summary_sentences: int = DEFAULT_MAX_SUMMARY_SENTENCES,
+    ) -> List[SummarizeResult]:
+        raise NotImplementedError
+
+    def digest_many(
+        self,
+        texts: Sequence[str],
+        *,
+        keywords: Optional[Sequence[Optional[KeywordConfig]]] = None,
+        idfs: Optional[Sequence[Optional[IdfTable]]] = None,
+        max_summary_sentences: int = DEFAULT_MAX_SUMMARY_SENTENCES,
+    ) -> List[MessageDigest]:
+        raise NotImplementedError
+
+    def merge_digests(
+        self,
+        digests: Sequence[MessageDigest],
+        *,
+        extra_categories: AbstractSet[str] = frozenset(),
+        max_summary_sentences: int = DEFAULT_MAX_SUMMARY_SENTENCES,
+    ) -> SummarizeResult:
+        raise NotImplementedError
+
+
+class HeuristicBackend(SummarizerBackend):
+    """Rules only: ranked sentences, keyword/bullet action items, keyword priority."""
+
+    supports_digests = True
+
+    def summarize_many(self, texts, *, keywords=None, idfs=None, max_summary_sentences=DEFAULT_MAX_SUMMARY_SENTENCES):
+        results = []
+        for text, spans, sentences, scores, scan in self._analyze(texts, keywords, idfs):
+            summary = self._top_sentences(sentences, scores, max_summary_sentences)
+            actions = self._extract_action_items(text, spans, scan, limit=DEFAULT_ACTIONS_LIMIT)
+            label, score = self._priority_heuristic(scan, actions)
+            results.append(
+                SummarizeResult(summary=summary, actions=actions, priority_label=label, priority_score=score)
+            )
+        return results
+
+    def digest_many(self, texts, *, keywords=None, idfs=None, max_summary_sentences=DEFAULT_MAX_SUMMARY_SENTENCES):
+        digests = []
+        for text, spans, sentences, scores, scan in self._analyze(texts, keywords, idfs):
+            best = sorted(sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)[:max_summary_sentences])
+            digests.append(
+                MessageDigest(
+                    sentences=[(sentences[i], float(scores[i])) for i in best],
+                    actions=self._extract_action_items(text, spans, scan, limit=DEFAULT_ACTIONS_LIMIT),
+                    categories=sorted(scan.categories()),
+                )
+            )
+        return digests
+
+    def merge_digests(
+        self, digests, *, extra_categories=frozenset(), max_summary_sentences=DEFAULT_MAX_SUMMARY_SENTENCES
+    ):
+        """
+        `digests` newest message first. Scores are relative to their own message, so each message's
+        are divided by its best one; the top sentences overall win, newer messages on ties.
+        """
+        candidates = []
+        for m, digest in enumerate(digests):
+            best = max((score for _, score in digest.sentences), default=0.0) or 1.0
+            for pos, (sentence, score) in enumerate(digest.sentences):
+                candidates.append((-score / best, m, pos, sentence))
+        chosen = sorted(sorted(candidates)[:max_summary_sentences], key=lambda c: (c[1], c[2]))
+
+        actions: List[str] = []
+        for digest in digests:
+            actions.extend(a for a in digest.actions if a not in actions)
+        actions = actions[:DEFAULT_ACTIONS_LIMIT]
+        categories = set(extra_categories).union(*(d.categories for d in digests))
+        label, score = self._priority_from(categories, actions)
+        return SummarizeResult(
+            summary=" ".join(c[3] for c in chosen), actions=actions, priority_label=label, priority_score=score
+        )
+
+    def _analyze(self, texts, keywords, idfs):
+        """(clean text, sentence spans, sentences, sentence scores, keyword scan) per text."""
+        keywords = keywords or [None] * len(texts)
+        cleaned = [self._clean_text(raw)[:DEFAULT_MAX_TEXT_CHARS] for raw in texts]
+        spans = [self._sentence_spans(text) for text in cleaned]
+        sentences = [[text[start:end] for start, end in doc] for text, doc in zip(cleaned, spans)]
+        scores = self._scores(sentences, idfs)
+        for text, doc_spans, doc, doc_scores, config in zip(cleaned, spans, sentences, scores, keywords):
+            scan = compiled_matcher(config or keyword_config()).scan(text)   # the only keyword pass
+            yield text, doc_spans, doc, doc_scores, scan
+
+    def _scores(self, sentences: Sequence[Sequence[str]], idfs) -> List[List[float]]:
+        return [self._frequency_scores(doc) for doc in sentences]
+
+    # ------------- NLP-ish utilities -------------
+
+    @staticmethod
+    def _clean_text(text: str) -> str:
+        return RE_WHITESPACE.sub(" ", (text or "")).strip()
+
+    @staticmethod
+    def _split_sentences(text: str) -> List[str]:
+        return [text[start:end] for start, end in HeuristicBackend._sentence_spans(text)]
+
+    @staticmethod
+    def _sentence_spans(text: str) -> List[Tuple[int, int]]:
+        """(start, end) of each sentence in `text`, stripped; very short/noisy ones are dropped."""
+        if not text:
+            return []
+        # keep original order; naive split
+        bounds, start = [], 0
+        for sep in RE_SENTENCE_SPLIT.finditer(text):
+            bounds.append((start, sep.start()))
+            start = sep.end()
+        bounds.append((start, len(text)))
+
+        spans = []
+        for start, end in bounds:
+            piece = text[start:end]
+            stripped = piece.strip()
+            if len(stripped) >= DEFAULT_MIN_SENT_LEN:
+                lead = len(piece) - len(piece.lstrip())
+                spans.append((start + lead, start + lead + len(stripped)))
+        return spans
+
+    @staticmethod
+    def _tokenize_words(text: str) -> List[str]:
+        return [w.lower() for w in RE_WORD.findall(text)]
+
+    def _summarize_sentences(self, sentences: Sequence[str], k: int) -> str:
+        if not sentences:
+            return ""
+        # score sentences by word frequency (minus stopwords), select top-k in original order
+        return self._top_sentences(sentences, self._frequency_scores(sentences), k)
+
+    def _frequency_scores(self, sentences: Sequence[str]) -> List[float]:
+        all_words = self._tokenize_words(" ".join(sentences))
+        freqs = Counter(w for w in all_words if w not in STOPWORDS)
+        return [sum(freqs.get(w, 0) for w in self._tokenize_words(s)) for s in sentences]
+
+    @staticmethod
+    def _top_sentences(sentences: Sequence[str], scores: Sequence[float], k: int) -> str:
+        # pick top-k by score, but sort back by original index to keep flow
+        scored = list(zip(range(len(sentences)), scores, sentences))
+        top = sorted(sorted(scored, key=lambda x: x[1], reverse=True)[:k], key=lambda x: x[0])
+        return " ".join(s for _, __, s in top)
+
+    def _extract_action_items(
+        self, text: str, spans: Sequence[Tuple[int, int]], scan: ScanResult, limit: int = 10
+    ) -> List[str]:
+        """Lines / sentences flagged by bullets or keyword hits; hits come from one prior `scan` of `text`."""
+        actions: List[str] = []
+
+        # 1) bullets are strong action hints
+        offset = 0
+        for line in text.splitlines(keepends=True):
+            start, offset = offset, offset + len(line)
+            if RE_BULLET.match(line) or scan.has(ACTION_HINT, start, offset):
+                cleaned = RE_BULLET.sub("", line).strip()
+                if cleaned and cleaned not in actions:
+                    actions.append(self._normalize_action(cleaned))
+            if len(actions) >= limit:
+                return actions[:limit]
+
+        # 2) imperative/requests in sentences
+        for start, end in spans:
+            if scan.has(SENTENCE_ACTION_HINTS, start, end):
+                norm = self._normalize_action(text[start:end])
+                if norm and norm not in actions:
+                    actions.append(norm)
+            if len(actions) >= limit:
+                break
+
+        return actions[:limit]
+
+    @staticmethod
+    def _normalize_action(text: str) -> str:
+        t = text.strip()
+        # trim trailing periods and excessive spaces
+        t = RE_WHITESPACE.sub(" ", t)
+        t = RE_TRAILING_PUNCT.sub("", t).strip()
+        # cap to a reasonable title length for Task.title
+        return (t[:240]).strip()
+
+    def _priority_heuristic(self, scan: ScanResult, actions: Sequence[str]) -> Tuple[str, float]:
+        return self._priority_from(scan.categories(), actions)
+
+    @staticmethod
+    def _priority_from(categories: AbstractSet[str], actions: Sequence[str]) -> Tuple[str, float]:
+        # spam?
+        if SPAM in categories:
+            return ("spam", 0.85)
+        # urgent?
+        if URGENT in categories:
+            return ("urgent", 0.9)
+        # action if we detected actionable items
+        if actions:
+            return ("action", 0.7)
+        # otherwise fyi
+        return ("fyi", 0.6)
+
+
+class TfidfBackend(HeuristicBackend):
+    """The same rules; all sentences of a batch are ranked by workspace TF-IDF in one call."""
+
+    parallel = False        # one vectorized pass per batch beats pickling idf tables to workers
+    uses_idf = True
+
+    def _scores(self, sentences, idfs):
+        tables = [idf or IdfTable() for idf in (idfs or [None] * len(sentences))]
+        return score_sentences(sentences, tables)
+
+
+class LocalModelBackend(SummarizerBackend):
+    """
+    Abstractive summaries from a local transformers model (CPU), loaded on first use and run once
+    per batch; actions and priority come from the rules. Falls back to the rules entirely when
+    transformers or the model files are missing.
+    """
+
+    batch_size = 16
+    parallel = False        # one model per process; the pipeline batches on its own
+    max_input_chars = 4000  # ~1k tokens, the usual encoder limit of small summarization models
+    fallback_name = DEFAULT_BACKEND
+
+    def __init__(self, model_id: Optional[str] = None, fallback: Optional[SummarizerBackend] = None):
+        self.model_id = model_id or getattr(settings, "FOCUSFLOW_LOCAL_SUMMARY_MODEL", DEFAULT_LOCAL_MODEL)
+        self.fallback = fallback or HeuristicBackend()
+        self._pipeline = None
+        self._load_failed = False
+
+    @property
+    def available(self) -> bool:
+        return self._load() is not None
+
+    @property
+    def fingerprint(self) -> str:
+        return f"{type(self).__qualname__}:{self.model_id}"
+
+    def resolve(self, name):
+        # without the model the rules do the work, and their output is labelled as theirs: once the
+        # model is installed, nothing looks already annotated by it
+        return (name, self) if self.available else (self.fallback_name, self.fallback)
+
+    def summarize_many(self, texts, *, keywords=None, idfs=None, max_summary_sentences=DEFAULT_MAX_SUMMARY_SENTENCES):
+        results = self.fallback.summarize_many(
+            texts, keywords=keywords, idfs=idfs, max_summary_sentences=max_summary_sentences
+        )
+        pipe = self._load()
+        todo = [i for i, text in enumerate(texts) if text.strip()]
+        if pipe is None or not todo:
+            return results
+        outputs = pipe(
+            [RE_WHITESPACE.sub(" ", texts[i])[: self.max_input_chars] for i in todo],
+            batch_size=self.batch_size,
+            truncation=True,
+        )
+        for i, out in zip(todo, outputs):
+            summary = out.get("summary_text", "").strip()
+            if summary:
+                results[i] = replace(results[i], summary=summary)
+        return results
+
+    def _load(self):
+        if self._pipeline is None and not self._load_failed:
+            try:
+                from transformers import pipeline      # optional, heavy: only local-v1 needs it
+
+                self._pipeline = pipeline("summarization", model=self.model_id, device=-1)
+            except (ImportError, OSError):
+                self._load_failed = True                # not installed / model not available offline
+        return self._pipeline
+
+
+# -------------------------
+# Registry
+# -------------------------
+
+_BACKENDS: Dict[str, SummarizerBackend] = {}
+
+
+def _backend_paths() -> Dict[str, str]:
+    return {**DEFAULT_BACKENDS, **getattr(settings, "FOCUSFLOW_SUMMARIZER_BACKENDS", {})}
+
+
+def backend_names() -> List[str]:
+    return sorted(_backend_paths().keys() | _BACKENDS.keys())
+
+
+def get_backend(name: str) -> SummarizerBackend:
+    """The backend registered as `name` (built once per process); unknown names get the rules."""
+    if name not in _BACKENDS:
+        _BACKENDS[name] = import_string(_backend_paths().get(name, DEFAULT_BACKENDS[DEFAULT_BACKEND]))()
+    return _BACKENDS[name]
+
+
+def register_backend(name: str, backend: Optional[SummarizerBackend]) -> None:
+    """Use this backend instance for `name` (None: rebuild from settings on next use)."""
+    if backend is None:
+        _BACKENDS.pop(name, None)
+    else:
+        _BACKENDS[name] = backend
@@ -0,0 +1,204 @@
+# apps/focusflow/services/tfidf.py
+"""
+Workspace-level TF-IDF sentence scoring for summaries (the summarizer's `scorer="tfidf"`).
+
+- Every workspace has one `WorkspaceIDF` row: how many messages were counted and, per term, how
+  many of them contain it. The ingest pipeline adds each chunk's new messages under a row lock;
+  `rebuild_idf()` / `manage.py focusflow_idf` recomputes it from the search documents
+- The row stays compact: only the FOCUSFLOW_IDF_MAX_TERMS most common terms are kept (anything
+  rarer simply gets the highest weight)
+- `score_sentences()` scores the sentences of many documents in one pass: every term occurrence
+  becomes an entry of a sparse (sentence × term) matrix held in flat arrays, weighted by
+  tf(term, document) · idf(term, workspace) and summed per sentence. Uses NumPy when installed,
+  stdlib `array` + loops otherwise (same results)
+- Boilerplate that recurs across a workspace's mail (footers, disclaimers, "sent from my phone")
+  gets a low idf, so it stops winning summary slots on sheer length
+
+Usage
+-----
+from apps.focusflow.services.tfidf import load_idf_tables, score_sentences
+tables = load_idf_tables([workspace.pk])
+scores = score_sentences([sentences_of_doc_1, sentences_of_doc_2], [tables[workspace.pk]] * 2)
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from django.conf import settings
+from django.db import transaction
+
+from ..models import MessageSearchDocument, WorkspaceIDF
+
+try:  # optional: vectorized scoring
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_MAX_TERMS = 20000
+REBUILD_BATCH = 2000
+
+# Very small English stopword list (expand if you like)
+STOPWORDS = {
+    "the", "a", "an", "and", "or", "but", "if", "in", "on", "for", "to", "of",
+    "with", "at", "by", "from", "as", "is", "are", "was", "were", "be", "been",
+    "it", "its", "this", "that", "these", "those", "i", "you", "he", "she",
+    "we", "they", "them", "your", "our", "their", "my", "me", "us",
+}
+
+RE_WORD = re.compile(r"[A-Za-z0-9']+")
+
+
+def content_terms(text: str) -> List[str]:
+    """Lower-cased word tokens of `text`, stopwords removed (in order, with repeats)."""
+    return [w for w in (t.lower() for t in RE_WORD.findall(text or "")) if w not in STOPWORDS]
+
+
+class IdfTable:
+    """Smoothed inverse document frequencies: log((1 + N) / (1 + df)) + 1."""
+
+    def __init__(self, document_count: int = 0, doc_freq: Optional[Dict[str, int]] = None):
+        self.document_count = document_count
+        self.doc_freq = doc_freq or {}
+        self._top = math.log(1 + document_count) + 1
+
+    def weight(self, term: str) -> float:
+        return self._top - math.log(1 + self.doc_freq.get(term, 0))
+
+
+def load_idf_tables(workspace_ids: Iterable[int]) -> Dict[int, IdfTable]:
+    """IDF table per workspace in one query; workspaces without statistics get an empty table."""
+    ids = set(workspace_ids)
+    tables = {ws_id: IdfTable() for ws_id in ids}
+    for ws_id, n, df in WorkspaceIDF.objects.filter(workspace_id__in=ids).values_list(
+        "workspace_id", "document_count", "doc_freq"
+    ):
+        tables[ws_id] = IdfTable(n, df)
+    return tables
+
+
+# -------------------------
+# Incremental maintenance
+# -------------------------
+
+def record_documents(workspace_id: int, texts: Iterable[str]) -> int:
+    """Add these documents (message bodies) to the workspace's counts; returns how many were added."""
+    counts: Counter = Counter()
+    n = 0
+    for text in texts:
+        counts.update(set(content_terms(text)))
+        n += 1
+    if n:
+        _merge(workspace_id, n, counts)
+    return n
+
+
+def rebuild_idf(workspace_id: Optional[int] = None) -> int:
+    """Recompute the counts from the (stripped) search documents of live messages."""
+    docs = MessageSearchDocument.objects.filter(message__is_deleted=False)
+    if workspace_id is not None:
+        docs = docs.filter(workspace_id=workspace_id)
+    counts: Dict[int, Counter] = {}
+    totals: Counter = Counter()
+    for ws_id, body in docs.order_by("pk").values_list("workspace_id", "body").iterator(chunk_size=REBUILD_BATCH):
+        counts.setdefault(ws_id, Counter()).update(set(content_terms(body)))
+        totals[ws_id] += 1
+
+    scope = WorkspaceIDF.objects.all()
+    if workspace_id is not None:
+        scope = scope.filter(workspace_id=workspace_id)
+    with transaction.atomic():
+        scope.delete()
+        WorkspaceIDF.objects.bulk_create(
+            [
+                WorkspaceIDF(workspace_id=ws_id, document_count=totals[ws_id], doc_freq=_prune(df))
+                for ws_id, df in counts.items()
+            ]
+        )
+    return sum(totals.values())
+
+
+@transaction.atomic
+def _merge(workspace_id: int, documents: int, counts: Counter) -> None:
+    row = WorkspaceIDF.objects.select_for_update().filter(workspace_id=workspace_id).first()
+    if row is None:
+        WorkspaceIDF.objects.create(workspace_id=workspace_id, document_count=documents, doc_freq=_prune(counts))
+        return
+    counts.update(row.doc_freq)
+    row.document_count += documents
+    row.doc_freq = _prune(counts)
+    row.save(update_fields=["document_count", "doc_freq", "updated_at"])
+
+
+def _prune(counts: Counter) -> Dict[str, int]:
+    limit = getattr(settings, "FOCUSFLOW_IDF_MAX_TERMS", DEFAULT_MAX_TERMS)
+    if len(counts) <= limit:
+        return dict(counts)
+    return dict(counts.most_common(limit))
+
+
+# -------------------------
+# Batched scoring
+# -------------------------
+
+def score_sentences(documents: Sequence[Sequence[str]], tables: Sequence[IdfTable]) -> List[List[float]]:
+    """
+    Score every sentence of every document (each document with its workspace's IdfTable) in one
+    batched pass: sum of tf·idf over the sentence's terms, divided by sqrt(its term count) so long
+    sentences don't win on length alone.
+    """
+    vocab: Dict[str, int] = {}
+    occ_doc, occ_sentence, occ_term = array("q"), array("q"), array("q")
+    lengths = []   # content terms per sentence
+    for d, sentences in enumerate(documents):
+        for sentence in sentences:
+            terms = content_terms(sentence)
+            s = len(lengths)
+            lengths.append(len(terms))
+            for term in terms:
+                occ_doc.append(d)
+                occ_sentence.append(s)
+                occ_term.append(vocab.setdefault(term, len(vocab)))
+
+    # idf of each term, once per distinct table in the batch
+    table_index: Dict[int, int] = {}
+    doc_table = [table_index.setdefault(id(t), len(table_index)) for t in tables]
+    distinct = {i: t for t, i in zip(tables, doc_table)}
+    idf_rows = [[distinct[i].weight(term) for term in vocab] for i in range(len(distinct))]
+
+    if np is not None:
+        flat = _score_numpy(occ_doc, occ_sentence, occ_term, lengths, doc_table, idf_rows, len(vocab))
+    else:
+        flat = _score_python(occ_doc, occ_sentence, occ_term, lengths, doc_table, idf_rows)
+
+    out, s = [], 0
+    for sentences in documents:
+        out.append(flat[s : s + len(sentences)])
+        s += len(sentences)
+    return out
+
+
+def _score_numpy(occ_doc, occ_sentence, occ_term, lengths, doc_table, idf_rows, vocab_size) -> List[float]:
+    if not lengths:
+        return []
+    doc, sentence, term = (np.frombuffer(a, dtype=np.int64) for a in (occ_doc, occ_sentence, occ_term))
+    idf = np.asarray(idf_rows, dtype=np.float64).reshape(len(idf_rows), vocab_size)
+
+    # tf(term, document) for every occurrence: count the (document, term) cells of the matrix
+    _, cell, tf = np.unique(doc * max(vocab_size, 1) + term, return_inverse=True, return_counts=True)
+    weights = tf[cell] * idf[np.asarray(doc_table, dtype=np.int64)[doc], term]
+    totals = np.bincount(sentence, weights=weights, minlength=len(lengths))
+    norms = np.sqrt(np.maximum(np.asarray(lengths, dtype=np.float64), 1.0))
+    return (totals / norms).tolist()
+
+
+def _score_python(occ_doc, occ_sentence, occ_term, lengths, doc_table, idf_rows) -> List[float]:
+    tf = Counter(zip(occ_doc, occ_term))
+    totals = [0.0] * len(lengths)
+    for d, s, t in zip(occ_doc, occ_sentence, occ_term):
+        totals[s] += tf[(d, t)] * idf_rows[doc_table[d]][t]
+    return [total / math.sqrt(max(n, 1)) for total, n in zip(totals, lengths)]
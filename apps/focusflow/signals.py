@@ -0,0 +1,61 @@
+# apps/focusflow/signals.py
+"""
+Keeps the inbox projection (services/inbox.py) current for single-row writes that bypass the
+bulk pipelines: conversation saves (state, priority, soft delete) and tag changes. Refreshes run
+after commit, once per conversation per transaction callback.
+
+Single-row message saves (new messages, body edits) and conversation subject edits also
+refresh the search documents (services/search.py), in the same transaction as the write.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Conversation, ConversationTag, Message, MessageSearchDocument, Tag
+from .services.inbox import refresh_inbox
+from .services.search import index_messages
+
+
+def _refresh_on_commit(conversation_ids) -> None:
+    ids = list(conversation_ids)
+    if ids:
+        transaction.on_commit(lambda: refresh_inbox(ids))
+
+
+@receiver(post_save, sender=Conversation, dispatch_uid="focusflow_inbox_conversation")
+def conversation_saved(sender, instance, **kwargs):
+    _refresh_on_commit([instance.pk])
+
+
+def _touches(update_fields, *names) -> bool:
+    return update_fields is None or not update_fields.isdisjoint(names)
+
+
+@receiver(post_save, sender=Conversation, dispatch_uid="focusflow_search_subject")
+def conversation_subject_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created and _touches(update_fields, "subject"):
+        MessageSearchDocument.objects.filter(conversation_id=instance.pk).exclude(subject=instance.subject).update(
+            subject=instance.subject, updated_at=timezone.now()
+        )
+
+
+@receiver(post_save, sender=Message, dispatch_uid="focusflow_search_message")
+def message_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Messages created through the ORM (admin, shell, other importers) get their document here;
+    # the ingest pipeline bulk-creates its own. index_messages() upserts, so either order is safe
+    if created or _touches(update_fields, "text", "html"):
+        index_messages([instance.pk])
+
+
+@receiver(post_save, sender=ConversationTag, dispatch_uid="focusflow_inbox_tag_added")
+@receiver(post_delete, sender=ConversationTag, dispatch_uid="focusflow_inbox_tag_removed")
+def conversation_tag_changed(sender, instance, **kwargs):
+    _refresh_on_commit([instance.conversation_id])
+
+
+@receiver(post_save, sender=Tag, dispatch_uid="focusflow_inbox_tag_renamed")
+def tag_saved(sender, instance, created, **kwargs):
+    if not created:
+        _refresh_on_commit(instance.conversation_tags.values_list("conversation_id", flat=True))
@@ -1,7 +1,7 @@
 /**
  * FocusFlow Analytics Dashboard
  * ------------------------------
- * Fetches conversation + task data and renders interactive charts + summary stats.
+ * Fetches server-side aggregates (/focusflow/api/analytics/) and renders charts + summary stats.
  */
 
 document.addEventListener("DOMContentLoaded", () => {
@@ -20,28 +20,20 @@ document.addEventListener("DOMContentLoaded", () => {
       return await res.json();
     } catch (e) {
       console.warn("Fetch failed:", e);
-      return { results: [] };
+      return null;
     }
   }
 
   async function loadAnalytics() {
-    // Fetch conversations and actions
-    const convData = await fetchJSON("/focusflow/api/conversations/");
-    const actData = await fetchJSON("/focusflow/api/actions/");
+    // Every number below is aggregated server-side across the whole inbox
+    const params = new URLSearchParams(window.location.search);
+    const query = new URLSearchParams();
+    if (params.get("workspace")) query.set("workspace", params.get("workspace"));
+    const data = await fetchJSON(`/focusflow/api/analytics/?${query}`);
+    if (!data) return;
 
     // --- Summary Counters ---
-    const convCount = convData.count ?? convData.results.length ?? 0;
-    const taskCount = actData.count ?? actData.results.length ?? 0;
-
-    const uniqueWorkspaces = new Set(convData.results.map((c) => c.workspace)).size;
-    const workspaceCount = uniqueWorkspaces || 1;
-
-    let totalSummaries = 0;
-    convData.results.forEach((c) => {
-      if (c.annotations) {
-        totalSummaries += c.annotations.filter((a) => a.kind === "summary").length;
-      }
-    });
+    const totals = data.totals || {};
 
     // Update the counters in the UI
     const statConversations = document.getElementById("statConversations");
@@ -49,16 +41,15 @@ document.addEventListener("DOMContentLoaded", () => {
     const statSummaries = document.getElementById("statSummaries");
     const statWorkspaces = document.getElementById("statWorkspaces");
 
-    if (statConversations) statConversations.textContent = convCount;
-    if (statTasks) statTasks.textContent = taskCount;
-    if (statSummaries) statSummaries.textContent = totalSummaries;
-    if (statWorkspaces) statWorkspaces.textContent = workspaceCount;
+    if (statConversations) statConversations.textContent = totals.conversations ?? 0;
+    if (statTasks) statTasks.textContent = totals.tasks ?? 0;
+    if (statSummaries) statSummaries.textContent = totals.summaries ?? 0;
+    if (statWorkspaces) statWorkspaces.textContent = totals.workspaces || 1;
 
     // --- Messages by Source ---
     const bySource = {};
-    convData.results.forEach((c) => {
-      const src = c.stream || "Unknown";
-      bySource[src] = (bySource[src] || 0) + 1;
+    (data.messages_by_stream || []).forEach((row) => {
+      bySource[row.name] = (bySource[row.name] || 0) + row.count;
     });
 
     const ctxSource = document.getElementById("chartMessagesBySource");
@@ -82,11 +73,7 @@ document.addEventListener("DOMContentLoaded", () => {
     }
 
     // --- Conversations by Priority ---
-    const byPriority = { urgent: 0, action: 0, fyi: 0, spam: 0 };
-    convData.results.forEach((c) => {
-      const p = c.priority?.toLowerCase();
-      if (p && byPriority[p] !== undefined) byPriority[p]++;
-    });
+    const byPriority = data.conversations_by_priority || {};
 
     const ctxPriority = document.getElementById("chartConversationsByPriority");
     if (ctxPriority) {
@@ -111,11 +98,7 @@ document.addEventListener("DOMContentLoaded", () => {
     }
 
     // --- Task Completion Overview ---
-    const taskStatus = { todo: 0, doing: 0, done: 0, dismissed: 0 };
-    actData.results.forEach((t) => {
-      const s = t.status?.toLowerCase();
-      if (s && taskStatus[s] !== undefined) taskStatus[s]++;
-    });
+    const taskStatus = data.tasks_by_status || {};
 
     const ctxTasks = document.getElementById("chartTasksCompletion");
     if (ctxTasks) {
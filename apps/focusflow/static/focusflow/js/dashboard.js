@@ -13,8 +13,12 @@ document.addEventListener("DOMContentLoaded", () => {
   const emptyState = document.querySelector("[data-empty-state]");
 
   // endpoint definitions (can adjust later)
-  const conversationsAPI = "/focusflow/api/conversations/";
+  const conversationsAPI = "/focusflow/api/conversations/?include=annotations";
+  const inboxAPI = "/focusflow/api/inbox/";
   const messagesAPI = "/focusflow/api/messages/";
+  const changesAPI = "/focusflow/api/changes/";
+  const POLL_INTERVAL_MS = 60000;
+  let changesToken = null;
 
   async function fetchJSON(url) {
     try {
@@ -32,7 +36,11 @@ document.addEventListener("DOMContentLoaded", () => {
 
     feed.innerHTML = `<div class="text-center text-gray-500 py-6 animate-pulse">Loading AI summaries...</div>`;
 
-    const data = await fetchJSON(conversationsAPI);
+    // With a workspace the precomputed inbox serves the list (one range scan per page)
+    const workspace = feed.dataset.workspace;
+    const data = await fetchJSON(
+      workspace ? `${inboxAPI}?workspace=${encodeURIComponent(workspace)}&cursor=` : conversationsAPI
+    );
     if (!data || !data.results || !data.results.length) {
       feed.innerHTML = "";
       if (emptyState) emptyState.classList.remove("hidden");
@@ -48,46 +56,89 @@ document.addEventListener("DOMContentLoaded", () => {
         <article class="rounded-xl border border-gray-200 dark:border-gray-700 bg-white dark:bg-gray-800 p-5 shadow-sm hover:shadow-md transition">
           <header class="mb-3">
             <div class="flex justify-between items-center">
-              <h3 class="font-semibold text-lg">${conv.subject || "(no subject)"}</h3>
-              <span class="text-xs uppercase px-2 py-1 rounded bg-blue-100 dark:bg-blue-900 text-blue-700 dark:text-blue-300">${conv.priority}</span>
+              <h3 class="font-semibold text-lg">${escapeHTML(conv.subject || "(no subject)")}</h3>
+              <span class="text-xs uppercase px-2 py-1 rounded bg-blue-100 dark:bg-blue-900 text-blue-700 dark:text-blue-300">${escapeHTML(conv.priority)}</span>
             </div>
-            <p class="text-xs text-gray-500">${conv.workspace || ""} • ${conv.stream || ""}</p>
+            <p class="text-xs text-gray-500">${escapeHTML(conv.workspace || conv.sender || "")} • ${escapeHTML(conv.stream || "")}</p>
           </header>
 
-          <div class="text-sm text-gray-700 dark:text-gray-300 line-clamp-4" id="summary-${conv.id}">
-            <em>Fetching summary...</em>
+          <div class="text-sm text-gray-700 dark:text-gray-300 line-clamp-4" id="summary-${escapeHTML(conv.id)}">
+            ${summaryText(conv)}
           </div>
 
           <footer class="mt-4 flex justify-between items-center">
-            <button data-load-messages="${conv.id}" class="text-sm text-blue-600 hover:underline">View Messages</button>
-            <span class="text-xs text-gray-400">${conv.unread_count} unread</span>
+            <button data-load-messages="${escapeHTML(conv.id)}" class="text-sm text-blue-600 hover:underline">View Messages</button>
+            <span class="text-xs text-gray-400">${escapeHTML(conv.unread_count)} unread</span>
           </footer>
         </article>`
       )
       .join("");
 
     feed.innerHTML = itemsHTML;
+  }
 
-    // For each conversation, fetch its AI summary annotation
-    data.results.forEach((conv) => {
-      fetch(`/focusflow/api/conversations/${conv.id}/`)
-        .then((res) => res.json())
-        .then((detail) => {
-          const summaryDiv = document.getElementById(`summary-${conv.id}`);
-          if (!summaryDiv) return;
-          const ann = detail.annotations?.find((a) => a.kind === "summary");
-          if (ann && ann.content_text) {
-            summaryDiv.textContent = ann.content_text;
-          } else {
-            summaryDiv.textContent = "(no AI summary yet)";
-          }
-        })
-        .catch(() => {});
-    });
+  // Summaries arrive with each inbox row, or inline with each conversation (?include=annotations)
+  function summaryText(conv) {
+    if (conv.summary) return escapeHTML(conv.summary);
+    const ann = conv.annotations?.find((a) => a.kind === "summary");
+    return ann && ann.content_text ? escapeHTML(ann.content_text) : "(no AI summary yet)";
+  }
+
+  // Every API string goes through this before it reaches innerHTML (quotes too, for attributes)
+  function escapeHTML(value) {
+    const div = document.createElement("div");
+    div.textContent = value ?? "";
+    return div.innerHTML.replace(/"/g, "&quot;");
+  }
+
+  // Delta polling: take a token before the first load, then only ask what changed since
+  async function startChanges() {
+    const data = await fetchJSON(changesAPI);
+    if (data) changesToken = data.next;
+  }
+
+  async function refreshIfChanged() {
+    if (!changesToken || document.hidden) return;
+    let changed = false;
+    let data;
+    do {
+      data = await fetchJSON(`${changesAPI}?since=${encodeURIComponent(changesToken)}`);
+      if (!data) return;
+      changesToken = data.next;
+      changed =
+        changed ||
+        ["conversations", "annotations"].some(
+          (k) => data.changes[k] && (data.changes[k].changed.length || data.changes[k].deleted.length)
+        );
+    } while (data.has_more);
+    if (changed) loadDashboard();
+  }
+
+  // Live updates: one SSE connection per dashboard where the server supports it (ASGI +
+  // cross-process broker); it only makes refreshes sooner, polling keeps running regardless
+  function startLiveEvents() {
+    const workspace = feed && feed.dataset.workspace;
+    if (!workspace || !feed.dataset.liveEvents || !window.EventSource) return;
+    const source = new EventSource(`/focusflow/api/events/?workspace=${encodeURIComponent(workspace)}`);
+    let pending = null;
+    const refreshSoon = () => {
+      // coalesce bursts (an ingest chunk emits many events) into one delta fetch
+      clearTimeout(pending);
+      pending = setTimeout(refreshIfChanged, 1000);
+    };
+    ["conversation.updated", "annotation.created", "reset"].forEach((type) =>
+      source.addEventListener(type, refreshSoon)
+    );
+    source.onerror = () => {
+      // refused (e.g. 503) rather than dropped: stop retrying, the poll covers it
+      if (source.readyState === EventSource.CLOSED) source.close();
+    };
   }
 
   // Load when page opens
-  loadDashboard();
+  startChanges().then(loadDashboard);
+  setInterval(refreshIfChanged, POLL_INTERVAL_MS);
+  startLiveEvents();
 
   // Manual refresh
   if (refreshBtn) {
@@ -101,7 +152,7 @@ document.addEventListener("DOMContentLoaded", () => {
     const btn = ev.target.closest("[data-load-messages]");
     if (!btn) return;
     const convId = btn.getAttribute("data-load-messages");
-    const msgData = await fetchJSON(`${messagesAPI}?conversation_id=${convId}`);
+    const msgData = await fetchJSON(`${messagesAPI}?conversation_id=${encodeURIComponent(convId)}`);
     if (!msgData || !msgData.results) return;
 
     const modal = document.createElement("div");
@@ -116,8 +167,8 @@ document.addEventListener("DOMContentLoaded", () => {
             .map(
               (m) => `
             <div class="border-b border-gray-200 dark:border-gray-700 pb-2">
-              <p class="text-sm text-gray-500 mb-1">${m.sender || "Unknown"} • ${m.sent_at}</p>
-              <p class="text-gray-800 dark:text-gray-200">${m.text || "(no content)"}</p>
+              <p class="text-sm text-gray-500 mb-1">${escapeHTML(m.sender || "Unknown")} • ${escapeHTML(m.sent_at)}</p>
+              <p class="text-gray-800 dark:text-gray-200">${escapeHTML(m.text || "(no content)")}</p>
             </div>`
             )
             .join("")}
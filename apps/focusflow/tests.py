@@ -1,3 +1,1650 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import gzip
+import json
+import sys
+import tempfile
+import threading
+import warnings
+from collections import Counter
+from datetime import timedelta
+from hashlib import blake2b
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from importlib.util import find_spec
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.core.management import call_command
+from django.core.paginator import UnorderedObjectListWarning
+from django.db import IntegrityError, transaction
+from django.db import connection
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+
+from apps.focusflow.models import (
+    AIAnnotation,
+    Contact,
+    Conversation,
+    ConversationParticipant,
+    ConversationTag,
+    DailyPriorityRollup,
+    DailySenderRollup,
+    DailyStreamRollup,
+    Identity,
+    InboxRow,
+    Integration,
+    Message,
+    MessageRecipient,
+    MessageSearchDocument,
+    MessageSignature,
+    Stream,
+    SyncCursor,
+    Tag,
+    Task,
+    Workspace,
+    WorkspaceIDF,
+)
+from apps.focusflow.services import dedup, export
+from apps.focusflow.services.dedup import rebuild_signatures
+from apps.focusflow.services.events import InMemoryBroker, event_stream, live_events_available, set_broker
+from apps.focusflow.services.gmail_client import GmailApiError, GmailClient
+from apps.focusflow.services.gmail_sync import GmailSyncEngine
+from apps.focusflow.services.identity import IdentityResolver, normalize_email, normalize_phone
+from apps.focusflow.services.keywords import DEFAULT_KEYWORDS, KeywordMatcher, matcher_for_workspace
+from apps.focusflow.services.ingest import InboundAddress, InboundMessage, IngestPipeline
+from apps.focusflow.services.rollups import rebuild_rollups
+from apps.focusflow.services.search import SearchBackend, index_messages, make_document, search_backend
+from apps.focusflow.services.summarizer import SummarizeResult, SummarizerService
+from apps.focusflow.services.summarizer_backends import (
+    HeuristicBackend,
+    LocalModelBackend,
+    SummarizerBackend,
+    backend_stats,
+    get_backend,
+    register_backend,
+    reset_backend_stats,
+)
+from apps.focusflow.services import tfidf
+from apps.focusflow.services.tfidf import IdfTable, content_terms, rebuild_idf, record_documents, score_sentences
+
+
+THREAD_TEXT = (
+    "Hi team, the quarterly report draft is attached for review this week. "
+    "Please send your comments on the revenue section by Thursday afternoon. "
+    "We should also schedule a follow up call with the finance group next Monday. "
+    "The appendix numbers were pulled from the latest warehouse export."
+)
+
+
+class FocusFlowFixtureMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="ff_owner")
+        cls.workspace = Workspace.objects.create(name="FF Workspace", owner=cls.user)
+        cls.integration = Integration.objects.create(
+            workspace=cls.workspace, provider="gmail", account_label="owner@example.com"
+        )
+        cls.stream = Stream.objects.create(integration=cls.integration, kind="Inbox", remote_id="INBOX", name="Inbox")
+        cls.alice = Contact.objects.create(workspace=cls.workspace, display_name="Alice")
+
+    @classmethod
+    def make_conversation(cls, thread_id, subject="Quarterly report", bodies=(THREAD_TEXT,)):
+        now = timezone.now()
+        conv = Conversation.objects.create(
+            workspace=cls.workspace,
+            stream=cls.stream,
+            remote_thread_id=thread_id,
+            subject=subject,
+            last_message_at=now,
+        )
+        for i, body in enumerate(bodies):
+            Message.objects.create(
+                conversation=conv,
+                stream=cls.stream,
+                remote_message_id=f"{thread_id}-m{i}",
+                sender=cls.alice,
+                sent_at=now - timedelta(minutes=len(bodies) - i),
+                text=body,
+            )
+        return conv
+
+
+class SummarizerBatchTests(FocusFlowFixtureMixin, TestCase):
+    def test_batch_matches_single_conversation_path(self):
+        conv = self.make_conversation("t-1")
+        svc = SummarizerService()
+        single = svc._summarize_and_extract(svc._conversation_text(conv))
+
+        report = svc.annotate_conversations_batch([conv.pk], chunk_size=10)
+
+        self.assertEqual(report.processed, 1)
+        self.assertEqual(report.priorities[single.priority_label], 1)
+        summary = AIAnnotation.objects.get(kind=AIAnnotation.Kind.SUMMARY, target_object_id=conv.pk)
+        self.assertEqual(summary.content_text, single.summary)
+        self.assertEqual(Task.objects.filter(workspace=self.workspace).count(), len(single.actions))
+
+    def test_batch_uses_latest_messages_only(self):
+        bodies = [f"Old filler message number {i} with enough characters." for i in range(25)]
+        conv = self.make_conversation("t-2", bodies=bodies)
+        svc = SummarizerService()
+        _, texts = svc._load_conversation_texts([conv.pk])
+        self.assertEqual(texts, [svc._conversation_text(conv)])
+        self.assertNotIn("number 0 ", texts[0])
+
+    def test_batch_with_process_pool(self):
+        convs = [self.make_conversation(f"t-pool-{i}") for i in range(4)]
+        report = SummarizerService().annotate_conversations_batch(
+            [c.pk for c in convs], workers=2, chunk_size=3, create_tasks=False
+        )
+        self.assertEqual(report.processed, 4)
+        self.assertEqual(
+            AIAnnotation.objects.filter(kind=AIAnnotation.Kind.PRIORITY).count(), 4
+        )
+        self.assertFalse(Task.objects.exists())
+
+    def test_annotate_command_all_conversations(self):
+        self.make_conversation("t-cmd")
+        out = StringIO()
+        call_command("focusflow_annotate", "--all-conversations", "--no-tasks", "--chunk-size", "1", stdout=out)
+        self.assertIn("1 annotated", out.getvalue())
+        self.assertFalse(Task.objects.exists())
+
+
+class KeywordMatcherTests(SimpleTestCase):
+    def test_one_scan_reports_every_category_with_offsets(self):
+        text = "Please ship it ASAP.  Let's  follow   up on the promotion; mustard is not a request."
+        scan = KeywordMatcher(DEFAULT_KEYWORDS).scan(text)
+        self.assertEqual([h.phrase for h in scan.hits], ["please", "asap", "let's", "follow up", "promotion"])
+        please = scan.hits[0]
+        self.assertEqual(text[please.start:please.end], "Please")
+        self.assertEqual(please.categories, {"action_hint", "imperative"})
+        self.assertEqual(scan.categories(), {"action_hint", "imperative", "urgent", "spam"})
+        self.assertTrue(scan.has("urgent", 0, 20))
+        self.assertFalse(scan.has("urgent", 20))
+        self.assertFalse(scan.has("imperative", text.index("mustard")))
+
+    def test_workspace_overrides(self):
+        workspace = Workspace(
+            settings_json={"keywords": {"spam": ["webinar"]}, "extra_keywords": {"urgent": ["eod"]}}
+        )
+        scan = matcher_for_workspace(workspace).scan("Join our webinar, reply by EOD. Big sale!")
+        self.assertEqual(
+            [(h.phrase, sorted(h.categories)) for h in scan.hits], [("webinar", ["spam"]), ("eod", ["urgent"])]
+        )
+
+
+FOOTER = (
+    "This email and any attachments are confidential and intended solely for the named addressee "
+    "of this message."
+)
+
+
+class TfidfScorerTests(FocusFlowFixtureMixin, TestCase):
+    def test_ingest_counts_terms_incrementally(self):
+        IngestPipeline(self.stream).run(inbound(5))
+        IngestPipeline(self.stream).run(inbound(3, start=5))
+        idf = WorkspaceIDF.objects.get(workspace=self.workspace)
+        self.assertEqual(idf.document_count, 8)
+        self.assertEqual((idf.doc_freq["body"], idf.doc_freq["7"]), (8, 1))
+        self.assertNotIn("of", idf.doc_freq)  # stopword
+
+        incremental = (idf.document_count, idf.doc_freq)
+        self.assertEqual(rebuild_idf(self.workspace.pk), 8)
+        idf = WorkspaceIDF.objects.get(workspace=self.workspace)
+        self.assertEqual((idf.document_count, idf.doc_freq), incremental)
+
+    @override_settings(FOCUSFLOW_IDF_MAX_TERMS=2)
+    def test_table_keeps_most_common_terms(self):
+        record_documents(self.workspace.pk, ["alpha beta gamma", "alpha beta", "alpha"])
+        self.assertEqual(WorkspaceIDF.objects.get(workspace=self.workspace).doc_freq, {"alpha": 3, "beta": 2})
+
+    def test_boilerplate_loses_to_distinctive_sentence(self):
+        record_documents(self.workspace.pk, [FOOTER] * 50 + ["Budget review moved to Friday."])
+        conv = self.make_conversation(
+            "t-tfidf", bodies=["The budget review moved to Friday morning. " + FOOTER, FOOTER]
+        )
+        frequency = SummarizerService(max_summary_sentences=1).annotate_conversation(conv.pk)
+        scored = SummarizerService(model_name="tfidf-v1", max_summary_sentences=1).annotate_conversation(conv.pk)
+        self.assertIn("confidential", frequency.summary)
+        self.assertEqual(scored.summary, "The budget review moved to Friday morning.")
+
+    def test_batch_scores_each_chunk_in_one_call(self):
+        record_documents(self.workspace.pk, [THREAD_TEXT, FOOTER])
+        convs = [self.make_conversation(f"t-tfidf-{i}", bodies=[THREAD_TEXT, FOOTER]) for i in range(3)]
+        svc = SummarizerService(model_name="tfidf-v1")
+        single = svc._summarize_and_extract(
+            svc._conversation_text(convs[0]), idf=tfidf.load_idf_tables([self.workspace.pk])[self.workspace.pk]
+        )
+
+        with mock.patch("apps.focusflow.services.summarizer_backends.score_sentences", wraps=score_sentences) as scorer:
+            report = svc.annotate_conversations_batch([c.pk for c in convs], workers=2)
+        self.assertEqual(scorer.call_count, 1)
+        self.assertEqual(report.processed, 3)
+        summary = AIAnnotation.objects.get(kind=AIAnnotation.Kind.SUMMARY, target_object_id=convs[0].pk)
+        self.assertEqual(summary.content_text, single.summary)
+
+    @skipUnless(find_spec("numpy"), "numpy is not installed")
+    def test_numpy_and_pure_python_scores_match(self):
+        documents = [["Budget review moved to Friday.", FOOTER], [FOOTER, "Friday works, budget attached budget."]]
+        tables = [IdfTable(10, {"budget": 2, "friday": 5}), IdfTable()]
+        vectorized = score_sentences(documents, tables)
+        with mock.patch.object(tfidf, "np", None):
+            fallback = score_sentences(documents, tables)
+        for fast, slow in zip(vectorized, fallback):
+            for a, b in zip(fast, slow):
+                self.assertAlmostEqual(a, b)
+
+
+class RecordingBackend(SummarizerBackend):
+    batch_size = 2
+    parallel = False
+
+    def __init__(self):
+        self.batches = []
+
+    def summarize_many(self, texts, *, keywords=None, idfs=None, max_summary_sentences=3):
+        self.batches.append(len(texts))
+        return [SummarizeResult(summary=t[:20], actions=[], priority_label="fyi", priority_score=0.5) for t in texts]
+
+
+class SummarizerBackendTests(FocusFlowFixtureMixin, TestCase):
+    def setUp(self):
+        reset_backend_stats()
+        self.addCleanup(register_backend, "recording-v1", None)
+
+    def test_service_calls_backend_once_per_batch_and_records_stats(self):
+        backend = RecordingBackend()
+        register_backend("recording-v1", backend)
+        convs = [self.make_conversation(f"t-backend-{i}") for i in range(5)]
+
+        report = SummarizerService(model_name="recording-v1").annotate_conversations_batch(
+            [c.pk for c in convs], workers=2, create_tasks=False
+        )
+        self.assertEqual(report.processed, 5)
+        self.assertEqual(backend.batches, [2, 2, 1])
+        self.assertEqual(
+            AIAnnotation.objects.filter(kind=AIAnnotation.Kind.SUMMARY, model_name="recording-v1").count(), 5
+        )
+        stats = backend_stats()["recording-v1"]
+        self.assertEqual((stats.calls, stats.texts), (3, 5))
+        self.assertGreater(stats.throughput, 0)
+
+    def test_unregistered_name_is_a_label_for_the_rules(self):
+        self.assertIsInstance(get_backend("other-v2"), HeuristicBackend)
+        self.assertIs(get_backend("tfidf-v1"), get_backend("tfidf-v1"))
+        self.assertTrue(get_backend("tfidf-v1").uses_idf)
+
+    def test_local_model_summarizes_whole_batch_in_one_call(self):
+        calls = []
+
+        def fake_pipeline(inputs, **kwargs):
+            calls.append(len(inputs))
+            return [{"summary_text": f"model summary {i}"} for i in range(len(inputs))]
+
+        backend = LocalModelBackend(model_id="tiny")
+        backend._pipeline = fake_pipeline
+        results = backend.summarize_many([THREAD_TEXT, "", THREAD_TEXT])
+        rules = HeuristicBackend().summarize_many([THREAD_TEXT, "", THREAD_TEXT])
+
+        self.assertEqual(calls, [2])  # the empty text is left to the rules
+        self.assertEqual([r.summary for r in results], ["model summary 0", "", "model summary 1"])
+        self.assertEqual([r.actions for r in results], [r.actions for r in rules])
+
+    def test_local_model_falls_back_to_rules_without_transformers(self):
+        backend = LocalModelBackend(model_id="tiny")
+        with mock.patch.dict(sys.modules, {"transformers": None}):
+            self.assertFalse(backend.available)
+            results = backend.summarize_many([THREAD_TEXT])
+        self.assertEqual(results, HeuristicBackend().summarize_many([THREAD_TEXT]))
+
+    def test_local_model_without_transformers_is_stored_as_the_rules(self):
+        register_backend("local-test", LocalModelBackend(model_id="tiny"))
+        self.addCleanup(register_backend, "local-test", None)
+        conv = self.make_conversation("t-backend-local")
+        with mock.patch.dict(sys.modules, {"transformers": None}):
+            svc = SummarizerService(model_name="local-test")
+            svc.annotate_conversation(conv.pk, create_tasks=False)
+        self.assertEqual(svc.model_name, "simple-v1")
+        self.assertFalse(AIAnnotation.objects.filter(model_name="local-test").exists())
+
+    def test_model_files_are_part_of_the_fingerprint(self):
+        def fake_pipeline(inputs, **kwargs):
+            return [{"summary_text": "model summary"} for _ in inputs]
+
+        conv = self.make_conversation("t-backend-model-id")
+        self.addCleanup(register_backend, "local-test", None)
+        for model_id, processed in (("tiny", 1), ("tiny", 0), ("small", 1)):
+            backend = LocalModelBackend(model_id=model_id)
+            backend._pipeline = fake_pipeline
+            register_backend("local-test", backend)
+            report = SummarizerService(model_name="local-test").annotate_conversations_batch([conv.pk])
+            self.assertEqual(report.processed, processed, model_id)
+
+    def test_annotate_command_selects_backend_and_prints_stats(self):
+        self.make_conversation("t-backend-cmd")
+        out = StringIO()
+        call_command("focusflow_annotate", "--all-conversations", "--model", "tfidf-v1", "--no-tasks", stdout=out)
+        self.assertIn("tfidf-v1: 1 batch(es), 1 texts", out.getvalue())
+        self.assertTrue(AIAnnotation.objects.filter(model_name="tfidf-v1").exists())
+
+
+class SummarizerMemoizationTests(FocusFlowFixtureMixin, TestCase):
+    def test_unchanged_conversation_is_skipped(self):
+        conv = self.make_conversation("t-memo")
+        svc = SummarizerService()
+        first = svc.annotate_conversation(conv.pk)
+        conv.refresh_from_db()
+        self.assertEqual(len(conv.hash_key), 64)
+
+        with self.assertNumQueries(5):  # savepoint pair + conversation, messages, stored annotations
+            second = svc.annotate_conversation(conv.pk)
+        self.assertEqual(second, first)
+
+        report = svc.annotate_conversations_batch([conv.pk])
+        self.assertEqual((report.processed, report.skipped), (0, 1))
+
+    def test_run_without_tasks_does_not_satisfy_a_run_with_tasks(self):
+        conv = self.make_conversation("t-memo-tasks")
+        svc = SummarizerService()
+        for incremental in (False, True):
+            Task.objects.all().delete()
+            report = svc.annotate_conversations_batch([conv.pk], create_tasks=False, incremental=incremental)
+            self.assertEqual(report.processed, 1)
+            self.assertFalse(Task.objects.exists())
+
+            report = svc.annotate_conversations_batch([conv.pk], incremental=incremental)
+            self.assertEqual((report.processed, report.skipped), (1, 0))
+            self.assertTrue(Task.objects.filter(source_object_id=conv.pk).exists())
+
+    def test_batch_recomputes_when_stored_annotations_are_gone(self):
+        conv = self.make_conversation("t-memo-gone")
+        svc = SummarizerService()
+        for incremental in (False, True):
+            svc.annotate_conversations_batch([conv.pk], create_tasks=False, incremental=incremental)
+            AIAnnotation.objects.filter(target_object_id=conv.pk, kind=AIAnnotation.Kind.SUMMARY).delete()
+
+            report = svc.annotate_conversations_batch([conv.pk], create_tasks=False, incremental=incremental)
+            self.assertEqual((report.processed, report.skipped), (1, 0))
+            self.assertTrue(AIAnnotation.objects.filter(target_object_id=conv.pk, kind=AIAnnotation.Kind.SUMMARY).exists())
+
+            report = svc.annotate_conversations_batch([conv.pk], create_tasks=False, incremental=incremental)
+            self.assertEqual((report.processed, report.skipped), (0, 1))
+
+    def test_workspace_keywords_drive_priority_and_fingerprint(self):
+        conv = self.make_conversation("t-memo-kw", bodies=["Join the quarterly partner webinar on Thursday afternoon."])
+        svc = SummarizerService()
+        self.assertEqual(svc.annotate_conversation(conv.pk).priority_label, "fyi")
+
+        Workspace.objects.filter(pk=self.workspace.pk).update(settings_json={"extra_keywords": {"spam": ["webinar"]}})
+        self.assertEqual(svc.annotate_conversation(conv.pk).priority_label, "spam")
+
+    def test_new_message_or_model_invalidates_fingerprint(self):
+        conv = self.make_conversation("t-memo-2")
+        SummarizerService().annotate_conversation(conv.pk)
+        old_key = Conversation.objects.get(pk=conv.pk).hash_key
+
+        Message.objects.create(
+            conversation=conv,
+            stream=self.stream,
+            remote_message_id="t-memo-2-new",
+            sender=self.alice,
+            sent_at=timezone.now(),
+            text="Urgent: the client moved the deadline, please review the numbers asap.",
+        )
+        result = SummarizerService().annotate_conversation(conv.pk)
+        self.assertEqual(result.priority_label, "urgent")
+        self.assertNotEqual(Conversation.objects.get(pk=conv.pk).hash_key, old_key)
+
+        report = SummarizerService(model_name="other-v2").annotate_conversations_batch([conv.pk])
+        self.assertEqual(report.processed, 1)
+
+
+class IncrementalSummaryTests(FocusFlowFixtureMixin, TestCase):
+    def add_message(self, conv, suffix, text):
+        return Message.objects.create(
+            conversation=conv,
+            stream=self.stream,
+            remote_message_id=f"{conv.remote_thread_id}-{suffix}",
+            sender=self.alice,
+            sent_at=timezone.now(),
+            text=text,
+        )
+
+    def test_new_message_is_the_only_one_digested(self):
+        conv = self.make_conversation("t-incr", bodies=[THREAD_TEXT, "The appendix figures still need a second look."])
+        svc = SummarizerService()
+        report = svc.annotate_conversations_batch([conv.pk], incremental=True, create_tasks=False)
+        self.assertEqual((report.processed, report.digested), (1, 2))
+        self.assertEqual(AIAnnotation.objects.filter(kind=AIAnnotation.Kind.DIGEST).count(), 2)
+
+        report = svc.annotate_conversations_batch([conv.pk], incremental=True, create_tasks=False)
+        self.assertEqual((report.processed, report.skipped, report.digested), (0, 1, 0))
+
+        self.add_message(conv, "new", "Urgent: the client moved the deadline, please review the numbers asap.")
+        digest_many = HeuristicBackend.digest_many
+        with mock.patch.object(HeuristicBackend, "digest_many", autospec=True, side_effect=digest_many) as spy:
+            report = svc.annotate_conversations_batch([conv.pk], incremental=True, create_tasks=False)
+        self.assertEqual(report.digested, 1)
+        self.assertEqual([len(call.args[1]) for call in spy.call_args_list], [1])
+        self.assertEqual(report.priorities, {"urgent": 1})
+
+    def test_merged_result_matches_whole_thread_rules(self):
+        conv = self.make_conversation("t-incr-2")
+        svc = SummarizerService()
+        merged = svc.annotate_conversation(conv.pk, incremental=True)
+        # unchanged thread: served from the stored annotations
+        self.assertEqual(svc.annotate_conversation(conv.pk, incremental=True), merged)
+
+        full = svc.annotate_conversation(conv.pk, force=True)
+        self.assertEqual(merged.priority_label, full.priority_label)
+        # the whole-line action differs only by the subject prefix; the sentence actions are the same
+        self.assertEqual(merged.actions[1:], full.actions[1:])
+        self.assertIn("quarterly report", merged.summary)
+
+    def test_edited_message_is_digested_again(self):
+        conv = self.make_conversation("t-incr-3")
+        svc = SummarizerService()
+        svc.annotate_conversation(conv.pk, incremental=True, create_tasks=False)
+        message = conv.messages.get()
+        message.text = "Promo: huge discount on the sale, unsubscribe any time."
+        message.save()
+        self.assertEqual(svc.annotate_conversation(conv.pk, incremental=True, create_tasks=False).priority_label, "spam")
+
+    @override_settings(FOCUSFLOW_DELTA_SETTLE_SECONDS=0)
+    def test_digests_stay_out_of_the_api_and_exports(self):
+        conv = self.make_conversation("t-incr-api")
+        SummarizerService().annotate_conversation(conv.pk, incremental=True, create_tasks=False)
+        message = conv.messages.get()
+        self.assertTrue(AIAnnotation.objects.filter(kind=AIAnnotation.Kind.DIGEST).exists())
+
+        detail = self.client.get(reverse("focusflow:api_message_detail", args=[message.pk])).json()
+        self.assertEqual(detail["annotations"], [])
+        listed = self.client.get(reverse("focusflow:api_annotations_list"), {"page_size": 100}).json()["results"]
+        self.assertNotIn("digest", {a["kind"] for a in listed})
+        changes = self.client.get(reverse("focusflow:api_changes"), {"since": ""}).json()["changes"]
+        self.assertEqual({a["kind"] for a in changes["annotations"]["changed"]}, {"summary", "priority", "action_items"})
+        exported = list(export.iter_rows(self.workspace.pk, "annotations"))
+        self.assertEqual(len(exported), AIAnnotation.objects.exclude(kind=AIAnnotation.Kind.DIGEST).count())
+
+    def test_annotate_command_incremental(self):
+        self.make_conversation("t-incr-cmd")
+        out = StringIO()
+        call_command("focusflow_annotate", "--all-conversations", "--incremental", "--no-tasks", stdout=out)
+        self.assertIn("1 message(s) digested", out.getvalue())
+
+    def test_backend_without_digests_is_rejected(self):
+        register_backend("recording-v1", RecordingBackend())
+        self.addCleanup(register_backend, "recording-v1", None)
+        conv = self.make_conversation("t-incr-4")
+        with self.assertRaises(ValueError):
+            SummarizerService(model_name="recording-v1").annotate_conversations_batch([conv.pk], incremental=True)
+
+
+class AnnotationBulkUpsertTests(FocusFlowFixtureMixin, TestCase):
+    def test_bulk_upsert_is_single_statement_and_idempotent(self):
+        convs = [self.make_conversation(f"t-bulk-{i}") for i in range(3)]
+        svc = SummarizerService()
+        first = SummarizeResult(summary="one", actions=["Send numbers"], priority_label="action", priority_score=0.7)
+        items = [(self.workspace, c, first) for c in convs]
+
+        with self.assertNumQueries(1):
+            action_rows = svc.bulk_upsert_annotations(items)
+        self.assertTrue(all(a.pk for a in action_rows))
+        self.assertEqual(AIAnnotation.objects.count(), 9)
+
+        second = SummarizeResult(summary="two", actions=[], priority_label="fyi", priority_score=0.6)
+        again = svc.bulk_upsert_annotations([(self.workspace, c, second) for c in convs])
+        self.assertEqual([a.pk for a in again], [a.pk for a in action_rows])
+        self.assertEqual(AIAnnotation.objects.count(), 9)
+        self.assertEqual(
+            set(AIAnnotation.objects.filter(kind=AIAnnotation.Kind.SUMMARY).values_list("content_text", flat=True)),
+            {"two"},
+        )
+
+    def test_duplicate_annotation_rows_are_rejected(self):
+        conv = self.make_conversation("t-dupe")
+        ct = ContentType.objects.get_for_model(Conversation)
+        fields = dict(
+            workspace=self.workspace, target_content_type=ct, target_object_id=conv.pk,
+            kind=AIAnnotation.Kind.SUMMARY, model_name="simple-v1",
+        )
+        AIAnnotation.objects.create(**fields)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AIAnnotation.objects.create(**fields)
+
+
+class TaskDedupTests(FocusFlowFixtureMixin, TestCase):
+    def test_existing_open_titles_are_skipped_in_one_pass(self):
+        convs = [self.make_conversation(f"t-task-{i}") for i in range(3)]
+        svc = SummarizerService()
+        actions = ["Send the revenue comments", "Book the finance call"]
+        svc._ensure_tasks_from_actions(workspace=self.workspace, source_obj=convs[0], actions=actions[:1])
+
+        with self.assertNumQueries(2):  # existing open titles + one bulk insert
+            created = svc._bulk_ensure_tasks([(self.workspace, c, actions, None) for c in convs])
+        self.assertEqual(len(created), 5)
+        self.assertEqual(Task.objects.count(), 6)
+
+    def test_done_tasks_do_not_block_new_ones(self):
+        conv = self.make_conversation("t-task-done")
+        svc = SummarizerService()
+        [task] = svc._ensure_tasks_from_actions(workspace=self.workspace, source_obj=conv, actions=["Reply"])
+        Task.objects.filter(title="Reply").update(status=Task.Status.DONE)
+        svc._ensure_tasks_from_actions(workspace=self.workspace, source_obj=conv, actions=["Reply"])
+        self.assertEqual(Task.objects.filter(title="Reply").count(), 2)
+
+    def test_open_task_uniqueness_is_enforced_by_the_database(self):
+        conv = self.make_conversation("t-task-race")
+        ct = ContentType.objects.get_for_model(Conversation)
+        fields = dict(workspace=self.workspace, source_content_type=ct, source_object_id=conv.pk, title="Reply")
+        Task.objects.create(**fields)
+        Task.objects.bulk_create([Task(**fields)], ignore_conflicts=True)
+        self.assertEqual(Task.objects.count(), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Task.objects.create(**fields)
+
+
+class FakeGmail:
+    """
+    Minimal in-memory Gmail REST API (profile, messages.list/get, history.list, batch) served over
+    HTTP on localhost, so sync code runs against real sockets without touching Google.
+    `failures` maps a message id (or "batch") to a list of status codes to answer before succeeding.
+    """
+
+    def __init__(self):
+        self.messages = {}
+        self.history = []         # [(history_id, message_id)]
+        self.history_id = 100
+        self.oldest_history_id = 100
+        self.requests = []
+        self.failures = {}
+        self.connections = set()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, payload, content_type="application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                fake.connections.add(self.client_address)
+                url = urlparse(self.path)
+                fake.requests.append(url.path)
+                status, body = fake.route(url.path.split("/gmail/v1/users/me/")[-1], parse_qs(url.query))
+                self.reply(status, json.dumps(body).encode())
+
+            def do_POST(self):
+                fake.connections.add(self.client_address)
+                fake.requests.append(self.path)
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                failure = fake.next_failure("batch")
+                if failure:
+                    return self.reply(failure, b"{}")
+                self.reply(200, *fake.batch(self.headers["Content-Type"], body))
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.api_base = f"http://127.0.0.1:{self.server.server_port}/gmail/v1/users/me"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def next_failure(self, key):
+        queued = self.failures.get(key)
+        return queued.pop(0) if queued else None
+
+    def batch(self, content_type, body):
+        boundary = content_type.split("boundary=")[1]
+        out = []
+        for chunk in body.decode().split(f"--{boundary}")[1:-1]:
+            content_id = chunk.split("Content-ID: <", 1)[1].split(">", 1)[0]
+            request_line = chunk.strip().splitlines()[-1]
+            url = urlparse(request_line.split()[1])
+            status, payload = self.route(url.path.split("/gmail/v1/users/me/")[-1], parse_qs(url.query))
+            reason = {200: "OK", 404: "Not Found", 429: "Too Many Requests"}.get(status, "Error")
+            out.append(
+                f"--resp\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n\r\n{json.dumps(payload)}\r\n"
+            )
+        out.append("--resp--\r\n")
+        return "".join(out).encode(), "multipart/mixed; boundary=resp"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add_message(self, msg_id, thread_id, *, sender="Alice <alice@example.com>", to="me@example.com",
+                    subject="Hello", body="Hello there", unread=True):
+        self.history_id += 1
+        self.messages[msg_id] = {
+            "id": msg_id,
+            "threadId": thread_id,
+            "historyId": str(self.history_id),
+            "internalDate": str(1_700_000_000_000 + self.history_id * 1000),
+            "labelIds": ["INBOX", "UNREAD"] if unread else ["INBOX"],
+            "snippet": body[:50],
+            "payload": {
+                "mimeType": "text/plain",
+                "headers": [
+                    {"name": "From", "value": sender},
+                    {"name": "To", "value": to},
+                    {"name": "Subject", "value": subject},
+                ],
+                "body": {"data": base64.urlsafe_b64encode(body.encode()).decode().rstrip("=")},
+            },
+        }
+        self.history.append((self.history_id, msg_id))
+
+    def route(self, path, query):
+        if path == "profile":
+            return 200, {"emailAddress": "me@example.com", "historyId": str(self.history_id)}
+        if path == "messages":
+            ids = sorted(self.messages, reverse=True)
+            return 200, {"messages": [{"id": i, "threadId": self.messages[i]["threadId"]} for i in ids]}
+        if path.startswith("messages/"):
+            msg_id = path.split("/", 1)[1]
+            failure = self.next_failure(msg_id)
+            if failure:
+                return failure, {"error": {"code": failure}}
+            msg = self.messages.get(msg_id)
+            return (200, msg) if msg else (404, {"error": "not found"})
+        if path == "history":
+            start = int(query["startHistoryId"][0])
+            if start < self.oldest_history_id:
+                return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+            added = [
+                {"id": str(h), "messagesAdded": [{"message": {"id": m, "threadId": self.messages[m]["threadId"]}}]}
+                for h, m in self.history if h > start
+            ]
+            return 200, {"history": added, "historyId": str(self.history_id)}
+        return 404, {"error": "unknown path"}
+
+
+class GmailSyncTests(FocusFlowFixtureMixin, TestCase):
+    def setUp(self):
+        self.gmail = FakeGmail()
+        self.addCleanup(self.gmail.close)
+
+    def sync(self):
+        return GmailSyncEngine(self.stream, "token", api_base=self.gmail.api_base).run()
+
+    def test_first_sync_lists_inbox_and_stores_cursor(self):
+        self.gmail.add_message("m1", "th1", subject="Kickoff")
+        self.gmail.add_message("m2", "th1", subject="Re: Kickoff", unread=False)
+        self.gmail.add_message("m3", "th2", sender="Bob <BOB@example.com>")
+
+        cursor = self.sync()
+
+        self.assertEqual(cursor.cursor, str(self.gmail.history_id))
+        self.assertEqual(cursor.stats_json["mode"], "full")
+        self.assertEqual(cursor.stats_json["messages_created"], 3)
+        self.assertIsNotNone(cursor.last_synced_at)
+        conv = Conversation.objects.get(stream=self.stream, remote_thread_id="th1")
+        self.assertEqual(conv.subject, "Kickoff")
+        self.assertEqual(conv.messages.count(), 2)
+        self.assertEqual(conv.unread_count, 1)
+        self.assertTrue(Identity.objects.filter(normalized_value="bob@example.com").exists())
+        self.assertEqual(Message.objects.get(remote_message_id="m1").text, "Hello there")
+
+    def test_second_sync_fetches_only_new_messages(self):
+        self.gmail.add_message("m1", "th1")
+        self.sync()
+        self.gmail.add_message("m2", "th1")
+        self.gmail.requests.clear()
+
+        cursor = self.sync()
+
+        self.assertEqual(cursor.stats_json["mode"], "incremental")
+        self.assertEqual(cursor.stats_json["fetched"], 1)
+        self.assertNotIn("/gmail/v1/users/me/messages/m1", self.gmail.requests)
+        self.assertEqual(Message.objects.count(), 2)
+        self.assertEqual(Contact.objects.filter(identities__normalized_value="alice@example.com").count(), 1)
+
+    def test_expired_history_falls_back_to_full_sync(self):
+        self.gmail.add_message("m1", "th1")
+        self.sync()
+        self.gmail.oldest_history_id = self.gmail.history_id + 10
+
+        cursor = self.sync()
+
+        self.assertEqual(cursor.stats_json["mode"], "full (history expired)")
+        self.assertEqual(cursor.stats_json["messages_created"], 0)
+        self.assertEqual(SyncCursor.objects.get(stream=self.stream).status, "idle")
+
+    def test_callback_survives_any_sync_failure(self):
+        self.client.force_login(self.user)
+        with (
+            mock.patch("apps.focusflow.views.exchange_code_for_token", return_value={"access_token": "token"}),
+            mock.patch("apps.focusflow.views.get_gmail_profile_email", return_value="me@example.com"),
+            mock.patch("apps.focusflow.views.list_recent_message_headers", return_value=[]),
+            mock.patch.object(GmailSyncEngine, "run", side_effect=ValueError("bad payload")),
+            self.assertLogs("apps.focusflow.views", "ERROR"),
+        ):
+            res = self.client.get(reverse("focusflow:gmail_callback"), {"code": "abc"})
+        self.assertRedirects(res, reverse("focusflow:integrations") + "?sync=error", fetch_redirect_response=False)
+        integ = Integration.objects.get(provider="gmail", account_label="me@example.com")
+        self.assertEqual((integ.sync_status, integ.last_error), ("error", "bad payload"))
+
+
+class GmailClientTests(TestCase):
+    def setUp(self):
+        self.gmail = FakeGmail()
+        self.addCleanup(self.gmail.close)
+        for i in range(150):
+            self.gmail.add_message(f"m{i:03d}", f"th{i}")
+        self.client = GmailClient("token", api_base=self.gmail.api_base, backoff=0, max_workers=2)
+
+    def test_batches_of_one_hundred_preserve_order(self):
+        ids = [f"m{i:03d}" for i in range(150)] + ["gone"]
+        payloads = self.client.get_messages(ids)
+        self.assertEqual([p["id"] for p in payloads], ids[:-1])
+        self.assertEqual(self.gmail.requests.count("/batch/gmail/v1"), 2)
+
+    def test_retries_rate_limited_parts_and_whole_batches(self):
+        self.gmail.failures = {"batch": [503], "m007": [429, 500]}
+        payloads = self.client.get_messages(["m005", "m007"])
+        self.assertEqual([p["id"] for p in payloads], ["m005", "m007"])
+        self.assertEqual(self.gmail.requests.count("/batch/gmail/v1"), 4)
+
+    def test_gives_up_after_max_retries(self):
+        self.gmail.failures = {"m001": [429] * 10}
+        client = GmailClient("token", api_base=self.gmail.api_base, backoff=0, max_retries=2)
+        with self.assertRaises(GmailApiError):
+            client.get_messages(["m001"], use_batch=False)
+
+    def test_single_requests_reuse_connections(self):
+        self.client.get_messages([f"m{i:03d}" for i in range(20)], use_batch=False)
+        self.assertLess(len(self.gmail.connections), 20)
+
+
+def inbound(n, *, threads=3, start=0):
+    base = timezone.now() - timedelta(days=1)
+    for i in range(start, start + n):
+        yield InboundMessage(
+            remote_thread_id=f"thread-{i % threads}",
+            remote_message_id=f"msg-{i}",
+            sender=InboundAddress(Identity.Kind.EMAIL, f"Sender{i % 4}@Example.com", f"Sender {i % 4}"),
+            sent_at=base + timedelta(minutes=i),
+            subject=f"Thread {i % threads}",
+            recipients=[
+                (MessageRecipient.RType.TO, InboundAddress(Identity.Kind.EMAIL, "me@example.com", "Me")),
+                (MessageRecipient.RType.CC, InboundAddress(Identity.Kind.EMAIL, f"cc{i % 2}@example.com")),
+            ],
+            text=f"Body of message {i}",
+        )
+
+
+class IngestPipelineTests(FocusFlowFixtureMixin, TestCase):
+    def test_builds_message_graph(self):
+        stats = IngestPipeline(self.stream, chunk_size=7).run(inbound(20))
+
+        self.assertEqual(stats.messages_created, 20)
+        self.assertEqual(stats.conversations_created, 3)
+        self.assertEqual(stats.contacts_created, 7)  # 4 senders, me, 2 cc
+        self.assertEqual(Message.objects.count(), 20)
+        self.assertEqual(MessageRecipient.objects.count(), 40)
+        conv = Conversation.objects.get(remote_thread_id="thread-0")
+        self.assertEqual(conv.unread_count, 7)
+        self.assertEqual(conv.last_message_at, Message.objects.filter(conversation=conv).latest("sent_at").sent_at)
+        self.assertTrue(
+            ConversationParticipant.objects.filter(conversation=conv, role=ConversationParticipant.Role.ORIGINATOR)
+            .filter(contact__identities__normalized_value="sender0@example.com")
+            .exists()
+        )
+
+    def test_query_count_does_not_grow_with_chunk_size(self):
+        IngestPipeline(self.stream).run(inbound(5))  # warm identities/conversations
+        # 14 message graph, 2 search document batches, 4 idf (savepoint pair, locked read, update),
+        # 4 rollups, 4 inbox
+        with self.assertNumQueries(28):
+            IngestPipeline(self.stream, chunk_size=500).run(inbound(200, start=5))
+        self.assertEqual(Message.objects.count(), 205)
+
+    def test_rerun_is_idempotent(self):
+        IngestPipeline(self.stream).run(inbound(10))
+        stats = IngestPipeline(self.stream).run(inbound(10))
+        self.assertEqual((stats.messages_seen, stats.messages_created), (10, 0))
+        self.assertEqual(Message.objects.count(), 10)
+        self.assertEqual(Conversation.objects.get(remote_thread_id="thread-1").unread_count, 3)
+
+
+NEWSLETTER = (
+    "Weekly engineering digest issue {n}. This week the platform team shipped the new deploy pipeline, "
+    "the data team migrated the warehouse jobs to the new scheduler, and the mobile team released "
+    "version {n} of the app with offline sync. Read the full notes on the wiki and reply with questions "
+    "for the Friday demo session."
+)
+
+
+def newsletters(issues, *, start=0):
+    base = timezone.now() - timedelta(days=1)
+    for i, issue in enumerate(issues, start):
+        yield InboundMessage(
+            remote_thread_id=f"digest-{issue}",
+            remote_message_id=f"digest-{issue}",
+            sender=InboundAddress(Identity.Kind.EMAIL, "digest@example.com", "Digest"),
+            sent_at=base + timedelta(hours=i),
+            subject=f"Engineering digest #{issue}",
+            text=NEWSLETTER.format(n=issue),
+        )
+
+
+class NearDuplicateTests(FocusFlowFixtureMixin, TestCase):
+    def test_simhash_matches_per_bit_reference(self):
+        def reference(text):
+            totals = [0] * 64
+            for term, weight in Counter(dedup.RE_DIGITS.sub("0", t) for t in content_terms(text)).items():
+                h = int.from_bytes(blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+                for bit in range(64):
+                    totals[bit] += weight if h >> bit & 1 else -weight
+            return sum(1 << bit for bit in range(64) if totals[bit] > 0)
+
+        for text in (NEWSLETTER.format(n=1), THREAD_TEXT, FOOTER * 3):
+            self.assertEqual(dedup.simhash(text), reference(text))
+        self.assertIsNone(dedup.simhash("Thanks, see you tomorrow"))
+
+        self.assertEqual(dedup.simhash(NEWSLETTER.format(n=41)), dedup.simhash(NEWSLETTER.format(n=42)))
+        self.assertGreater(dedup.hamming(dedup.simhash(NEWSLETTER.format(n=41)), dedup.simhash(THREAD_TEXT)), 10)
+
+    def test_ingest_links_near_duplicates_to_the_oldest(self):
+        IngestPipeline(self.stream).run(newsletters([40, 41]))
+        IngestPipeline(self.stream).run(newsletters([42, 43], start=2))
+        IngestPipeline(self.stream).run(inbound(3))     # too short to sign
+        self.make_conversation("t-dup-other")
+        index_messages(Message.objects.filter(remote_message_id="t-dup-other-m0").values_list("id", flat=True))
+
+        first = Message.objects.get(remote_message_id="digest-40")
+        links = dict(MessageSignature.objects.values_list("message__remote_message_id", "duplicate_of_id"))
+        self.assertEqual(links, {"digest-40": None, "digest-41": first.pk, "digest-42": first.pk, "digest-43": first.pk})
+        self.assertEqual(set(MessageSignature.objects.values_list("cluster_root", flat=True)), {first.pk})
+
+        self.assertEqual(rebuild_signatures(self.workspace.pk), 5)
+        links["t-dup-other-m0"] = None
+        self.assertEqual(
+            dict(MessageSignature.objects.values_list("message__remote_message_id", "duplicate_of_id")), links
+        )
+
+    def test_signing_costs_two_queries_per_chunk(self):
+        IngestPipeline(self.stream).run(newsletters(range(30)))
+        bodies = list(MessageSearchDocument.objects.values_list("message_id", "body"))
+        with self.assertNumQueries(2):  # band lookup, upsert
+            self.assertEqual(len(dedup.sign_messages(self.workspace.pk, bodies)), 30)
+
+    def test_duplicate_message_reuses_annotations_without_tasks(self):
+        body = "Please confirm your seat for the demo session. " + NEWSLETTER
+        conv = self.make_conversation("t-dup-ann", bodies=[body.format(n=7), body.format(n=8)])
+        first, second = conv.messages.order_by("sent_at")
+        index_messages([first.pk, second.pk])
+        rebuild_signatures(self.workspace.pk)
+
+        svc = SummarizerService()
+        original = svc.annotate_message(first.pk, create_tasks=True)
+        tasks = Task.objects.count()
+        with mock.patch.object(HeuristicBackend, "summarize_many") as summarize:
+            reused = svc.annotate_message(second.pk, create_tasks=True)
+        summarize.assert_not_called()
+        self.assertEqual(reused, original)
+        self.assertEqual(Task.objects.count(), tasks)
+        self.assertTrue(
+            AIAnnotation.objects.filter(
+                target_content_type=ContentType.objects.get_for_model(Message), target_object_id=second.pk
+            ).exists()
+        )
+
+    def test_incremental_digest_is_shared_by_near_duplicates(self):
+        IngestPipeline(self.stream).run(newsletters([1, 2, 3]))
+        ids = list(Conversation.objects.order_by("last_message_at").values_list("id", flat=True))
+        svc = SummarizerService()
+        report = svc.annotate_conversations_batch(ids[:1], incremental=True, create_tasks=False)
+        self.assertEqual(report.digested, 1)
+
+        report = svc.annotate_conversations_batch(ids[1:], incremental=True, create_tasks=False)
+        self.assertEqual((report.processed, report.digested), (2, 0))
+        self.assertEqual(AIAnnotation.objects.filter(kind=AIAnnotation.Kind.DIGEST).count(), 3)
+
+    def test_messages_api_collapses_duplicate_clusters(self):
+        IngestPipeline(self.stream).run(newsletters([1, 2, 3]))
+        other = self.make_conversation("t-dup-api").messages.get()
+        first = Message.objects.get(remote_message_id="digest-1")
+        url = reverse("focusflow:api_messages_list")
+
+        rows = self.client.get(url, {"collapse": "duplicates"}).json()["results"]
+        self.assertEqual({r["id"]: r["duplicates"] for r in rows}, {first.pk: 2, other.pk: 0})
+        page = self.client.get(url, {"collapse": "duplicates", "cursor": "", "fields": "id,duplicates"}).json()
+        self.assertEqual(len(page["results"]), 2)
+        self.assertEqual(len(self.client.get(url).json()["results"]), 4)
+        self.assertEqual(self.client.get(url, {"collapse": "threads"}).status_code, 400)
+
+        # the cluster's oldest message is outside the filter: the thread's own copy stands in for it
+        second = Message.objects.get(remote_message_id="digest-2")
+        rows = self.client.get(url, {"collapse": "duplicates", "conversation_id": second.conversation_id}).json()
+        self.assertEqual([(r["id"], r["duplicates"]) for r in rows["results"]], [(second.pk, 0)])
+        rows = self.client.get(url, {"collapse": "duplicates", "q": "", "stream_id": self.stream.pk}).json()
+        self.assertEqual(len(rows["results"]), 2)
+
+
+class IdentityResolverTests(FocusFlowFixtureMixin, TestCase):
+    def test_normalizers(self):
+        self.assertEqual(normalize_email("Alice <Alice.Smith+news@GoogleMail.com>"), "alicesmith@gmail.com")
+        self.assertEqual(normalize_email("mailto:Bob.Lee+x@Example.COM"), "bob.lee+x@example.com")
+        self.assertEqual(normalize_phone("+1 (415) 555-0100"), "+14155550100")
+        self.assertEqual(normalize_phone("0044 20 7946 0958"), "+442079460958")
+
+    def test_batch_lookup_creates_misses_and_caches(self):
+        resolver = IdentityResolver(self.workspace)
+        addresses = [
+            ("email", "alice.smith@gmail.com", "Alice"),
+            ("email", "AliceSmith+promo@gmail.com", ""),
+            ("phone", "+1 415 555 0100", "Bob"),
+        ]
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(6):
+            ids = resolver.resolve_many(addresses)  # 2 lookups, 2 inserts, 2 winner checks (one per kind)
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(Contact.objects.filter(workspace=self.workspace).count(), 3)  # fixture Alice + 2
+
+        with self.assertNumQueries(0):
+            again = resolver.resolve_many(addresses)
+        self.assertEqual(again, ids)
+        self.assertEqual(IdentityResolver(self.workspace).resolve("email", "ALICESMITH@gmail.com"),
+                         ids[("email", "alicesmith@gmail.com")])
+
+    def test_cache_is_bounded(self):
+        resolver = IdentityResolver(self.workspace, maxsize=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            resolver.resolve_many([("email", f"user{i}@example.com", "") for i in range(5)])
+        self.assertEqual(len(resolver._cache), 2)
+        with self.assertNumQueries(1):
+            resolver.resolve("email", "user0@example.com")
+
+    def test_rolled_back_chunk_leaves_cache_empty(self):
+        resolver = IdentityResolver(self.workspace)
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                resolver.resolve("email", "ghost@example.com")
+                raise IntegrityError("chunk failed")
+        self.assertEqual(len(resolver._cache), 0)
+        self.assertFalse(Identity.objects.filter(normalized_value="ghost@example.com").exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            contact_id = resolver.resolve("email", "ghost@example.com")
+        self.assertTrue(Contact.objects.filter(pk=contact_id).exists())
+
+    def test_workspaces_never_share_contacts(self):
+        other = Workspace.objects.create(name="FF Other", owner=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            ours = IdentityResolver(self.workspace).resolve("email", "carol@example.com", "Carol (ours)")
+            theirs = IdentityResolver(other).resolve("email", "Carol@Example.com", "Carol (theirs)")
+        self.assertNotEqual(ours, theirs)
+        self.assertEqual(Contact.objects.get(pk=theirs).workspace, other)
+        self.assertEqual(Contact.objects.get(pk=theirs).display_name, "Carol (theirs)")
+        self.assertEqual(IdentityResolver(other).resolve("email", "carol@example.com"), theirs)
+
+
+class KeysetPaginationTests(FocusFlowFixtureMixin, TestCase):
+    def walk(self, url, **params):
+        seen, cursor = [], ""
+        while cursor is not None:
+            res = self.client.get(url, {**params, "cursor": cursor})
+            self.assertEqual(res.status_code, 200)
+            body = res.json()
+            self.assertNotIn("count", body)
+            seen.extend(r["id"] for r in body["results"])
+            cursor = body["next_cursor"]
+        return seen
+
+    def test_messages_walk_visits_every_row_once_in_order(self):
+        conv = self.make_conversation("t-keyset", bodies=[f"message {i}" for i in range(7)])
+        Message.objects.filter(conversation=conv, remote_message_id__in=["t-keyset-m1", "t-keyset-m2"]).update(
+            sent_at=Message.objects.get(remote_message_id="t-keyset-m3").sent_at
+        )  # ties on sent_at are broken by id
+        expected = list(Message.objects.order_by("-sent_at", "-id").values_list("id", flat=True))
+
+        with CaptureQueriesContext(connection) as ctx:
+            seen = self.walk(reverse("focusflow:api_messages_list"), page_size=3)
+        self.assertEqual(seen, expected)
+        self.assertFalse(any("COUNT(" in q["sql"] for q in ctx.captured_queries))
+
+    def test_conversations_walk_includes_rows_without_messages(self):
+        for i in range(4):
+            self.make_conversation(f"t-conv-{i}")
+        Conversation.objects.create(workspace=self.workspace, stream=self.stream, remote_thread_id="empty-1")
+        Conversation.objects.create(workspace=self.workspace, stream=self.stream, remote_thread_id="empty-2")
+
+        seen = self.walk(reverse("focusflow:api_conversations_list"), page_size=2)
+        self.assertEqual(len(seen), 6)
+        self.assertEqual(len(set(seen)), 6)
+
+    def test_page_mode_is_unchanged_and_bad_cursor_is_rejected(self):
+        self.make_conversation("t-page")
+        url = reverse("focusflow:api_annotations_list")
+        SummarizerService().annotate_conversation(Conversation.objects.get().pk)
+        self.assertEqual(self.client.get(url).json()["count"], 3)
+        self.assertEqual(self.client.get(url, {"cursor": "not-a-cursor"}).status_code, 400)
+
+
+class AnnotationPrefetchTests(FocusFlowFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        convs = [cls.make_conversation(f"t-pre-{i}") for i in range(5)]
+        SummarizerService().annotate_conversations_batch([c.pk for c in convs], create_tasks=False)
+
+    def test_include_annotations_costs_one_query_per_page(self):
+        url = reverse("focusflow:api_conversations_list")
+        with self.assertNumQueries(3):  # count, page, annotations
+            body = self.client.get(url, {"include": "annotations"}).json()
+        kinds = {a["kind"] for a in body["results"][0]["annotations"]}
+        self.assertEqual(kinds, {"summary", "priority"})
+        self.assertNotIn("annotations", self.client.get(url).json()["results"][0])
+
+    def test_annotations_list_has_no_per_row_queries(self):
+        with self.assertNumQueries(2):  # count, page (workspace + content type joined)
+            body = self.client.get(reverse("focusflow:api_annotations_list")).json()
+        self.assertEqual(len(body["results"]), 15)
+        self.assertEqual(body["results"][0]["target_type"], "conversation")
+
+
+class SparseFieldsTests(FocusFlowFixtureMixin, TestCase):
+    def test_fields_narrow_the_payload_and_the_select(self):
+        self.make_conversation("t-fields", bodies=["x" * 1000, "short"])
+        url = reverse("focusflow:api_messages_list")
+        with CaptureQueriesContext(connection) as ctx:
+            body = self.client.get(url, {"fields": "id,sender", "cursor": ""}).json()
+        self.assertEqual(set(body["results"][0]), {"id", "sender"})
+        self.assertEqual(body["results"][0]["sender"], "Alice")
+        page_sql = ctx.captured_queries[-1]["sql"]
+        self.assertNotIn('"text"', page_sql)
+        self.assertNotIn('"external_url"', page_sql)
+
+        full = self.client.get(url).json()["results"]
+        self.assertEqual(sorted(len(r["text"]) for r in full), [5, 400])
+        self.assertEqual(full[0]["external_url"], "")
+
+    def test_list_rows_match_the_instance_serializer(self):
+        conv = self.make_conversation("t-fields-parity")
+        row = self.client.get(reverse("focusflow:api_conversations_list")).json()["results"][0]
+        detail = self.client.get(reverse("focusflow:api_conversation_detail", args=[conv.pk])).json()
+        self.assertEqual(row, {k: v for k, v in detail.items() if k not in ("messages", "annotations")})
+
+    def test_unknown_fields_are_rejected(self):
+        res = self.client.get(reverse("focusflow:api_actions_list"), {"fields": "id,password"})
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("password", res.json()["error"])
+
+
+class AnalyticsEndpointTests(FocusFlowFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for i in range(25):
+            conv = cls.make_conversation(f"t-an-{i}", bodies=("one", "two"))
+            if i % 5 == 0:
+                Conversation.objects.filter(pk=conv.pk).update(priority=Conversation.Priority.URGENT)
+        today = timezone.localdate()
+        rebuild_rollups(today - timedelta(days=1), today)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_counts_cover_the_whole_inbox(self):
+        url = reverse("focusflow:api_analytics")
+        body = self.client.get(url, {"workspace": self.workspace.pk, "days": 7}).json()
+        self.assertEqual(body["totals"]["conversations"], 25)
+        self.assertEqual(body["conversations_by_priority"], {"urgent": 5, "action": 0, "fyi": 20, "spam": 0})
+        self.assertEqual(body["messages_by_stream"], [{"stream_id": self.stream.pk, "name": "Inbox", "count": 50}])
+        self.assertEqual(len(body["messages_per_day"]), 7)
+        self.assertEqual(sum(d["count"] for d in body["messages_per_day"]), 50)
+        self.assertEqual(self.client.get(url, {"workspace": "x"}).status_code, 400)
+
+    def test_results_are_cached_within_a_bucket(self):
+        url = reverse("focusflow:api_analytics")
+        first = self.client.get(url).json()
+        self.make_conversation("t-an-late")
+        with self.assertNumQueries(0):
+            second = self.client.get(url).json()
+        self.assertEqual(first, second)
+
+
+class RollupTests(FocusFlowFixtureMixin, TestCase):
+    def rollup_rows(self):
+        return (
+            sorted(DailyStreamRollup.objects.values_list("stream_id", "day", "message_count")),
+            sorted(DailySenderRollup.objects.values_list("contact_id", "day", "message_count")),
+            sorted(DailyPriorityRollup.objects.filter(conversation_count__gt=0).values_list(
+                "day", "priority", "conversation_count"
+            )),
+        )
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        IngestPipeline(self.stream, chunk_size=7).run(inbound(30))
+        IngestPipeline(self.stream).run(inbound(30))  # re-run adds nothing
+        svc = SummarizerService()
+        svc.annotate_conversations_batch(Conversation.objects.values_list("id", flat=True), create_tasks=False)
+        incremental = self.rollup_rows()
+        self.assertEqual(sum(n for _, _, n in incremental[0]), 30)
+        self.assertEqual(sum(n for _, _, n in incremental[2]), 3)
+
+        today = timezone.localdate()
+        out = StringIO()
+        call_command("focusflow_rollups", "--start", str(today - timedelta(days=2)), stdout=out)
+        self.assertIn("All done!", out.getvalue())
+        self.assertEqual(self.rollup_rows(), incremental)
+
+    def test_relabel_moves_priority_bucket(self):
+        conv = self.make_conversation("t-roll")
+        svc = SummarizerService()
+        first = svc.annotate_conversation(conv.pk).priority_label
+        Message.objects.create(
+            conversation=conv, stream=self.stream, remote_message_id="t-roll-urgent", sender=self.alice,
+            sent_at=timezone.now(), text="URGENT: production is down, reply ASAP! Deadline today.",
+        )
+        second = svc.annotate_conversation(conv.pk).priority_label
+        self.assertNotEqual(first, second)
+        counts = dict(DailyPriorityRollup.objects.values_list("priority", "conversation_count"))
+        self.assertEqual((counts[first], counts[second]), (0, 1))
+
+    def test_conversation_annotated_by_several_models_counts_once(self):
+        conv = self.make_conversation("t-roll-models")
+        SummarizerService().annotate_conversation(conv.pk)
+        SummarizerService(model_name="tfidf-v1").annotate_conversation(conv.pk)
+        SummarizerService(model_name="other-v2").annotate_conversations_batch([conv.pk])
+        incremental = self.rollup_rows()
+        self.assertEqual(sum(n for _, _, n in incremental[2]), 1)
+
+        rebuild_rollups(timezone.localdate() - timedelta(days=2), timezone.localdate())
+        self.assertEqual(self.rollup_rows()[2], incremental[2])  # messages were not ingested, priorities match
+
+
+class FullTextSearchTests(FocusFlowFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        IngestPipeline(cls.stream).run(inbound(20))
+        conv = cls.make_conversation("t-html", subject="Budget planning", bodies=("",))
+        msg = conv.messages.get()
+        msg.html = "<p>The <b>marketing</b> budget &amp; forecast</p>"
+        msg.save()
+        index_messages([msg.pk])
+
+    def test_messages_are_ranked_with_escaped_snippets(self):
+        body = self.client.get(reverse("focusflow:api_messages_list"), {"q": "message 7"}).json()
+        self.assertEqual(body["count"], 1)
+        self.assertEqual(body["results"][0]["text"], "Body of message 7")
+        self.assertIn("<mark>7</mark>", body["results"][0]["snippet"])
+
+        body = self.client.get(reverse("focusflow:api_messages_list"), {"q": "marketing forecast"}).json()
+        self.assertEqual(body["count"], 1)
+        self.assertIn("&amp;", body["results"][0]["snippet"])
+        self.assertNotIn("<b>", body["results"][0]["snippet"])
+
+    def test_conversations_match_subject_and_body(self):
+        url = reverse("focusflow:api_conversations_list")
+        body = self.client.get(url, {"q": "thread", "include": "annotations"}).json()
+        self.assertEqual(body["count"], 3)
+        self.assertTrue(all(r["snippet"] for r in body["results"]))
+        self.assertEqual(self.client.get(url, {"q": "budget"}).json()["results"][0]["subject"], "Budget planning")
+
+    def test_conversation_without_messages_matches_its_subject(self):
+        url = reverse("focusflow:api_conversations_list")
+        empty = Conversation.objects.create(
+            workspace=self.workspace, stream=self.stream, remote_thread_id="t-empty", subject="Budget offsite"
+        )
+        body = self.client.get(url, {"q": "budget", "page_size": 1}).json()
+        self.assertEqual(body["count"], 2)
+        self.assertEqual(body["results"][0]["subject"], "Budget planning")
+        body = self.client.get(url, {"q": "budget", "page_size": 1, "page": 2}).json()
+        self.assertEqual([(r["id"], r["snippet"]) for r in body["results"]], [(empty.pk, "")])
+        self.assertEqual(self.client.get(url, {"q": "offsite", "state": "archived"}).json()["count"], 0)
+
+    def test_cursor_is_rejected_with_a_query(self):
+        res = self.client.get(reverse("focusflow:api_messages_list"), {"q": "message", "cursor": ""})
+        self.assertEqual(res.status_code, 400)
+
+    def test_messages_created_outside_ingest_are_indexed(self):
+        conv = self.make_conversation("t-orm", subject="Imported", bodies=["Crate of pomegranates arrives Friday"])
+        msg = conv.messages.get()
+        self.assertEqual([h.object_id for h in search_backend().search_messages("pomegranates").hits], [msg.pk])
+
+        # a later ingest of the same message keeps the existing document
+        MessageSearchDocument.objects.bulk_create(
+            [make_document(msg.pk, self.workspace.pk, conv.pk, self.stream.pk, "Imported", "other", "")],
+            ignore_conflicts=True,
+        )
+        self.assertEqual(MessageSearchDocument.objects.get(message=msg).body, "Crate of pomegranates arrives Friday")
+
+    def test_edits_refresh_the_search_documents(self):
+        backend = search_backend()
+        msg = Message.objects.get(remote_message_id="msg-5")
+        msg.text = "Venue moved to the harbour"
+        msg.save(update_fields=["text"])
+        self.assertEqual([h.object_id for h in backend.search_messages("harbour").hits], [msg.pk])
+        self.assertEqual(backend.search_messages("message 5").total, 0)
+
+        conv = Conversation.objects.get(remote_thread_id="t-html")
+        conv.subject = "Offsite logistics"
+        conv.save()
+        self.assertEqual([h.object_id for h in backend.search_conversations("logistics").hits], [conv.pk])
+        self.assertEqual(backend.search_conversations("budget planning").total, 0)
+
+    def test_reindex_replaces_stale_terms(self):
+        msg = Message.objects.get(remote_message_id="msg-3")
+        msg.text = "Rescheduled to Tuesday"
+        msg.save()
+        call_command("focusflow_search_index", stdout=StringIO())
+        backend = search_backend()
+        self.assertEqual([h.object_id for h in backend.search_messages("rescheduled").hits], [msg.pk])
+        self.assertEqual(backend.search_messages("message 3").total, 0)
+
+    def test_like_fallback_agrees_with_fts(self):
+        fts = search_backend().search_messages("message", limit=50)
+        like = SearchBackend().search_messages("message", limit=50)
+        self.assertEqual(fts.total, like.total)
+        self.assertEqual({h.object_id for h in fts.hits}, {h.object_id for h in like.hits})
+
+
+@override_settings(FOCUSFLOW_DELTA_SETTLE_SECONDS=0)
+class DeltaSyncTests(FocusFlowFixtureMixin, TestCase):
+    url = reverse_lazy("focusflow:api_changes")
+
+    def poll(self, token, **params):
+        res = self.client.get(self.url, {"since": token, **params})
+        self.assertEqual(res.status_code, 200)
+        return res.json()
+
+    def test_poll_returns_only_changes_and_tombstones(self):
+        stale = self.make_conversation("t-delta-old")
+        token = self.client.get(self.url).json()["next"]
+
+        fresh = self.make_conversation("t-delta-new")
+        stale.is_deleted, stale.deleted_at = True, timezone.now()
+        stale.save()
+        body = self.poll(token)
+        convs = body["changes"]["conversations"]
+        self.assertEqual([c["id"] for c in convs["changed"]], [fresh.pk])
+        self.assertEqual([d["id"] for d in convs["deleted"]], [stale.pk])
+        self.assertEqual(len(body["changes"]["messages"]["changed"]), 1)
+
+        quiet = self.poll(body["next"])
+        self.assertFalse(any(c["changed"] or c["deleted"] for c in quiet["changes"].values()))
+
+    def test_full_replay_pages_through_every_row_once(self):
+        self.make_conversation("t-delta-walk", bodies=[f"m{i}" for i in range(7)])
+        seen, token, has_more = [], "", True
+        while has_more:
+            body = self.poll(token, limit=3)
+            seen.extend(m["id"] for m in body["changes"]["messages"]["changed"])
+            token, has_more = body["next"], body["has_more"]
+        self.assertEqual(sorted(seen), sorted(Message.objects.values_list("id", flat=True)))
+        self.assertEqual(len(seen), 7)
+
+    @override_settings(FOCUSFLOW_DELTA_SETTLE_SECONDS=60)
+    def test_uncommitted_window_is_held_back(self):
+        self.make_conversation("t-delta-settle")
+        self.assertEqual(self.poll("")["changes"]["conversations"]["changed"], [])
+
+    def test_bad_token_is_rejected(self):
+        self.assertEqual(self.client.get(self.url, {"since": "garbage"}).status_code, 400)
+
+
+class ConditionalGetTests(FocusFlowFixtureMixin, TestCase):
+    def test_revalidation_is_a_single_query_304(self):
+        conv = self.make_conversation("t-etag")
+        url = reverse("focusflow:api_conversation_detail", args=[conv.pk])
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("Last-Modified", first)
+
+        with self.assertNumQueries(1):
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again["ETag"], first["ETag"])
+        self.assertEqual(again.content, b"")
+
+        since = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(since.status_code, 304)
+
+    def test_related_writes_change_the_etag(self):
+        conv = self.make_conversation("t-etag-change")
+        message = conv.messages.first()
+        conv_url = reverse("focusflow:api_conversation_detail", args=[conv.pk])
+        msg_url = reverse("focusflow:api_message_detail", args=[message.pk])
+        conv_tag, msg_tag = self.client.get(conv_url)["ETag"], self.client.get(msg_url)["ETag"]
+
+        AIAnnotation.objects.create(
+            workspace=self.workspace, target_content_type=ContentType.objects.get_for_model(Message),
+            target_object_id=message.pk, kind=AIAnnotation.Kind.SUMMARY, model_name="simple-v1",
+        )
+        self.assertEqual(self.client.get(msg_url, HTTP_IF_NONE_MATCH=msg_tag).status_code, 200)
+
+        message.delete()
+        fresh = self.client.get(conv_url, HTTP_IF_NONE_MATCH=conv_tag)
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(fresh.json()["messages"], [])
+
+    def test_missing_rows_still_404(self):
+        self.assertEqual(self.client.get(reverse("focusflow:api_message_detail", args=[987654])).status_code, 404)
+
+
+class LiveEventsTests(SimpleTestCase):
+    async def test_stream_delivers_pings_and_replays(self):
+        broker = InMemoryBroker(ring_size=3, queue_size=10)
+        stream = event_stream(7, broker=broker, keepalive=0.05)
+        self.assertTrue((await anext(stream)).startswith(b"retry:"))
+
+        # publish from another thread, as sync ingest code does
+        await asyncio.to_thread(broker.publish, 7, "conversation.updated", {"id": 1})
+        self.assertIn(b"event: conversation.updated", await anext(stream))
+        self.assertEqual(await anext(stream), b": keep-alive\n\n")
+        await stream.aclose()
+        self.assertEqual(broker.subscriber_count(7), 0)
+
+        for i in range(2, 5):
+            broker.publish(7, "message.created", {"id": i})
+        resumed = event_stream(7, last_event_id=2, broker=broker)
+        await anext(resumed)
+        self.assertTrue((await anext(resumed)).startswith(b"id: 3\n"))
+        self.assertTrue((await anext(resumed)).startswith(b"id: 4\n"))
+        await resumed.aclose()
+
+        aged_out = event_stream(7, last_event_id=0, broker=broker)  # ring now holds 2..4
+        await anext(aged_out)
+        self.assertIn(b"event: reset", await anext(aged_out))
+        await aged_out.aclose()
+
+    async def test_slow_connection_is_dropped_at_its_cap(self):
+        broker = InMemoryBroker(queue_size=2)
+        stream = event_stream(7, broker=broker, keepalive=5)
+        await anext(stream)
+        for i in range(5):
+            broker.publish(7, "message.created", {"id": i})
+        await asyncio.sleep(0)  # let the loop run the deliveries
+        with self.assertRaises(StopAsyncIteration):
+            await anext(stream)
+        self.assertEqual(broker.subscriber_count(7), 0)
+
+
+class LiveEventPublishingTests(FocusFlowFixtureMixin, TestCase):
+    def setUp(self):
+        self.broker = InMemoryBroker()
+        set_broker(self.broker)
+        self.addCleanup(set_broker, None)
+
+    def published(self):
+        return [e.type for e in self.broker._rings.get(self.workspace.pk, [])]
+
+    def test_writers_publish_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            IngestPipeline(self.stream).run(inbound(4, threads=2))
+        self.assertEqual(self.published(), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.published().count("message.created"), 2)
+        self.assertEqual(self.published().count("conversation.updated"), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SummarizerService().annotate_conversation(Conversation.objects.first().pk)
+        self.assertEqual(self.published()[-1], "annotation.created")
+
+    def test_stream_requires_workspace(self):
+        self.assertEqual(self.client.get(reverse("focusflow:api_events")).status_code, 400)
+
+    @override_settings(FOCUSFLOW_LIVE_EVENTS=True)
+    def test_stream_needs_asgi_and_cross_process_broker(self):
+        url = reverse("focusflow:api_events")
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url, {"workspace": self.workspace.pk}).status_code, 503)  # WSGI
+
+        asgi_request = mock.Mock(spec=ASGIRequest)
+        self.assertFalse(live_events_available(asgi_request))  # process-local broker
+        self.broker.cross_process = True
+        self.assertTrue(live_events_available(asgi_request))
+        with override_settings(FOCUSFLOW_LIVE_EVENTS=False):
+            self.assertFalse(live_events_available(asgi_request))
+
+        self.broker.cross_process = False
+        with override_settings(FOCUSFLOW_LIVE_EVENTS_SINGLE_PROCESS=True):
+            self.assertTrue(live_events_available(asgi_request))
+
+    @override_settings(FOCUSFLOW_LIVE_EVENTS=True, FOCUSFLOW_LIVE_EVENTS_SINGLE_PROCESS=True)
+    async def test_members_stream_workspace_events_over_asgi(self):
+        url = reverse("focusflow:api_events")
+        params = {"workspace": self.workspace.pk}
+        self.assertEqual((await self.async_client.get(url, params)).status_code, 401)
+        await self.async_client.aforce_login(await get_user_model().objects.acreate(username="ff_events_stranger"))
+        self.assertEqual((await self.async_client.get(url, params)).status_code, 403)
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = response.streaming_content
+        self.assertTrue((await anext(stream)).startswith(b"retry:"))
+        await asyncio.to_thread(self.broker.publish, self.workspace.pk, "message.created", {"message_ids": [1]})
+        self.assertIn(b"event: message.created", await anext(stream))
+        await stream.aclose()
+
+
+class ExportTests(FocusFlowFixtureMixin, TestCase):
+    url = reverse_lazy("focusflow:api_export")
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.conv = cls.make_conversation("t-export", bodies=["first, \"quoted\"", "x" * 2000])
+        SummarizerService().annotate_conversation(cls.conv.pk)
+
+    def export(self, **params):
+        self.client.force_login(self.user)
+        res = self.client.get(self.url, {"workspace": self.workspace.pk, **params})
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.streaming)
+        return b"".join(res.streaming_content)
+
+    def test_ndjson_streams_every_resource(self):
+        rows = [json.loads(line) for line in self.export().decode().splitlines()]
+        types = [r["type"] for r in rows]
+        self.assertEqual(types.count("conversations"), 1)
+        self.assertEqual(types.count("messages"), 2)
+        self.assertEqual(types.count("annotations"), AIAnnotation.objects.count())
+        self.assertEqual(types.count("tasks"), Task.objects.count())
+        self.assertEqual(max(len(r.get("text", "")) for r in rows), 2000)
+
+    def test_csv_and_gzip(self):
+        raw = gzip.decompress(self.export(format="csv", resource="messages", gzip="1"))
+        records = list(csv.DictReader(StringIO(raw.decode())))
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["text"], 'first, "quoted"')
+        self.assertEqual(self.client.get(self.url, {"workspace": self.workspace.pk, "format": "csv"}).status_code, 400)
+
+    def test_export_is_limited_to_members(self):
+        self.assertEqual(self.client.get(self.url, {"workspace": self.workspace.pk}).status_code, 401)
+        self.client.force_login(get_user_model().objects.create(username="ff_stranger"))
+        self.assertEqual(self.client.get(self.url, {"workspace": self.workspace.pk}).status_code, 403)
+
+    def test_command_writes_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "messages.ndjson.gz"
+            call_command("focusflow_export", workspace=self.workspace.pk, resource=["messages"], gzip=True,
+                         output=str(path), stderr=StringIO())
+            self.assertEqual(len(gzip.decompress(path.read_bytes()).splitlines()), 2)
+
+    @skipUnless(find_spec("openpyxl"), "openpyxl not installed")
+    def test_command_writes_xlsx(self):
+        from openpyxl import load_workbook
+
+        with tempfile.TemporaryDirectory() as tmp:
+            book_path = Path(tmp) / "ws.xlsx"
+            call_command("focusflow_export", workspace=self.workspace.pk, format="xlsx", output=str(book_path),
+                         stderr=StringIO())
+            book = load_workbook(BytesIO(book_path.read_bytes()), read_only=True)
+            self.assertEqual(book.sheetnames, ["conversations", "messages", "annotations", "tasks"])
+            self.assertEqual(len(list(book["messages"].iter_rows(values_only=True))), 3)
+
+    def test_html_only_messages_keep_their_body(self):
+        html = "<p>Quarterly <b>numbers</b> attached</p>"
+        Message.objects.create(
+            conversation=self.conv, stream=self.stream, remote_message_id="t-export-html", sender=self.alice,
+            sent_at=timezone.now(), text="", html=html,
+        )
+        rows = [json.loads(line) for line in self.export(resource="messages").decode().splitlines()]
+        self.assertEqual([r["html"] for r in rows if not r["text"]], [html])
+
+        records = list(csv.DictReader(StringIO(self.export(format="csv", resource="messages").decode())))
+        self.assertEqual([r["html"] for r in records if not r["text"]], [html])
+
+        if find_spec("openpyxl"):
+            from openpyxl import load_workbook
+
+            with tempfile.TemporaryDirectory() as tmp:
+                book_path = Path(tmp) / "ws.xlsx"
+                export.write_xlsx(str(book_path), self.workspace.pk, ["messages"])
+                header, *sheet = load_workbook(book_path, read_only=True)["messages"].iter_rows(values_only=True)
+                self.assertIn(html, [row[header.index("html")] for row in sheet])
+
+
+class BulkTaskUpdateTests(FocusFlowFixtureMixin, TestCase):
+    url = reverse_lazy("focusflow:api_actions_bulk")
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        conv = cls.make_conversation("t-bulk")
+        ct = ContentType.objects.get_for_model(Conversation)
+        cls.tasks = [
+            Task.objects.create(workspace=cls.workspace, source_content_type=ct, source_object_id=conv.pk,
+                                title=f"Task {i}")
+            for i in range(4)
+        ]
+
+    def post(self, changes, workspace=None):
+        self.client.force_login(self.user)
+        body = {"workspace": workspace or self.workspace.pk, "changes": changes}
+        return self.client.post(self.url, json.dumps(body), content_type="application/json")
+
+    def token(self, task):
+        task.refresh_from_db()
+        return task.updated_at.isoformat()
+
+    def test_one_update_per_change_set(self):
+        changes = [{"id": t.pk, "status": "done", "updated_at": self.token(t)} for t in self.tasks[:3]]
+        changes.append({"id": self.tasks[3].pk, "status": "doing", "assignee": self.user.pk})
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.post(changes)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["updated"], 4)
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "focusflow_task"')]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(Task.objects.filter(status="done").count(), 3)
+        self.assertEqual(Task.objects.get(pk=self.tasks[3].pk).assignee, self.user)
+
+    def test_stale_tokens_conflict_and_others_still_apply(self):
+        stale = self.token(self.tasks[0])
+        Task.objects.filter(pk=self.tasks[0].pk).update(title="Edited", updated_at=timezone.now())
+        res = self.post([
+            {"id": self.tasks[0].pk, "status": "done", "updated_at": stale},
+            {"id": self.tasks[1].pk, "status": "done", "updated_at": self.token(self.tasks[1])},
+            {"id": 987654, "status": "done"},
+            {"id": self.tasks[2].pk, "status": "finished"},
+        ])
+        results = [r["result"] for r in res.json()["results"]]
+        self.assertEqual(results, ["conflict", "updated", "not_found", "invalid"])
+        self.assertEqual(list(Task.objects.filter(status="done").values_list("pk", flat=True)), [self.tasks[1].pk])
+
+    def test_reopening_clashes_with_open_duplicate_only_for_that_task(self):
+        done = self.tasks[0]
+        Task.objects.filter(pk=done.pk).update(status="done")
+        Task.objects.create(workspace=self.workspace, source_content_type=done.source_content_type,
+                            source_object_id=done.source_object_id, title=done.title)  # summarizer re-created it
+        res = self.post([{"id": done.pk, "status": "todo"}, {"id": self.tasks[1].pk, "status": "todo"}])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([r["result"] for r in res.json()["results"]], ["invalid", "updated"])
+        self.assertEqual(Task.objects.get(pk=done.pk).status, "done")
+
+    def test_requires_membership_and_post(self):
+        self.assertEqual(self.client.post(self.url, "{}", content_type="application/json").status_code, 401)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        stranger = get_user_model().objects.create(username="ff_bulk_stranger")
+        res = self.post([{"id": self.tasks[0].pk, "assignee": stranger.pk}])
+        self.assertEqual(res.json()["results"][0]["error"], "assignee is not a member of this workspace")
+        self.client.force_login(stranger)
+        body = json.dumps({"workspace": self.workspace.pk, "changes": [{"id": self.tasks[0].pk, "status": "done"}]})
+        self.assertEqual(self.client.post(self.url, body, content_type="application/json").status_code, 403)
+
+
+class InboxProjectionTests(FocusFlowFixtureMixin, TestCase):
+    url = reverse_lazy("focusflow:api_inbox")
+
+    def test_ingest_and_summarizer_maintain_rows(self):
+        IngestPipeline(self.stream).run(inbound(6, threads=2))
+        self.assertEqual(InboxRow.objects.count(), 2)
+        row = InboxRow.objects.order_by("-last_message_at").first()
+        latest = Message.objects.filter(conversation=row.conversation).order_by("-sent_at").first()
+        self.assertEqual(row.snippet, " ".join(latest.text.split())[:240])
+        self.assertEqual(row.sender_name, latest.sender.display_name)
+        self.assertEqual(row.summary, "")
+
+        SummarizerService().annotate_conversation(row.conversation_id)
+        row.refresh_from_db()
+        self.assertTrue(row.summary)
+        self.assertIn(row.priority_label, Conversation.Priority.values)
+        self.assertIsNotNone(row.priority_score)
+
+    def test_list_is_one_query_per_page(self):
+        IngestPipeline(self.stream).run(inbound(9, threads=3))
+        with self.assertNumQueries(1):
+            body = self.client.get(self.url, {"workspace": self.workspace.pk, "cursor": "", "page_size": 2}).json()
+        self.assertEqual(len(body["results"]), 2)
+        rest = self.client.get(self.url, {"workspace": self.workspace.pk, "cursor": body["next_cursor"]}).json()
+        ids = [r["id"] for r in body["results"] + rest["results"]]
+        self.assertEqual(sorted(ids), sorted(Conversation.objects.values_list("id", flat=True)))
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+    def test_page_mode_walks_rows_in_recency_order(self):
+        IngestPipeline(self.stream).run(inbound(9, threads=3))
+        with self.captureOnCommitCallbacks(execute=True):
+            Conversation.objects.create(workspace=self.workspace, stream=self.stream, remote_thread_id="t-inbox-empty")
+        rows = InboxRow.objects.order_by(F("last_message_at").desc(nulls_last=True), "-id")
+        expected = list(rows.values_list("conversation_id", flat=True))
+        self.assertEqual(len(expected), 4)
+        seen = []
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", UnorderedObjectListWarning)
+            for page in (1, 2):
+                body = self.client.get(self.url, {"workspace": self.workspace.pk, "page_size": 2, "page": page}).json()
+                seen.extend(r["id"] for r in body["results"])
+        self.assertEqual(seen, expected)
+
+    def test_tags_and_deletes_follow_signals(self):
+        conv = self.make_conversation("t-inbox-tags")
+        tag = Tag.objects.create(workspace=self.workspace, name="Finance")
+        with self.captureOnCommitCallbacks(execute=True):
+            ConversationTag.objects.create(conversation=conv, tag=tag)
+        self.assertEqual(InboxRow.objects.get(conversation=conv).tag_slugs, ["finance"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            conv.is_deleted = True
+            conv.save()
+        self.assertFalse(InboxRow.objects.filter(conversation=conv).exists())
+
+    def test_rebuild_command(self):
+        self.make_conversation("t-inbox-rebuild")
+        out = StringIO()
+        call_command("focusflow_inbox", workspace=self.workspace.pk, stdout=out)
+        self.assertIn("1 inbox rows written", out.getvalue())
+        self.assertEqual(InboxRow.objects.get().subject, "Quarterly report")
@@ -31,6 +31,9 @@ urlpatterns = [
     path("api/conversations/", api.conversations_list, name="api_conversations_list"),
     path("api/conversations/<int:pk>/", api.conversation_detail, name="api_conversation_detail"),
 
+    # Inbox (denormalized listing)
+    path("api/inbox/", api.inbox_list, name="api_inbox"),
+
     # Messages
     path("api/messages/", api.messages_list, name="api_messages_list"),
     path("api/messages/<int:pk>/", api.message_detail, name="api_message_detail"),
@@ -40,4 +43,17 @@ urlpatterns = [
 
     # Tasks / Action Items
     path("api/actions/", api.actions_list, name="api_actions_list"),
+    path("api/actions/bulk/", api.actions_bulk_update, name="api_actions_bulk"),
+
+    # Delta sync for polling clients
+    path("api/changes/", api.changes_since, name="api_changes"),
+
+    # Live events (Server-Sent Events, ASGI)
+    path("api/events/", api.events_stream, name="api_events"),
+
+    # Analytics (server-side aggregates)
+    path("api/analytics/", api.analytics_summary, name="api_analytics"),
+
+    # Streaming workspace export (NDJSON / CSV)
+    path("api/export/", api.workspace_export, name="api_export"),
 ]
\ No newline at end of file
@@ -7,6 +7,7 @@ from django.contrib.auth import get_user_model
 
 from .services.whatsapp_api import connect_whatsapp, list_recent_messages
 
+import logging
 import os
 
 from .services.google_oauth import (
@@ -15,15 +16,19 @@ from .services.google_oauth import (
     get_gmail_profile_email,
     list_recent_message_headers,
 )
+from .services.events import live_events_available
+from .services.gmail_sync import GmailSyncEngine
 
 # Optional DB persistence when user is authenticated
 try:
-    from .models import Workspace, Integration
+    from .models import Workspace, Integration, Stream
 except Exception:
     Workspace = None
     Integration = None
+    Stream = None
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
 # -----------------------
@@ -67,7 +72,18 @@ def dashboard(request):
             },
         ]
 
-    return render(request, "focusflow/dashboard.html", {"summaries": summaries})
+    # Workspace for the live event stream (dashboard.js subscribes when it is set)
+    workspace_id = None
+    if Workspace is not None and request.user.is_authenticated:
+        workspace_id = (
+            Workspace.objects.filter(owner=request.user, is_deleted=False).values_list("id", flat=True).first()
+        )
+
+    return render(
+        request,
+        "focusflow/dashboard.html",
+        {"summaries": summaries, "workspace_id": workspace_id, "live_events": live_events_available(request)},
+    )
 
 def analytics(request):
     return render(request, "focusflow/analytics.html")
@@ -225,6 +241,8 @@ def gmail_callback(request):
         messages.error(request, "Failed to retrieve access token. Check Google Cloud credentials/redirect URI.")
         return redirect("focusflow:integrations")
 
+    target = reverse("focusflow:integrations")
+
     # Get the primary Gmail address (for display + Integration.account_label)
     email = get_gmail_profile_email(access_token) or "unknown@example.com"
 
@@ -255,12 +273,32 @@ def gmail_callback(request):
             integ.status = "active"
             integ.save(update_fields=["status"])
 
+        # Pull the inbox into the DB (incremental after the first run, see SyncCursor)
+        stream, _ = Stream.objects.get_or_create(
+            integration=integ,
+            remote_id="INBOX",
+            defaults={"category": "email", "kind": "Label", "name": "Inbox"},
+        )
+        # The tokens are already stored: whatever the sync raises (API, ingest, database), the
+        # connection stands, the error is recorded on the integration and the page says so
+        try:
+            cursor = GmailSyncEngine(stream, access_token).run()
+            integ.sync_status = "idle"
+            messages.info(request, f"Synced {cursor.stats_json.get('messages_created', 0)} new Gmail messages.")
+        except Exception as exc:
+            logger.exception("Gmail sync failed for integration %s", integ.pk)
+            integ.sync_status = "error"
+            integ.last_error = str(exc)[:2000]
+            messages.warning(request, "Gmail sync failed; showing a preview only.")
+            target = f"{target}?sync=error"
+        integ.save(update_fields=["sync_status", "last_error", "updated_at"])
+
     # Prime the dashboard with a few real messages
     summaries = list_recent_message_headers(access_token, max_results=5)
     request.session["gmail_summaries"] = summaries
 
     messages.success(request, f"Gmail connected: {email}. Retrieved {len(summaries)} messages.")
-    return redirect("focusflow:integrations")
+    return redirect(target)
 
 
 def gmail_disconnect(request):
@@ -93,6 +93,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "portfolio_web.wsgi.application"
+ASGI_APPLICATION = "portfolio_web.asgi.application"
 
 # Database
 DATABASES = {"default": env.db(default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}")}